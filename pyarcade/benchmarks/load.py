@@ -0,0 +1,312 @@
+"""Mixed HTTP workload against the app, reporting throughput, latency percentiles and memory per live session.
+
+Run from the pyarcade directory:
+    python -m benchmarks.load [--seconds 10] [--transport test-client|server] [--url http://host:port]
+                              [--concurrency 4] [--output load.json]
+
+The test-client transport calls create_app().test_client() in this process. The server transport starts the app on
+a local werkzeug server and sends real HTTP requests to it, or to --url if one is given. Results are written as
+JSON, named after the current commit by default, so runs can be compared across commits.
+"""
+from argparse import ArgumentParser
+from contextlib import redirect_stdout
+from http.client import HTTPConnection
+from random import Random
+from threading import Thread
+from urllib.parse import urlsplit
+import io
+import json
+import subprocess
+import time
+import tracemalloc
+
+from benchmarks.micro import play_move, side_to_move
+from pyarcade.app import create_app
+from pyarcade.checkers_board import CheckerBoard
+from pyarcade.game_ids import MASTERMIND_ID, CHECKERS_ID, MINESWEEPER_ID
+from pyarcade.minesweeper_builder import MinesweeperBoardBuilder
+
+GAME_IDS = {"mastermind": MASTERMIND_ID, "checkers": CHECKERS_ID, "minesweeper": MINESWEEPER_ID}
+
+# Share of each operation in the workload
+WORKLOAD = {
+    "create": 10,
+    "mastermind_guess": 40,
+    "checkers_move": 25,
+    "minesweeper_click": 25
+}
+
+# The operation that makes a move in each game
+WORKLOAD_MOVES = {"mastermind": "mastermind_guess", "checkers": "checkers_move", "minesweeper": "minesweeper_click"}
+
+
+class TestClientTransport:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method: str, path: str, body: dict = None) -> tuple:
+        response = self.client.open(path, method=method, json=body)
+        return response.status_code, response.json
+
+    def close(self):
+        pass
+
+
+class HttpTransport:
+    def __init__(self, url: str):
+        parts = urlsplit(url)
+        self.connection = HTTPConnection(parts.hostname, parts.port or 80)
+
+    def request(self, method: str, path: str, body: dict = None) -> tuple:
+        self.connection.request(method, path, body=json.dumps(body), headers={"Content-Type": "application/json"})
+        response = self.connection.getresponse()
+        return response.status, json.loads(response.read())
+
+    def close(self):
+        self.connection.close()
+
+
+class Player:
+    """ Plays the workload against one transport, keeping at most one session of each game open. """
+
+    def __init__(self, transport, rng: Random):
+        self.transport = transport
+        self.rng = rng
+        self.sessions = dict.fromkeys(GAME_IDS)
+        self.checkers_board = None
+        self.latencies = {}
+        self.rejections = {}
+
+    def timed(self, operation: str, method: str, path: str, body: dict = None) -> dict:
+        start = time.perf_counter()
+        status, reply = self.transport.request(method, path, body)
+        self.latencies.setdefault(operation, []).append(time.perf_counter() - start)
+
+        if status != 200 or not reply or reply.get("session_id", 1) == 0:
+            self.rejections[operation] = self.rejections.get(operation, 0) + 1
+            return None
+
+        return reply
+
+    def step(self):
+        operation = self.rng.choices(list(WORKLOAD), weights=list(WORKLOAD.values()))[0]
+        getattr(self, operation)()
+
+    def create(self, game: str = None):
+        game = game or self.rng.choice(list(GAME_IDS))
+        self.end(game)
+        reply = self.timed("create", "POST", f"/create/{game}", {"game_id": GAME_IDS[game]})
+        self.sessions[game] = reply["session_id"] if reply else None
+
+        if game == "checkers":
+            # Every checkers session starts from the opening position, which the player then follows move by move
+            self.checkers_board = CheckerBoard() if reply else None
+
+    def end(self, game: str):
+        if self.sessions[game] is not None:
+            self.timed("delete", "POST", f"/delete/{game}", {"session_id": self.sessions[game]})
+            self.sessions[game] = None
+
+    def session(self, game: str) -> int:
+        if self.sessions[game] is None:
+            self.create(game)
+        return self.sessions[game]
+
+    def mastermind_guess(self):
+        reply = self.timed("mastermind_guess", "POST", "/update/mastermind",
+                           {"session_id": self.session("mastermind"), "guess": self.rng.sample(range(10), 4)})
+        if reply is None or reply["done"]:
+            self.end("mastermind")
+
+    def checkers_moves(self) -> list:
+        """
+        Returns: Every legal [origin, dest] for the side to move, jumps included, worked out on the player's own copy
+        of the board with the same rules the server checks moves against.
+        """
+        board = self.checkers_board
+        return [[[piece.row, piece.col], list(dest)] for piece in side_to_move(board)
+                for dest in board.get_valid_moves(piece)]
+
+    def checkers_move(self):
+        session_id = self.session("checkers")
+        moves = self.checkers_moves() if self.checkers_board is not None else []
+        if not moves:
+            self.end("checkers")
+            return
+
+        origin, dest = self.rng.choice(moves)
+        reply = self.timed("checkers_move", "POST", "/update/checkers", {"session_id": session_id,
+                                                                        "move": [origin, dest]})
+        if reply is None or reply["done"]:
+            self.end("checkers")
+            return
+
+        play_move(self.checkers_board, tuple(origin), tuple(dest))
+
+    def minesweeper_click(self):
+        cell = [self.rng.randrange(MinesweeperBoardBuilder.EASY_SIZE) for idx in range(2)]
+        reply = self.timed("minesweeper_click", "POST", "/update/minesweeper",
+                           {"session_id": self.session("minesweeper"), "unhide_cell": cell})
+        if reply is not None and reply["done"]:
+            self.end("minesweeper")
+
+    def run(self, seconds: float):
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            self.step()
+
+        for game in GAME_IDS:
+            self.end(game)
+
+
+def percentile(ordered: list, fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(players: list, seconds: float) -> dict:
+    operations = {}
+    total = 0
+
+    for operation in sorted({name for player in players for name in player.latencies}):
+        latencies = sorted(latency for player in players for latency in player.latencies.get(operation, []))
+        total += len(latencies)
+        operations[operation] = {"count": len(latencies),
+                                 "rejected": sum(player.rejections.get(operation, 0) for player in players),
+                                 "mean_ms": 1000 * sum(latencies) / len(latencies),
+                                 "p50_ms": 1000 * percentile(latencies, 0.50),
+                                 "p95_ms": 1000 * percentile(latencies, 0.95),
+                                 "p99_ms": 1000 * percentile(latencies, 0.99)}
+
+    return {"requests": total, "requests_per_second": total / seconds, "operations": operations}
+
+
+def memory_per_session(transport, sessions: int) -> dict:
+    """
+    Returns: Bytes allocated per live session of each game, measured with tracemalloc over creating sessions
+    and making one move in each. Only meaningful when the app runs in this process.
+    """
+    player = Player(transport, Random(0))
+    per_session = {}
+
+    for game, game_id in GAME_IDS.items():
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        session_ids = []
+
+        for idx in range(sessions):
+            session_id = transport.request("POST", f"/create/{game}", {"game_id": game_id})[1]["session_id"]
+            session_ids.append(session_id)
+            player.sessions[game] = session_id
+            if game == "checkers":
+                player.checkers_board = CheckerBoard()
+            getattr(player, WORKLOAD_MOVES[game])()
+
+        per_session[game] = (tracemalloc.get_traced_memory()[0] - before) / sessions
+        tracemalloc.stop()
+
+        for session_id in session_ids:
+            transport.request("POST", f"/delete/{game}", {"session_id": session_id})
+
+    return per_session
+
+
+def current_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_load(seconds: float, transport: str = "test-client", concurrency: int = 1, url: str = None,
+             seed: int = 0, memory_sessions: int = 200) -> dict:
+    """
+    Args:
+        seconds: how long each player plays the workload
+        transport: "test-client" or "server"
+        concurrency: number of players, each on its own thread and connection
+        url: address of an already running server. Only used with the server transport.
+        seed: players are seeded seed, seed + 1, ... so the same mix of requests is sent every run
+        memory_sessions: sessions of each game created to measure memory. 0 skips the measurement.
+
+    Returns: The results as a dictionary ready to be written as JSON.
+    """
+    app = server = None
+    if url is None:
+        app = create_app()
+
+    if transport == "server" and url is None:
+        from werkzeug.serving import WSGIRequestHandler, make_server
+
+        class QuietRequestHandler(WSGIRequestHandler):
+            def log_request(self, *args, **kwargs):
+                pass
+
+        server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=QuietRequestHandler)
+        Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}"
+
+    def new_transport():
+        return HttpTransport(url) if transport == "server" else TestClientTransport(app)
+
+    players = [Player(new_transport(), Random(seed + idx)) for idx in range(concurrency)]
+    threads = [Thread(target=player.run, args=(seconds,)) for player in players]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    results = {"commit": current_commit(), "transport": transport, "url": url, "concurrency": concurrency,
+               "seconds": elapsed, "workload": WORKLOAD}
+    results.update(summarize(players, elapsed))
+
+    # The app has to be in this process for tracemalloc to see its sessions
+    in_process = server is not None or transport == "test-client"
+    results["memory_per_session_bytes"] = memory_per_session(players[0].transport, memory_sessions) \
+        if in_process and memory_sessions else None
+
+    for player in players:
+        player.transport.close()
+    if server is not None:
+        server.shutdown()
+
+    return results
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=10.0, help="how long to run the workload")
+    parser.add_argument("--transport", choices=("test-client", "server"), default="test-client")
+    parser.add_argument("--url", default=None, help="running server to load instead of starting one")
+    parser.add_argument("--concurrency", type=int, default=1, help="players sending requests at the same time")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first player")
+    parser.add_argument("--memory-sessions", type=int, default=200,
+                        help="sessions per game created to measure memory, 0 to skip")
+    parser.add_argument("--output", default=None, help="JSON file to write, defaults to load-<commit>.json")
+    args = parser.parse_args()
+
+    transport = "server" if args.url else args.transport
+    # Minesweeper prints to stdout when a game is lost
+    with redirect_stdout(io.StringIO()):
+        results = run_load(args.seconds, transport, args.concurrency, args.url, args.seed, args.memory_sessions)
+
+    output = args.output or f"load-{results['commit']}.json"
+    with open(output, "w") as results_file:
+        json.dump(results, results_file, indent=2)
+
+    print(f"{results['requests']} requests in {results['seconds']:.1f}s, "
+          f"{results['requests_per_second']:.1f} requests/s over {transport}")
+    print(f"{'operation':<20}{'count':>8}{'rejected':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for operation, stats in results["operations"].items():
+        print(f"{operation:<20}{stats['count']:>8}{stats['rejected']:>10}{stats['p50_ms']:>10.2f}"
+              f"{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}")
+    if results["memory_per_session_bytes"]:
+        for game, size in results["memory_per_session_bytes"].items():
+            print(f"{game:<20}{size:>10.0f} bytes per live session")
+    print(f"results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
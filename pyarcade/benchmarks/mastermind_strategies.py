@@ -0,0 +1,37 @@
+"""Plays full Mastermind games through MastermindGame with each guessing strategy and reports how they do.
+
+Run from the pyarcade directory:
+    python -m benchmarks.mastermind_strategies [--games 1000] [--strategy minimax] [--processes 4] [--json]
+"""
+from argparse import ArgumentParser
+import json
+
+from pyarcade.mastermind_simulation import STRATEGIES, simulate
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=1000, help="games to play with each strategy")
+    parser.add_argument("--strategy", choices=sorted(STRATEGIES), action="append",
+                        help="strategy to run, may be repeated. Defaults to all of them.")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="worker processes, defaults to the CPU count. 0 plays every game in this process.")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    results = [simulate(name, args.games, args.processes, args.seed) for name in args.strategy or STRATEGIES]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'strategy':<10}{'games/s':>10}{'average':>10}{'max':>6}  distribution")
+    for result in results:
+        distribution = " ".join(f"{guesses}:{games}" for guesses, games in result["distribution"].items())
+        print(f"{result['strategy']:<10}{result['games_per_second']:>10.1f}{result['average_guesses']:>10.3f}"
+              f"{result['max_guesses']:>6}  {distribution}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""Microbenchmarks of the game engines' hot paths, checked against stored baselines.
+
+Run from the pyarcade directory:
+    python -m benchmarks.micro [--filter checkers] [--threshold 0.25]
+    python -m benchmarks.micro --save-baseline
+
+Each benchmark is timed with timeit, taking the best of several repeats. Without --save-baseline the results are
+compared against benchmarks/data/micro_baseline.json and the run fails if any benchmark got slower than its
+baseline by more than the threshold. Every run also times a fixed calibration loop that none of the code under test
+runs, and each benchmark is compared relative to it, so a machine that is uniformly faster or slower than the one
+the baselines were saved on does not show up as a regression.
+"""
+from argparse import ArgumentParser
+from random import Random
+import json
+import os
+import sys
+import timeit
+
+from pyarcade.checkers import Checkers
+from pyarcade.checkers_board import CheckerBoard, is_red_piece, is_black_piece
+from pyarcade.game_ids import MASTERMIND_ID, CHECKERS_ID, MINESWEEPER_ID
+from pyarcade.json_decoders import json_tuple_decoder
+from pyarcade.mastermind import MastermindGame
+from pyarcade.minesweeper import MinesweeperGame
+from pyarcade.minesweeper_builder import MinesweeperBoardBuilder
+from pyarcade.msgpack_codec import packb, unpackb
+from pyarcade.proxy import MastermindGameProxy, CheckersProxy, MinesweeperProxy
+from pyarcade.session_manager import SessionManager
+
+DATA_DIRECTORY = os.path.join(os.path.dirname(__file__), "data")
+POSITIONS_FILE = os.path.join(DATA_DIRECTORY, "checkers_midgame.json")
+BASELINE_FILE = os.path.join(DATA_DIRECTORY, "micro_baseline.json")
+
+THRESHOLD = 0.25
+REPEATS = 7
+# Times an apparent regression is measured again before it is reported, keeping the best time
+CONFIRMATIONS = 2
+# The benchmark every run times to measure how fast the machine is
+CALIBRATION = "calibration"
+
+
+def side_to_move(board: CheckerBoard) -> list:
+    own = is_red_piece if board.is_red_turn() else is_black_piece
+    return [piece for row in board.get_board() for piece in row if own(piece)]
+
+
+def play_move(board: CheckerBoard, origin: tuple, dest: tuple):
+    # Same steps as Checkers.update_game, with the moves of the piece worked out first to fill the jump cache
+    board.get_valid_moves(board.get_piece_at(*origin))
+    board.remove_pieces(board.get_jumped_pieces(origin, dest))
+    board.move_piece_to(origin, dest)
+    board.swap_turn()
+
+
+def generate_positions(games: int = 4, moves: int = 20) -> list:
+    """
+    Returns: For each game, the list of moves of a seeded random self-play game, stopped after the given number of
+    moves. These are what checkers_midgame.json stores.
+    """
+    positions = []
+    for seed in range(games):
+        rng = Random(seed)
+        board = CheckerBoard()
+        played = []
+
+        while len(played) < moves:
+            options = [((piece.row, piece.col), dest) for piece in side_to_move(board)
+                       for dest in board.get_valid_moves(piece)]
+            if not options:
+                break
+            origin, dest = rng.choice(options)
+            play_move(board, origin, dest)
+            if board.is_a_winner():
+                break
+            played.append([list(origin), list(dest)])
+
+        positions.append(played)
+
+    return positions
+
+
+def midgame_boards() -> list:
+    boards = []
+    with open(POSITIONS_FILE) as positions_file:
+        for moves in json.load(positions_file):
+            board = CheckerBoard()
+            for origin, dest in moves:
+                play_move(board, tuple(origin), tuple(dest))
+            boards.append(board)
+
+    return boards
+
+
+def bench_traverse_board():
+    pieces = [(board, piece) for board in midgame_boards() for piece in side_to_move(board)]
+    return lambda: [board.traverse_board(piece) for board, piece in pieces]
+
+
+def bench_get_board_for_ui():
+    board = midgame_boards()[0]
+    return board.get_board_for_ui
+
+
+def bench_initialize_board():
+    rng = Random(0)
+    return lambda: MinesweeperBoardBuilder.initialize_board((4, 4), rng)
+
+
+def bench_print_player_board():
+    board, mines = MinesweeperBoardBuilder.initialize_board((4, 4), Random(0))
+    player_board = {row: [(row + column) % 2 == 0 or board[row][column] == 'mine' for column in range(len(board[row]))]
+                    for row in board}
+    return lambda: MinesweeperGame.print_player_board(player_board, board)
+
+
+def bench_mastermind_update_game(request: dict):
+    game = MastermindGame()
+    session_id = game.create_game(dict(request, seed=0))["session_id"]
+    session = SessionManager.singleton().get_session_by_id(session_id)
+    guess = tuple(reversed(session.get_sequence()))
+    # A since_index past the end keeps the reply from growing with the guesses made while timing
+    update = {"session_id": session_id, "guess": guess, "since_index": sys.maxsize}
+    return lambda: game.update_game(update)
+
+
+def bench_json_tuple_decoder():
+    # The decoder converts in place, so every call needs a fresh request
+    return lambda: json_tuple_decoder({"session_id": 1, "move": [[3, 2], [4, 3]]}, 2)
+
+
+def bench_msgpack_unpackb():
+    # The same move as bench_json_tuple_decoder, which arrives with its pairs already tuples
+    body = packb({"session_id": 1, "move": ((3, 2), (4, 3))})
+    return lambda: unpackb(body)
+
+
+def bench_mastermind_validator():
+    proxy = MastermindGameProxy(MastermindGame())
+    session_id = proxy.create_game({"game_id": MASTERMIND_ID})["session_id"]
+    request = {"session_id": session_id, "guess": (0, 1, 2, 3)}
+    return lambda: proxy.valid_session_request(request, 2) and proxy.valid_update_request(request)
+
+
+def bench_checkers_validator():
+    proxy = CheckersProxy(Checkers())
+    session_id = proxy.create_game({"game_id": CHECKERS_ID})["session_id"]
+    request = {"session_id": session_id, "move": ((3, 2), (4, 3))}
+    return lambda: proxy.valid_session_request(request, 2) and proxy.valid_update_request(request)
+
+
+def bench_minesweeper_validator():
+    proxy = MinesweeperProxy(MinesweeperGame())
+    session_id = proxy.create_game({"game_id": MINESWEEPER_ID})["session_id"]
+    request = {"session_id": session_id, "unhide_cell": (4, 4)}
+    return lambda: proxy.valid_session_request(request, 2) and proxy.valid_update_request(request)
+
+
+# Each entry builds its fixtures and returns the function to time
+BENCHMARKS = {
+    CALIBRATION: lambda: calibration_loop,
+    "checkers.traverse_board": bench_traverse_board,
+    "checkers.get_board_for_ui": bench_get_board_for_ui,
+    "minesweeper.initialize_board": bench_initialize_board,
+    "minesweeper.print_player_board": bench_print_player_board,
+    "mastermind.update_game": lambda: bench_mastermind_update_game({"game_id": MASTERMIND_ID}),
+    "mastermind.update_game_variant": lambda: bench_mastermind_update_game({"game_id": MASTERMIND_ID,
+                                                                            "code_length": 6, "repeats": True}),
+    "json_tuple_decoder": bench_json_tuple_decoder,
+    "msgpack.unpackb": bench_msgpack_unpackb,
+    "proxy.mastermind_validators": bench_mastermind_validator,
+    "proxy.checkers_validators": bench_checkers_validator,
+    "proxy.minesweeper_validators": bench_minesweeper_validator
+}
+
+
+def time_benchmark(function, repeats: int = REPEATS) -> float:
+    """
+    Returns: Seconds per call, the best of repeats runs of as many calls as fill about 0.2 seconds.
+    """
+    timer = timeit.Timer(function)
+    number, elapsed = timer.autorange()
+    return min(timer.repeat(repeats, number)) / number
+
+
+def run(names: list, repeats: int = REPEATS) -> dict:
+    SessionManager.active_sessions = {}
+    return {name: time_benchmark(BENCHMARKS[name](), repeats) for name in names}
+
+
+def calibration_loop() -> int:
+    # Plain interpreter work, loops, arithmetic, calls and dict and list access, that no change to pyarcade touches
+    counts = {}
+    for idx in range(300):
+        key = idx % 17
+        counts[key] = counts.get(key, 0) + len(str(idx))
+    return sum(sorted(counts.values())[::2])
+
+
+def machine_speed(results: dict, baseline: dict) -> float:
+    """
+    Returns: How much slower this run's calibration was than the baseline's, 1.0 if either has none.
+    """
+    if results.get(CALIBRATION) and baseline.get(CALIBRATION):
+        return results[CALIBRATION] / baseline[CALIBRATION]
+    return 1.0
+
+
+def load_baseline(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+
+    with open(path) as baseline_file:
+        return json.load(baseline_file)
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """
+    Returns: (name, seconds, baseline seconds, ratio, regressed) for every result but the calibration, regressed
+    being True if the result is slower than its baseline by more than the threshold. The ratio is taken after
+    scaling the baseline by machine_speed. Benchmarks without a baseline never regress.
+    """
+    speed = machine_speed(results, baseline)
+    rows = []
+    for name, seconds in results.items():
+        if name == CALIBRATION:
+            continue
+        base = baseline.get(name)
+        ratio = seconds / (base * speed) if base else None
+        rows.append((name, seconds, base, ratio, ratio is not None and ratio > 1 + threshold))
+    return rows
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="allowed slowdown against the baseline, 0.25 is 25%%")
+    parser.add_argument("--repeats", type=int, default=REPEATS, help="timing runs per benchmark")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="baseline file to compare against or save")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--regenerate-positions", action="store_true",
+                        help="rewrite the stored checkers midgame positions")
+    args = parser.parse_args()
+
+    if args.regenerate_positions:
+        with open(POSITIONS_FILE, "w") as positions_file:
+            json.dump(generate_positions(), positions_file)
+
+    # The calibration is always timed, since every comparison is relative to it
+    results = run([name for name in BENCHMARKS if name == CALIBRATION or args.filter in name], args.repeats)
+
+    baseline = load_baseline(args.baseline)
+    if args.save_baseline:
+        # Scaled to the calibration already saved, so that saving only some benchmarks keeps the rest comparable
+        speed = machine_speed(results, baseline)
+        baseline.update({name: seconds / speed for name, seconds in results.items() if name != CALIBRATION})
+        baseline.setdefault(CALIBRATION, results[CALIBRATION])
+        with open(args.baseline, "w") as baseline_file:
+            json.dump(baseline, baseline_file, indent=2, sort_keys=True)
+        print(f"saved {len(results) - 1} baselines to {args.baseline}")
+
+    rows = compare(results, baseline, args.threshold)
+    for confirmation in range(CONFIRMATIONS):
+        regressed = [row[0] for row in rows if row[4]]
+        if not regressed:
+            break
+        # A single slow run is usually another process competing for the CPU
+        for name, seconds in run(regressed, args.repeats).items():
+            results[name] = min(results[name], seconds)
+        rows = compare(results, baseline, args.threshold)
+
+    print(f"machine speed against the baseline's: {machine_speed(results, baseline):.2f}x the time")
+    print(f"{'benchmark':<34}{'us/call':>12}{'baseline':>12}{'ratio':>8}")
+    for name, seconds, base, ratio, regressed in rows:
+        base_text = f"{base * 1e6:>12.2f}" if base else f"{'-':>12}"
+        ratio_text = f"{ratio:>8.2f}" if ratio else f"{'-':>8}"
+        print(f"{name:<34}{seconds * 1e6:>12.2f}{base_text}{ratio_text}{'  REGRESSED' if regressed else ''}")
+
+    regressions = [row[0] for row in rows if row[4]]
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) slower than baseline by more than {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Throughput of the no-guess minesweeper generator in boards per second for each difficulty.
+
+Run from the pyarcade directory:
+    python -m benchmarks.no_guess [--seconds 5] [--processes 4]
+"""
+from argparse import ArgumentParser
+from itertools import count
+import time
+
+from pyarcade.minesweeper_builder import MinesweeperBoardBuilder
+from pyarcade.minesweeper_no_guess import NoGuessBoardPool, generate_no_guess_board
+
+
+def serial_throughput(rows: int, columns: int, mine_count: int, seconds: float) -> float:
+    first_click = (rows // 2, columns // 2)
+    generated = 0
+    start = time.perf_counter()
+
+    for seed in count():
+        if generate_no_guess_board(rows, columns, mine_count, first_click, seed) is not None:
+            generated += 1
+        if time.perf_counter() - start >= seconds:
+            break
+
+    return generated / (time.perf_counter() - start)
+
+
+def pool_throughput(rows: int, columns: int, mine_count: int, seconds: float, processes: int) -> float:
+    pool = NoGuessBoardPool(rows, columns, mine_count, processes=processes)
+    first_click = (rows // 2, columns // 2)
+    # Enough boards to keep every worker process busy, however many the pool started
+    batch = 4 * pool.processes
+    generated = 0
+
+    # The first batch pays for starting the worker processes
+    pool.generate(first_click, batch)
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        generated += sum(1 for seed, result in pool.generate(first_click, batch) if result is not None)
+    elapsed = time.perf_counter() - start
+    pool.stop()
+
+    return generated / elapsed
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5.0, help="time to spend on each measurement")
+    parser.add_argument("--processes", type=int, default=None, help="worker processes, defaults to the CPU count")
+    args = parser.parse_args()
+
+    print(f"{'difficulty':<14}{'serial boards/s':>18}{'pool boards/s':>18}")
+    for name, (rows, columns, mine_count) in MinesweeperBoardBuilder.DIFFICULTIES.items():
+        serial = serial_throughput(rows, columns, mine_count, args.seconds)
+        parallel = pool_throughput(rows, columns, mine_count, args.seconds, args.processes)
+        print(f"{name:<14}{serial:>18.1f}{parallel:>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
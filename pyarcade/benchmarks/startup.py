@@ -0,0 +1,110 @@
+"""Cold-start benchmark timing how soon a fresh process serves its first request, checked against a budget.
+
+Run from the pyarcade directory:
+    python -m benchmarks.startup [--runs 5] [--scale 1.0] [--output startup.json]
+
+Every run starts a new interpreter that imports the app, calls create_app() and then creates and plays one session
+of each game through the test client, timing each step. A game's first request includes loading the game. The
+parent also times the whole process from launch to exit. The median of each step over the runs is compared against
+BUDGETS, and the run fails if any step is over its budget. The budgets are for a single core of an ordinary server,
+so --scale loosens or tightens them all for slower or faster machines.
+"""
+from argparse import ArgumentParser, SUPPRESS
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+RUNS = 5
+
+# Seconds each step of a cold start may take
+BUDGETS = {
+    "process": 0.6,
+    "import": 0.35,
+    "create_app": 0.02,
+    "first_request.mastermind": 0.05,
+    "first_request.checkers": 0.05,
+    "first_request.minesweeper": 0.05,
+    "total": 0.45
+}
+
+
+def probe() -> dict:
+    """
+    Returns: Seconds taken by each step of a cold start in this process, which must not have imported pyarcade yet.
+    """
+    start = time.perf_counter()
+    from pyarcade.app import create_app
+    imported = time.perf_counter()
+
+    app = create_app()
+    created = time.perf_counter()
+    timings = {"import": imported - start, "create_app": created - imported}
+
+    from pyarcade.game_ids import MASTERMIND_ID, CHECKERS_ID, MINESWEEPER_ID
+    client = app.test_client()
+    for name, game_id in (("mastermind", MASTERMIND_ID), ("checkers", CHECKERS_ID), ("minesweeper", MINESWEEPER_ID)):
+        request_start = time.perf_counter()
+        session_id = client.post(f"/create/{name}", json={"game_id": game_id}).json["session_id"]
+        client.get(f"/play/{name}", json={"session_id": session_id})
+        timings[f"first_request.{name}"] = time.perf_counter() - request_start
+
+    timings["total"] = time.perf_counter() - start
+    return timings
+
+
+def cold_start() -> dict:
+    """
+    Returns: The probe's timings from a fresh interpreter, plus the wall time of the whole process.
+    """
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, "-m", "benchmarks.startup", "--probe"], check=True, capture_output=True,
+                            text=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout
+    timings = json.loads(output)
+    timings["process"] = time.perf_counter() - start
+    return timings
+
+
+def run(runs: int = RUNS) -> dict:
+    """
+    Returns: The median seconds of each step over runs cold starts.
+    """
+    samples = [cold_start() for idx in range(runs)]
+    return {step: statistics.median(sample[step] for sample in samples) for step in BUDGETS}
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=RUNS, help="cold starts to take the median of")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every budget by this")
+    parser.add_argument("--output", default=None, help="also write the medians to this JSON file")
+    # How the benchmark runs itself in each fresh interpreter
+    parser.add_argument("--probe", action="store_true", help=SUPPRESS)
+    args = parser.parse_args()
+
+    if args.probe:
+        print(json.dumps(probe()))
+        return
+
+    results = run(args.runs)
+    if args.output is not None:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2, sort_keys=True)
+
+    print(f"{'step':<28}{'ms':>10}{'budget':>10}")
+    over = []
+    for step, seconds in results.items():
+        budget = BUDGETS[step] * args.scale
+        if seconds > budget:
+            over.append(step)
+        print(f"{step:<28}{seconds * 1e3:>10.1f}{budget * 1e3:>10.1f}{'  OVER BUDGET' if seconds > budget else ''}")
+
+    if over:
+        print(f"{len(over)} step(s) of the cold start over budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
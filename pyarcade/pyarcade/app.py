@@ -1,50 +1,207 @@
-from flask import Flask, request
+import atexit
+import os
+import time
 
-from pyarcade.minesweeper import MinesweeperGame
-from pyarcade.checkers import Checkers
-from pyarcade.mastermind import MastermindGame
-from pyarcade.proxy import MastermindGameProxy, CheckersProxy, MinesweeperProxy
+from flask import Flask, Response, abort, g, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+
+from pyarcade.game_registry import GameRegistry, default_registry
+from pyarcade.metrics import Metrics
+from pyarcade.profiling import RequestProfiler
 from pyarcade.session_manager import SessionManager
-from pyarcade.json_decoders import *
+from pyarcade.compression import EncodedBody, compress, negotiate_encoding, COMPRESS_LEVEL, COMPRESS_MIN_SIZE
+from pyarcade.msgpack_codec import MessagePackError, negotiate_mimetype, packb, unpackb, MIMETYPES
+
+
+class NegotiatedJSONProvider(DefaultJSONProvider):
+    """ Replies in MessagePack to clients that prefer it to JSON, and in JSON to everyone else.
+
+    Note:
+        Flask turns the dicts views return into responses through here, so every route negotiates without doing
+        anything itself.
+    """
+
+    def serialize(self, obj, mimetype: str) -> bytes:
+        if mimetype in MIMETYPES:
+            return packb(obj)
+        return DefaultJSONProvider.response(self, obj).get_data()
+
+    def response(self, *args, **kwargs) -> Response:
+        if not has_request_context():
+            return DefaultJSONProvider.response(self, *args, **kwargs)
 
+        mimetype = negotiate_mimetype(request.accept_mimetypes)
+        if mimetype in MIMETYPES:
+            response = self._app.response_class(packb(self._prepare_response_obj(args, kwargs)), mimetype=mimetype)
+        else:
+            response = DefaultJSONProvider.response(self, *args, **kwargs)
 
-def create_app():
+        response.vary.add("Accept")
+        return response
+
+
+def create_app(profile_sample_every: int = 0, snapshot_path: str = None,
+               snapshot_interval: float = None, journal_directory: str = None, shard: int = None,
+               compress_min_size: int = COMPRESS_MIN_SIZE, compress_level: int = COMPRESS_LEVEL,
+               games: GameRegistry = None, debug_routes: bool = False):
+    """
+    Args:
+        profile_sample_every: profile one in this many requests from the start. 0 leaves profiling off unless
+        debug_routes lets it be switched on with a POST to /debug/profile.
+        snapshot_path: file the active sessions are snapshotted to. If it exists the sessions in it are restored
+        first. None keeps sessions in memory only.
+        snapshot_interval: seconds between snapshots. None takes snapshot.SNAPSHOT_INTERVAL.
+        journal_directory: where every create, move and delete is journaled. On startup the journal is replayed
+        over the restored snapshot. None keeps no journal.
+        shard: number of this worker, which every session id it hands out carries. None keeps the current one.
+        compress_min_size: replies at least this many bytes long are gzip or deflate compressed for clients that
+        accept it
+        compress_level: zlib level to compress with. 0 turns compression off.
+        games: the games to serve. Defaults to the games that come with pyarcade and those of installed plugins. Each
+        is only imported and built when the first request for it comes in.
+        debug_routes: serve /debug/profile, which lets any client switch on profiling and read code internals, so
+        only for servers no untrusted client can reach
+    """
     app = Flask(__name__)
+    app.json = NegotiatedJSONProvider(app)
     session_manager = SessionManager()
+    if shard is not None:
+        SessionManager.set_shard(shard)
+    games = games if games is not None else default_registry()
+    journal = None
+    journal_sequence = 0
+
+    # The snapshot and journal modules are only imported by apps that keep them, which keeps them out of a cold
+    # start that does not
+    if snapshot_path is not None and os.path.exists(snapshot_path):
+        from pyarcade.snapshot import restore_sessions
+        restore_sessions(snapshot_path, session_manager)
+        journal_sequence = session_manager.active_sessions.journal_sequence
+
+    if journal_directory is not None:
+        from pyarcade.journal import Journal, replay_journal
+        journal = Journal(journal_directory)
+        # Replaying needs the move codecs of plugin games as well
+        games.discover()
+        replay_journal(journal, session_manager, journal_sequence)
+        type(session_manager).journal = journal
+        journal.start()
+        # Registered first so that it runs after the final snapshot and commits whatever that left in the buffer
+        atexit.register(journal.stop)
+        app.extensions["journal"] = journal
+
+    if snapshot_path is not None:
+        from pyarcade.snapshot import SnapshotWriter, SNAPSHOT_INTERVAL
+        if snapshot_interval is None:
+            snapshot_interval = SNAPSHOT_INTERVAL
+        snapshot_writer = SnapshotWriter(snapshot_path, snapshot_interval, session_manager, journal)
+        snapshot_writer.start()
+        # A clean shutdown writes a last snapshot, so only a crash loses the sessions changed since the previous one
+        atexit.register(snapshot_writer.stop)
+        app.extensions["snapshot_writer"] = snapshot_writer
+    metrics = Metrics.singleton()
+    profiler = RequestProfiler(profile_sample_every)
+
+    def main_menu() -> dict:
+        # Built on each call rather than here, since listing the games discovers plugins
+        return {name: f"/game/{name}" for name in games.names()}
+
+    def request_body():
+        """ The request's JSON, or its MessagePack for clients that send that instead, with every array a tuple. """
+        if request.mimetype in MIMETYPES:
+            try:
+                return unpackb(request.get_data())
+            except MessagePackError:
+                abort(400)
+
+        return request.json
+
+    def request_game_name() -> str:
+        game_name = (request.view_args or {}).get("game_name", "")
+        # Unknown game names would give every mistyped URL its own series
+        if game_name and game_name not in games:
+            return "unknown"
+        return game_name
+
+    @app.before_request
+    def start_timer():
+        g.request_start = time.perf_counter()
+        g.profile = profiler.start()
+
+    @app.after_request
+    def record_duration(response):
+        if request.url_rule is not None:
+            metrics.observe_request(request.url_rule.rule, request_game_name(), time.perf_counter() - g.request_start)
+
+        return response
+
+    @app.after_request
+    def compress_reply(response):
+        if response.status_code != 200 or response.direct_passthrough:
+            return response
+
+        # Play replies come out of the reply cache already compressed
+        if "Content-Encoding" in response.headers:
+            response.vary.add("Accept-Encoding")
+            return response
+
+        if compress_level and response.content_length is not None and response.content_length >= compress_min_size:
+            response.vary.add("Accept-Encoding")
+            encoding = negotiate_encoding(request.accept_encodings)
+            if encoding is not None:
+                response.set_data(compress(response.get_data(), encoding, compress_level))
+                response.headers["Content-Encoding"] = encoding
 
-    games = {
-        "mastermind": {
-            "proxy": MastermindGameProxy(game_instance=MastermindGame()),
-            "game_type": MastermindGame,
-            "_json_decoder": json_tuple_decoder,
-            "_tuple_depth": 1
-        },
-        "checkers": {
-            "proxy": CheckersProxy(game_instance=Checkers()),
-            "game_type": Checkers,
-            "_json_decoder": json_tuple_decoder,
-            "_tuple_depth": 2
-        },
-        "minesweeper": {
-            "proxy": MinesweeperProxy(game_instance=MinesweeperGame()),
-            "game_type": MinesweeperGame,
-            "_json_decoder": json_tuple_decoder,
-            "_tuple_depth": 1
-        }
-    }
-
-    main_menu = {"mastermind": "/game/mastermind", "checkers": "/game/checkers", "minesweeper": "/game/minesweeper"}
+        return response
+
+    @app.teardown_request
+    def stop_profile(error):
+        # Teardown runs even if the request raised, so a sampled request always stops its profiler
+        if g.get("profile") is not None:
+            route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+            profiler.stop(g.profile, f"{route} {request_game_name()}".strip())
 
     @app.route("/")
     def home():
-        return {"menu": main_menu}
+        return {"menu": main_menu()}
+
+    @app.route("/metrics", methods=["GET"])
+    def export_metrics():
+        session_counts = session_manager.count_sessions_by_type()
+        live_sessions = {name: session_counts.get(session_type, 0)
+                         for name, session_type in games.session_types().items()}
+
+        return Response(metrics.export(live_sessions), mimetype="text/plain; version=0.0.4")
+
+    if debug_routes:
+        @app.route("/debug/profile", methods=["GET"])
+        def read_profile():
+            report = profiler.report(request.args.get("sort", "cumulative"),
+                                     request.args.get("limit", 25, type=int))
+            return Response(report, mimetype="text/plain")
+
+        @app.route("/debug/profile", methods=["POST"])
+        def update_profile():
+            """ Takes {"sample_every": N} to profile one in N requests, 0 to stop, and optionally "reset": true to
+            drop the stats collected so far.
+            """
+            settings = request_body() or {}
+            sample_every = settings.get("sample_every", profiler.sample_every)
+            if type(sample_every) != int or sample_every < 0 or type(settings.get("reset", False)) != bool:
+                return {"sample_every": profiler.sample_every, "samples": profiler.samples()}, 400
+
+            if settings.get("reset", False):
+                profiler.reset()
+            profiler.enable(sample_every)
+
+            return {"sample_every": profiler.sample_every, "samples": profiler.samples()}
 
     @app.route("/create/<string:game_name>", methods=["POST"])
     def create_game_session(game_name):
         if game_name not in games:
-            return main_menu, 404
+            return main_menu(), 404
 
-        reply = games[game_name]["proxy"].create_game(request.json)
+        reply = games[game_name]["proxy"].create_game(request_body())
         reply["menu"] = build_menu(game_name)
 
         return reply
@@ -52,47 +209,107 @@ def create_app():
     @app.route("/game/<string:game_name>", methods=["GET"])
     def read_game_sessions(game_name):
         if game_name not in games:
-            return main_menu, 404
+            return main_menu(), 404
 
-        active_sessions = session_manager.get_sessions_by_type(games[game_name]["game_type"])
+        active_sessions = session_manager.get_sessions_by_type(games[game_name]["session_type"])
         return {"menu": build_menu(game_name), "active_sessions": active_sessions}
 
     @app.route("/play/<string:game_name>", methods=["GET"])
     def play_game_session(game_name):
         if game_name not in games:
-            return main_menu, 404
+            return main_menu(), 404
 
-        reply = games[game_name]["proxy"].read_game(request.json)
-        reply["menu"] = build_menu(game_name)
+        proxy = games[game_name]["proxy"]
+        play_request = request_body()
+        if not proxy.valid_read_request(play_request):
+            return {"session_id": 0, "menu": build_menu(game_name)}
 
-        return reply
+        def build_reply() -> EncodedBody:
+            reply = proxy.game_instance.read_game(play_request)
+            reply["menu"] = build_menu(game_name)
+            return EncodedBody(app.json.serialize(reply, mimetype))
+
+        session = session_manager.get_session_by_id(play_request["session_id"])
+        since_index = play_request.get("since_index", 0)
+        mimetype = negotiate_mimetype(request.accept_mimetypes)
+        encoding = negotiate_encoding(request.accept_encodings) if compress_level else None
+
+        def etags(version: int) -> tuple:
+            # MessagePack and compressed replies are other representations, each with its own ETag
+            etag = f"{game_name}-{session.get_id()}-{version}-{since_index}"
+            if mimetype in MIMETYPES:
+                etag += "-msgpack"
+            return etag, f"{etag}-{encoding}" if encoding is not None else etag
+
+        # The version changes with every move, so a poller holding the current ETag gets a 304 without the game
+        # being read or anything serialized
+        etag, encoded_etag = etags(session.get_version())
+        if request.if_none_match.contains(etag) or request.if_none_match.contains(encoded_etag):
+            response = Response(status=304)
+            response.set_etag(etag if request.if_none_match.contains(etag) else encoded_etag)
+        else:
+            # Reads far outnumber moves, so the serialized reply, and each compressed form of it, is kept until
+            # the session next changes. Its ETag comes from the version it was built from, which a move made in
+            # the meantime has already left behind.
+            version, reply = session.cached_reply((game_name, since_index, mimetype), build_reply)
+            etag, encoded_etag = etags(version)
+            if encoding is not None and len(reply.body) >= compress_min_size:
+                response = Response(reply.encoded(encoding, compress_level), mimetype=mimetype)
+                response.headers["Content-Encoding"] = encoding
+                response.set_etag(encoded_etag)
+            else:
+                response = Response(reply.body, mimetype=mimetype)
+                response.set_etag(etag)
+
+        # Clients may keep the reply but must check it is still current before using it
+        response.headers["Cache-Control"] = "no-cache"
+        response.vary.add("Accept")
+        return response
 
     @app.route("/update/<string:game_name>", methods=["POST"])
     def update_game_session(game_name):
         if game_name not in games:
-            return main_menu, 404
+            return main_menu(), 404
 
         game = games[game_name]
-        update = game["_json_decoder"](request.json, game["_tuple_depth"])
+        update = request_body()
+        # MessagePack arrays already arrive as tuples
+        if request.mimetype not in MIMETYPES:
+            update = game["_json_decoder"](update, game["_tuple_depth"])
 
         reply = games[game_name]["proxy"].update_game(update)
         reply["menu"] = build_menu(game_name)
 
         return reply
 
+    @app.route("/hint/<string:game_name>", methods=["GET"])
+    def hint_game_session(game_name):
+        if game_name not in games or not games[game_name]["_hints"]:
+            return main_menu(), 404
+
+        reply = games[game_name]["proxy"].hint_game(request_body())
+        reply["menu"] = build_menu(game_name)
+
+        return reply
+
     @app.route("/delete/<string:game_name>", methods=["POST"])
     def delete_game_session(game_name):
         if game_name not in games:
-            return main_menu, 404
+            return main_menu(), 404
 
-        reply = games[game_name]["proxy"].delete_game(request.json)
+        reply = games[game_name]["proxy"].delete_game(request_body())
         reply["menu"] = build_menu(game_name)
 
         return reply
 
     def build_menu(game_name: str) -> dict:
-        return {"home": "/", "create": f"/create/{game_name}", "play": f"/play/{game_name}",
+        menu = {"home": "/", "create": f"/create/{game_name}", "play": f"/play/{game_name}",
                 "delete": f"/delete/{game_name}",
                 "update": f"/update/{game_name}"}
 
+        if games[game_name]["_hints"]:
+            menu["hint"] = f"/hint/{game_name}"
+
+        return menu
+
     return app
@@ -0,0 +1,97 @@
+from collections import deque
+from threading import Event, Lock, Thread
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class BoardPool:
+    """ A pool of ready-made initial game states that a game's create_game can pop from instead of building
+    a new state inside the request.
+
+    Note:
+        A background thread refills the pool up to high_water whenever a pop leaves fewer than low_water states.
+        The thread is only started on the first pop, so a pool that is never used costs nothing. If the pool is
+        empty, pop falls back to building the state inline. A refill that fails is logged and the thread waits for
+        the next pop to try again.
+    """
+    LOW_WATER = 8
+    HIGH_WATER = 32
+
+    def __init__(self, factory, low_water: int = LOW_WATER, high_water: int = HIGH_WATER, batch_factory=None):
+        """
+        Args:
+            factory: callable taking no arguments that builds a single initial game state
+            low_water: refill is triggered once fewer than this many states are left
+            high_water: refill stops once this many states are ready
+            batch_factory: optional callable taking a count and returning that many initial game states. When given,
+            refills use it so the states can be built in parallel.
+        """
+        self.factory = factory
+        self.batch_factory = batch_factory
+        self.low_water = low_water
+        self.high_water = high_water
+        self.boards = deque()
+        self._refill_needed = Event()
+        self._start_lock = Lock()
+        self._worker = None
+        self._running = False
+
+    def size(self) -> int:
+        return len(self.boards)
+
+    def pop(self):
+        """
+        Returns: A ready-made initial state, or a freshly built one if the pool has run dry.
+        """
+        self.start()
+
+        try:
+            board = self.boards.popleft()
+        except IndexError:
+            board = None
+
+        if len(self.boards) < self.low_water:
+            self._refill_needed.set()
+
+        if board is None:
+            return self.factory()
+
+        return board
+
+    def fill(self):
+        if self.batch_factory is not None and len(self.boards) < self.high_water:
+            self.boards.extend(self.batch_factory(self.high_water - len(self.boards)))
+
+        while len(self.boards) < self.high_water:
+            self.boards.append(self.factory())
+
+    def start(self):
+        with self._start_lock:
+            if self._worker is not None:
+                return
+
+            self._running = True
+            self._worker = Thread(target=self._refill_loop, name="board-pool-refill", daemon=True)
+            self._worker.start()
+
+    def stop(self):
+        with self._start_lock:
+            if self._worker is None:
+                return
+
+            self._running = False
+            self._refill_needed.set()
+            self._worker.join()
+            self._worker = None
+
+    def _refill_loop(self):
+        while self._running:
+            self._refill_needed.wait()
+            self._refill_needed.clear()
+
+            if self._running:
+                try:
+                    self.fill()
+                except Exception:
+                    logger.exception("board pool refill failed, retrying on the next pop")
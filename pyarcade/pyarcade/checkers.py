@@ -1,12 +1,24 @@
 from pyarcade.game_interface import GameInterface
 from pyarcade.session_manager import SessionManager
 from pyarcade.checkers_board import CheckerBoard
+from pyarcade.board_pool import BoardPool
 
 
 class Checkers(GameInterface):
 
-    def __init__(self):
+    def __init__(self, board_pool: BoardPool = None):
+        """
+        Args:
+            board_pool: Optional pool of pre-built CheckerBoards. Without one every create builds its board inline.
+        """
         self.session_manager = SessionManager.singleton()
+        self.board_pool = board_pool
+
+    def new_board(self) -> CheckerBoard:
+        if self.board_pool is None:
+            return CheckerBoard()
+
+        return self.board_pool.pop()
 
     def create_game(self, request: dict) -> dict:
         """
@@ -19,7 +31,7 @@ class Checkers(GameInterface):
                 integer unique to all ongoing game sessions.
 
             """
-        return self.session_manager.init_checkers_session(CheckerBoard())
+        return self.session_manager.init_checkers_session(self.new_board())
 
     def read_game(self, request: dict) -> dict:
         """
@@ -53,14 +65,17 @@ class Checkers(GameInterface):
 
         origin, dest = request["move"]
 
-        jumped_pieces = game.get_jumped_pieces(origin, dest)
-        game.remove_pieces(jumped_pieces)
-        game.move_piece_to(origin, dest)
-
-        if game.is_a_winner():
-            session.set_to_done()
-        else:
-            game.swap_turn()
+        with session.lock():
+            jumped_pieces = game.get_jumped_pieces(origin, dest)
+            game.remove_pieces(jumped_pieces)
+            game.move_piece_to(origin, dest)
+
+            if game.is_a_winner():
+                session.set_to_done()
+            else:
+                game.swap_turn()
+            session.changed()
+            self.session_manager.journal_move(session, (origin, dest))
 
         return session.to_json()
 
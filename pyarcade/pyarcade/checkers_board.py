@@ -38,6 +38,15 @@ class CheckerBoard:
         self._cache_valid_moves = {}
         self.turn = "RED"
 
+    def __getstate__(self) -> dict:
+        # Validating a move fills the cache without the session's lock, so it is left out of snapshots and filled
+        # again by the next validation
+        return {key: value for key, value in self.__dict__.items() if key != "_cache_valid_moves"}
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self._cache_valid_moves = {}
+
     def setup_board(self):
         self.board = [[EmptyPiece(row, col) for col in range(10)] for row in range(10)]
         self.place_game_pieces()
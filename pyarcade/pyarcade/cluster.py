@@ -0,0 +1,425 @@
+"""Runs the app as one worker process per core behind a dispatcher that routes each request to its session's worker.
+
+Run from the pyarcade directory:
+    python -m pyarcade.cluster [--host 127.0.0.1] [--port 5000] [--workers 4] [--data-directory data]
+
+Worker n serves create_app(shard=n) on a Unix socket and is the only process that ever touches the sessions of
+shard n, so game state has a single writer. The dispatcher reads the session id of each request, takes the shard
+from it and forwards the request over that worker's socket. Requests without a session id, such as creates, go to
+the workers in turn, except listings of sessions under /game, which are sent to every worker and merged. Any
+request can be sent to a given worker by adding ?shard=n. /metrics and /debug/profile (with --debug-routes) describe
+a single worker and are rejected without it. A worker that exits is started again, recovering its sessions from its
+snapshot and journal when there is a data directory.
+"""
+from argparse import ArgumentParser
+from http.client import HTTPConnection, HTTPException
+from itertools import count
+from queue import Queue
+from threading import Event, Thread
+from urllib.parse import parse_qsl
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import tempfile
+import time
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from pyarcade.app import create_app
+from pyarcade.game_registry import default_registry
+from pyarcade.msgpack_codec import MessagePackError, packb, unpackb, MIMETYPES
+from pyarcade.session_ids import shard_of, MAX_SHARD
+
+logger = logging.getLogger(__name__)
+
+# Persistent connections the dispatcher keeps to each worker. A worker serves one connection at a time, so more
+# would only wait behind each other inside the worker instead of inside the dispatcher.
+CONNECTIONS_PER_WORKER = 1
+
+# Seconds to wait for every worker to start listening
+START_TIMEOUT = 30.0
+
+# Seconds the dispatcher waits on a worker's socket before giving up on the request
+WORKER_TIMEOUT = 30.0
+
+# Seconds between checks that every worker is still running
+MONITOR_INTERVAL = 0.5
+
+# Requests a worker may have applied before dropping the connection are only sent again if repeating them is harmless
+IDEMPOTENT_METHODS = {"GET", "HEAD"}
+
+# Paths listing sessions, which are sent to every worker when no ?shard=n is given and the listings merged
+FAN_OUT_PATHS = ("/game/",)
+
+# Paths describing a single worker, which need a ?shard=n
+PER_WORKER_PATHS = ("/metrics", "/debug/")
+
+# Headers that only describe a single hop and are not forwarded
+HOP_BY_HOP_HEADERS = {"connection", "keep-alive", "proxy-authenticate", "proxy-authorization", "te", "trailers",
+                      "transfer-encoding", "upgrade", "host", "content-length"}
+
+
+class UnixHTTPConnection(HTTPConnection):
+    def __init__(self, socket_path: str, timeout: float = WORKER_TIMEOUT):
+        HTTPConnection.__init__(self, "localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class WorkerRequestHandler(WSGIRequestHandler):
+    # HTTP/1.1 keeps the dispatcher's connections open between requests
+    protocol_version = "HTTP/1.1"
+
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+class WorkerConnections:
+    """ The dispatcher's pooled connections to one worker. """
+
+    def __init__(self, socket_path: str, size: int = CONNECTIONS_PER_WORKER, timeout: float = WORKER_TIMEOUT):
+        self.socket_path = socket_path
+        self._idle = Queue()
+        for idx in range(size):
+            self._idle.put(UnixHTTPConnection(socket_path, timeout))
+
+    def forward(self, method: str, target: str, headers: dict, body: bytes) -> tuple:
+        """
+        Returns: The worker's (status, reason, headers, body).
+
+        Note:
+            When the worker drops the connection, a GET or HEAD is sent once more on a new one. Any other request is
+            not, since the worker may have applied it before the connection went, and its error is raised instead, as
+            is a timeout.
+        """
+        connection = self._idle.get()
+        try:
+            for attempt in range(2):
+                try:
+                    connection.request(method, target, body=body, headers=headers)
+                    response = connection.getresponse()
+                    return response.status, response.reason, response.getheaders(), response.read()
+                except (OSError, HTTPException) as error:
+                    # Anything the worker still sends for this request must not be read as the reply to the next one
+                    connection.close()
+                    if attempt or method not in IDEMPOTENT_METHODS or isinstance(error, TimeoutError):
+                        raise
+        finally:
+            self._idle.put(connection)
+
+    def reset(self):
+        """ Closes the idle connections, which are opened again by their next request. """
+        with self._idle.mutex:
+            for connection in self._idle.queue:
+                connection.close()
+
+    def close(self):
+        while not self._idle.empty():
+            self._idle.get().close()
+
+
+class Dispatcher:
+    """ WSGI app forwarding every request to the worker that owns its session. """
+
+    def __init__(self, socket_paths: list, connections_per_worker: int = CONNECTIONS_PER_WORKER,
+                 timeout: float = WORKER_TIMEOUT):
+        """
+        Args:
+            socket_paths: the Unix socket of each worker, in shard order
+            connections_per_worker: connections kept open to each worker
+            timeout: seconds to wait on a worker before replying 504
+        """
+        self.workers = [WorkerConnections(path, connections_per_worker, timeout) for path in socket_paths]
+        self._turn = count()
+
+    def requested_shard(self, query: dict) -> int:
+        """
+        Returns: The shard in the request's ?shard=n, or None if it has none or names a shard that does not exist.
+        """
+        shard = query.get("shard", "")
+        if shard.isdigit() and int(shard) < len(self.workers):
+            return int(shard)
+        return None
+
+    def route(self, query: dict, body: bytes, content_type: str = "") -> int:
+        """
+        Returns: The shard a request goes to. That is the shard in its ?shard=n, otherwise the shard of its
+        session id, otherwise the next worker in turn. The session id is read from a MessagePack body if the
+        content type says so, and from JSON otherwise.
+        """
+        shard = self.requested_shard(query)
+        if shard is not None:
+            return shard
+
+        session_id = None
+        if body:
+            try:
+                if content_type.split(";")[0].strip() in MIMETYPES:
+                    session_id = unpackb(body).get("session_id")
+                else:
+                    session_id = json.loads(body).get("session_id")
+            except (ValueError, AttributeError, MessagePackError):
+                pass
+
+        # Ids from a shard that does not exist still go to a worker, which rejects them like any unknown session
+        if type(session_id) == int and session_id > 0:
+            return shard_of(session_id) % len(self.workers)
+
+        return next(self._turn) % len(self.workers)
+
+    def __call__(self, environ: dict, start_response):
+        length = int(environ.get("CONTENT_LENGTH") or 0)
+        body = environ["wsgi.input"].read(length) if length else b""
+        query = dict(parse_qsl(environ.get("QUERY_STRING", "")))
+
+        headers = {key[5:].replace("_", "-").title(): value for key, value in environ.items()
+                   if key.startswith("HTTP_") and key[5:].replace("_", "-").lower() not in HOP_BY_HOP_HEADERS}
+        if environ.get("CONTENT_TYPE"):
+            headers["Content-Type"] = environ["CONTENT_TYPE"]
+
+        target = environ.get("RAW_URI") or environ.get("PATH_INFO", "/")
+        if "RAW_URI" not in environ and environ.get("QUERY_STRING"):
+            target += "?" + environ["QUERY_STRING"]
+
+        method = environ["REQUEST_METHOD"]
+        path = environ.get("PATH_INFO", "/")
+        every_worker = self.requested_shard(query) is None
+        if every_worker and path.startswith(PER_WORKER_PATHS):
+            start_response("400 Bad Request", [("Content-Type", "application/json")])
+            return [json.dumps({"error": f"add ?shard=n to pick a worker, n from 0 to {len(self.workers) - 1}"})
+                    .encode()]
+
+        try:
+            if every_worker and method == "GET" and path.startswith(FAN_OUT_PATHS):
+                status, reason, response_headers, payload = self.fan_out(method, target, headers, body)
+            else:
+                worker = self.workers[self.route(query, body, environ.get("CONTENT_TYPE", ""))]
+                status, reason, response_headers, payload = worker.forward(method, target, headers, body)
+        except TimeoutError:
+            start_response("504 Gateway Timeout", [("Content-Type", "application/json")])
+            return [b'{"error": "worker timed out"}']
+        except (OSError, HTTPException, ValueError, MessagePackError):
+            start_response("502 Bad Gateway", [("Content-Type", "application/json")])
+            return [b'{"error": "worker unavailable"}']
+
+        response_headers = [(key, value) for key, value in response_headers
+                            if key.lower() not in HOP_BY_HOP_HEADERS]
+        response_headers.append(("Content-Length", str(len(payload))))
+        start_response(f"{status} {reason}", response_headers)
+        return [payload]
+
+    def fan_out(self, method: str, target: str, headers: dict, body: bytes) -> tuple:
+        """
+        Returns: The (status, reason, headers, body) of the request sent to every worker, with the dictionaries in
+        their replies merged, or the first reply that is not a 200.
+
+        Note:
+            The replies are asked for uncompressed so they can be merged, and the merged reply is encoded the way the
+            workers encoded theirs.
+        """
+        headers = {key: value for key, value in headers.items() if key.lower() != "accept-encoding"}
+        replies = [worker.forward(method, target, headers, body) for worker in self.workers]
+        for reply in replies:
+            if reply[0] != 200:
+                return reply
+
+        status, reason, response_headers, payload = replies[0]
+        content_type = next((value for key, value in response_headers if key.lower() == "content-type"), "")
+        is_msgpack = content_type.split(";")[0].strip() in MIMETYPES
+        merged = unpackb(payload) if is_msgpack else json.loads(payload)
+
+        for reply in replies[1:]:
+            for key, value in (unpackb(reply[3]) if is_msgpack else json.loads(reply[3])).items():
+                if isinstance(value, dict):
+                    merged[key].update(value)
+
+        return status, reason, response_headers, packb(merged) if is_msgpack else json.dumps(merged).encode()
+
+    def close(self):
+        for worker in self.workers:
+            worker.close()
+
+
+def stop_on_terminate(signal_number, frame):
+    sys.exit(0)
+
+
+def serve_worker(shard: int, socket_path: str, app_options: dict):
+    """
+    Args:
+        shard: the worker's shard number
+        socket_path: Unix socket to serve on
+        app_options: keyword arguments for create_app
+    """
+    signal.signal(signal.SIGTERM, stop_on_terminate)
+    app = create_app(shard=shard, **app_options)
+    server = make_server(f"unix://{socket_path}", 0, app, request_handler=WorkerRequestHandler)
+
+    try:
+        server.serve_forever()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        server.server_close()
+        # Worker processes leave without running atexit, so the final snapshot and commit are made here
+        for extension in ("snapshot_writer", "journal"):
+            if extension in app.extensions:
+                app.extensions[extension].stop()
+
+
+def worker_options(shard: int, data_directory: str, debug_routes: bool = False) -> dict:
+    """
+    Returns: The create_app arguments giving the shard its own snapshot and journal in data_directory, and the
+    debug routes if asked for.
+    """
+    options = {"debug_routes": debug_routes}
+    if data_directory is not None:
+        options["snapshot_path"] = os.path.join(data_directory, f"shard-{shard}.snapshot")
+        options["journal_directory"] = os.path.join(data_directory, f"shard-{shard}-journal")
+    return options
+
+
+class Cluster:
+    """ Forks the worker processes and builds the dispatcher in front of them.
+
+    Note:
+        The workers are forked from this process after the app's modules and every game are imported, so they start
+        without importing anything again and share those pages with the parent until they write to them. A monitor
+        thread forks a worker again whenever one exits.
+    """
+
+    def __init__(self, workers: int = None, socket_directory: str = None, data_directory: str = None,
+                 debug_routes: bool = False):
+        """
+        Args:
+            workers: number of worker processes, at most MAX_SHARD + 1. Defaults to one per core, up to that.
+            socket_directory: where the workers' sockets go. Defaults to a new temporary directory.
+            data_directory: where each shard keeps its snapshot and journal. None keeps sessions in memory only.
+            debug_routes: have the workers serve /debug/profile
+        """
+        self.worker_count = workers or min(os.cpu_count() or 1, MAX_SHARD + 1)
+        if not 1 <= self.worker_count <= MAX_SHARD + 1:
+            raise ValueError(f"workers must be from 1 to {MAX_SHARD + 1}, not {self.worker_count}")
+        self.socket_directory = socket_directory or tempfile.mkdtemp(prefix="pyarcade-")
+        self.data_directory = data_directory
+        self.debug_routes = debug_routes
+        self.socket_paths = [os.path.join(self.socket_directory, f"shard-{shard}.sock")
+                             for shard in range(self.worker_count)]
+        self.processes = []
+        self.dispatcher = None
+        self._stopping = Event()
+        self._monitor = None
+
+    def start_worker(self, shard: int):
+        """
+        Returns: The started process of the shard's worker.
+        """
+        socket_path = self.socket_paths[shard]
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+        options = worker_options(shard, self.data_directory, self.debug_routes)
+        process = multiprocessing.get_context("fork").Process(target=serve_worker, name=f"pyarcade-shard-{shard}",
+                                                              daemon=True, args=(shard, socket_path, options))
+        process.start()
+        return process
+
+    def start(self) -> Dispatcher:
+        """
+        Returns: The dispatcher, once every worker is listening.
+        """
+        # Games are otherwise only imported by their first request, which every worker would then repeat
+        default_registry().load_all()
+
+        self.processes = [self.start_worker(shard) for shard in range(self.worker_count)]
+
+        deadline = time.monotonic() + START_TIMEOUT
+        while not all(os.path.exists(path) for path in self.socket_paths):
+            if time.monotonic() > deadline or not all(process.is_alive() for process in self.processes):
+                self.stop()
+                raise RuntimeError("pyarcade workers failed to start")
+            time.sleep(0.01)
+
+        self.dispatcher = Dispatcher(self.socket_paths)
+        self._stopping.clear()
+        self._monitor = Thread(target=self._monitor_loop, name="pyarcade-cluster-monitor", daemon=True)
+        self._monitor.start()
+        return self.dispatcher
+
+    def restart_exited_workers(self) -> list:
+        """
+        Returns: The shards whose worker had exited and was started again.
+        """
+        restarted = []
+        for shard, process in enumerate(self.processes):
+            if not process.is_alive():
+                logger.warning("pyarcade worker %d exited with code %s, starting it again", shard, process.exitcode)
+                process.join()
+                self.processes[shard] = self.start_worker(shard)
+                restarted.append(shard)
+
+        return restarted
+
+    def _monitor_loop(self):
+        while not self._stopping.wait(MONITOR_INTERVAL):
+            for shard in self.restart_exited_workers():
+                # Connections to the old worker would fail their next request, which is lost if it is not a GET
+                self.dispatcher.workers[shard].reset()
+
+    def stop(self):
+        self._stopping.set()
+        if self._monitor is not None:
+            self._monitor.join()
+            self._monitor = None
+
+        if self.dispatcher is not None:
+            self.dispatcher.close()
+            self.dispatcher = None
+
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            process.join()
+        self.processes = []
+
+        for socket_path in self.socket_paths:
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, defaults to one per core")
+    parser.add_argument("--socket-directory", default=None, help="where the workers' Unix sockets go")
+    parser.add_argument("--data-directory", default=None,
+                        help="where each shard keeps its snapshot and journal, omit to keep sessions in memory only")
+    parser.add_argument("--debug-routes", action="store_true",
+                        help="serve /debug/profile, only for servers no untrusted client can reach")
+    args = parser.parse_args()
+
+    cluster = Cluster(args.workers, args.socket_directory, args.data_directory, args.debug_routes)
+    server = make_server(args.host, args.port, cluster.start(), threaded=True)
+    signal.signal(signal.SIGTERM, stop_on_terminate)
+    print(f"pyarcade serving {cluster.worker_count} workers on http://{args.host}:{args.port}")
+
+    try:
+        server.serve_forever()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        server.server_close()
+        cluster.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import zlib
+
+# Replies shorter than this are sent as they are. Below about a kilobyte the saving is a few hundred bytes at most.
+COMPRESS_MIN_SIZE = 1024
+# zlib level, 1 is fastest and 9 smallest. Boards are repetitive enough that 6 gets close to 9.
+COMPRESS_LEVEL = 6
+
+# Encodings offered, in the order preferred when a client accepts several equally
+ENCODINGS = ("gzip", "deflate")
+WBITS = {"gzip": 16 + zlib.MAX_WBITS, "deflate": zlib.MAX_WBITS}
+
+
+def compress(body: bytes, encoding: str, level: int = COMPRESS_LEVEL) -> bytes:
+    """
+    Args:
+        body: bytes to compress
+        encoding: "gzip" or "deflate". HTTP's deflate is the zlib format, not a raw deflate stream.
+        level: zlib compression level
+
+    Returns: The body in that Content-Encoding.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, WBITS[encoding])
+    return compressor.compress(body) + compressor.flush()
+
+
+def negotiate_encoding(accept_encodings) -> str:
+    """
+    Args:
+        accept_encodings: the request's parsed Accept-Encoding header
+
+    Returns: The encoding to compress the reply with, or None to send it as it is.
+    """
+    return accept_encodings.best_match(ENCODINGS)
+
+
+class EncodedBody:
+    """ A serialized reply and its compressed forms, each compressed the first time it is asked for. """
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self._encoded = {}
+
+    def encoded(self, encoding: str, level: int = COMPRESS_LEVEL) -> bytes:
+        body = self._encoded.get(encoding)
+        if body is None:
+            body = self._encoded[encoding] = compress(self.body, encoding, level)
+        return body
@@ -1,3 +1,9 @@
+# Games from plugins declare their own ids in their GameRegistration, which must not clash with these
 MASTERMIND_ID = 0
 CHECKERS_ID = 1
 MINESWEEPER_ID = 2
+
+# The standard mastermind game, 4 unique digits from 0-9. Kept here so sessions can default to it without importing
+# mastermind_scores, which builds every sequence of the game when it is imported.
+CODE_LENGTH = 4
+ALPHABET_SIZE = 10
@@ -39,6 +39,18 @@ class GameInterface:
         """
         raise NotImplementedError
 
+    def hint_game(self, request: dict) -> dict:
+        """
+        Args:
+            request: dictionary containing single key-value pair. The key is "session_id". The value is a
+            integer unique to all ongoing game sessions.
+
+        Returns:
+            reply: dictionary describing moves the player can make with certainty. Games without hints leave this
+            unimplemented.
+        """
+        raise NotImplementedError
+
     def delete_game(self, request: dict) -> dict:
         """
         Args:
@@ -0,0 +1,209 @@
+from threading import Lock
+from typing import TYPE_CHECKING
+import warnings
+
+from pyarcade.game_ids import *
+from pyarcade.json_decoders import json_tuple_decoder
+from pyarcade.session_manager import MastermindSession, CheckerSession, MinesweeperSession
+
+# The journal and snapshot are only imported by apps that keep them, or to register a plugin's serializers
+if TYPE_CHECKING:
+    from pyarcade.journal import MoveCodec
+
+# Entry point group games from other packages are registered under. Each entry point names a GameRegistration,
+# for example in a plugin's pyproject.toml:
+#
+#     [project.entry-points."pyarcade.games"]
+#     tictactoe = "pyarcade_tictactoe.registration:TICTACTOE"
+#
+# The module it is in should only import what the registration itself needs, leaving the engine to its load.
+ENTRY_POINT_GROUP = "pyarcade.games"
+
+
+def load_mastermind():
+    from pyarcade.mastermind import MastermindGame
+    from pyarcade.proxy import MastermindGameProxy
+
+    return MastermindGameProxy(game_instance=MastermindGame())
+
+
+def load_checkers():
+    from pyarcade.board_pool import BoardPool
+    from pyarcade.checkers import Checkers
+    from pyarcade.checkers_board import CheckerBoard
+    from pyarcade.proxy import CheckersProxy
+
+    return CheckersProxy(game_instance=Checkers(board_pool=BoardPool(CheckerBoard)))
+
+
+def load_minesweeper():
+    from pyarcade.minesweeper import MinesweeperGame
+    from pyarcade.minesweeper_no_guess import NoGuessBoardPool
+    from pyarcade.proxy import MinesweeperProxy
+
+    return MinesweeperProxy(game_instance=MinesweeperGame(no_guess_pool=NoGuessBoardPool()))
+
+
+class GameRegistration:
+    """ Everything the app needs to know about a game before it is loaded, and how to load it. """
+
+    def __init__(self, name: str, game_id: int, session_type: type, load, tuple_depth: int = 1, hints: bool = False,
+                 json_decoder=json_tuple_decoder, session_kind: int = None, move_codec: "MoveCodec" = None):
+        """
+        Args:
+            name: name of the game in the app's routes
+            game_id: the "game_id" its create requests carry
+            session_type: the Session subclass its sessions are
+            load: callable taking no arguments that imports the game and returns its proxy
+            tuple_depth: how deep json_decoder turns the lists of an update into tuples
+            hints: whether the game answers hint requests
+            json_decoder: turns the JSON of an update request into what the proxy expects
+            session_kind: number from 1 to 127 the snapshot stores the game's sessions under. The games that come
+            with pyarcade already have theirs.
+            move_codec: how the game's moves are journaled and replayed. Needed to run a game with a journal.
+        """
+        self.name = name
+        self.game_id = game_id
+        self.session_type = session_type
+        self.load = load
+        self.tuple_depth = tuple_depth
+        self.hints = hints
+        self.json_decoder = json_decoder
+        self.session_kind = session_kind
+        self.move_codec = move_codec
+
+
+class GameRegistry:
+    """ The games an app serves, each imported and built the first time a request needs it.
+
+    Note:
+        Looking a game up by name loads it if it is not loaded yet, and gives the same entry as create_app's games
+        dict always did. Checking whether a game exists, listing the games and reading their session types never
+        load anything, so neither startup nor /metrics pays for games nobody has played yet.
+
+        With an entry point group, the games of installed plugins are only discovered once something asks about a
+        game that is not registered yet, or for the list of every game. Requests for the registered games never
+        read package metadata. A plugin that fails to load or clashes with a registered game is skipped with a
+        warning.
+    """
+
+    def __init__(self, registrations: tuple = (), entry_point_group: str = None):
+        """
+        Args:
+            registrations: the games to start with
+            entry_point_group: entry point group to discover more games in. None only serves registrations.
+        """
+        self.entry_point_group = entry_point_group
+        self._registrations = {}
+        self._loaded = {}
+        self._lock = Lock()
+        self._discover_lock = Lock()
+        self._discovered = entry_point_group is None
+        for registration in registrations:
+            self.register(registration)
+
+    def register(self, registration: GameRegistration):
+        if not isinstance(registration, GameRegistration):
+            raise TypeError(f"expected a GameRegistration, not {type(registration).__name__}")
+
+        for other in self._registrations.values():
+            if other.name == registration.name or other.game_id == registration.game_id:
+                raise ValueError(f"{registration.name} ({registration.game_id}) clashes with registered game "
+                                 f"{other.name} ({other.game_id})")
+
+        if registration.session_kind is not None:
+            from pyarcade.snapshot import register_session_kind
+            register_session_kind(registration.session_type, registration.session_kind)
+        if registration.move_codec is not None:
+            from pyarcade.journal import register_move_codec
+            register_move_codec(registration.session_type, registration.move_codec)
+        self._registrations[registration.name] = registration
+
+    def discover(self):
+        """ Registers the games of every installed plugin, the first time it is called. """
+        if self._discovered:
+            return
+
+        with self._discover_lock:
+            if self._discovered:
+                return
+
+            # Reading package metadata takes a while, so it is only imported once it is needed
+            from importlib.metadata import entry_points
+
+            for entry_point in entry_points(group=self.entry_point_group):
+                try:
+                    self.register(entry_point.load())
+                except Exception as error:
+                    warnings.warn(f"skipping game plugin {entry_point.name} ({entry_point.value}): {error}")
+
+            self._discovered = True
+
+    def __contains__(self, name) -> bool:
+        if name not in self._registrations:
+            self.discover()
+        return name in self._registrations
+
+    def __getitem__(self, name: str) -> dict:
+        entry = self._loaded.get(name)
+        if entry is None:
+            entry = self.load(name)
+        return entry
+
+    def load(self, name: str) -> dict:
+        """
+        Returns: The game's entry, with its proxy, game type, session type, JSON decoder, tuple depth and whether it
+        has hints. Raises KeyError for a game that is not registered.
+        """
+        registration = self.registration(name)
+        with self._lock:
+            if name not in self._loaded:
+                proxy = registration.load()
+                self._loaded[name] = {
+                    "proxy": proxy,
+                    "game_type": type(proxy.game_instance),
+                    "session_type": registration.session_type,
+                    "_json_decoder": registration.json_decoder,
+                    "_tuple_depth": registration.tuple_depth,
+                    "_hints": registration.hints
+                }
+
+            return self._loaded[name]
+
+    def load_all(self):
+        for name in self.names():
+            self.load(name)
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._loaded
+
+    def names(self) -> list:
+        self.discover()
+        return list(self._registrations)
+
+    def registration(self, name: str) -> GameRegistration:
+        if name not in self._registrations:
+            self.discover()
+        return self._registrations[name]
+
+    def session_types(self) -> dict:
+        """
+        Returns: The session type of every game by name.
+        """
+        self.discover()
+        return {name: registration.session_type for name, registration in self._registrations.items()}
+
+
+DEFAULT_GAMES = (
+    GameRegistration("mastermind", MASTERMIND_ID, MastermindSession, load_mastermind, tuple_depth=1, hints=True),
+    GameRegistration("checkers", CHECKERS_ID, CheckerSession, load_checkers, tuple_depth=2, hints=False),
+    GameRegistration("minesweeper", MINESWEEPER_ID, MinesweeperSession, load_minesweeper, tuple_depth=1, hints=True)
+)
+
+
+def default_registry() -> GameRegistry:
+    """
+    Returns: A new registry of the games that come with pyarcade and those of installed plugins, none of them loaded
+    or discovered yet.
+    """
+    return GameRegistry(DEFAULT_GAMES, ENTRY_POINT_GROUP)
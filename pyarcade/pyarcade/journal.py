@@ -0,0 +1,448 @@
+from threading import Condition, Event, Lock, Thread
+import logging
+import os
+import struct
+import sys
+import zlib
+
+from pyarcade.session_manager import Session, SessionManager, MastermindSession, CheckerSession, advance_session_ids, \
+    MinesweeperSession
+from pyarcade.snapshot import encode_session, decode_session
+
+logger = logging.getLogger(__name__)
+
+# Every record is a header followed by its payload, all little-endian:
+#
+#     crc32 of everything after it (I), sequence (Q), session id (Q), record type (B), payload length (I)
+#
+# Sequences count up by one across the whole journal. The journal is split into segments, each named after the
+# sequence of its first record, and a new one is started every time a snapshot is taken so that the segments the
+# snapshot covers can be removed whole. A crash can leave a torn record at the end of a segment. Its crc fails and
+# reading carries on from the next segment.
+CHECKSUM = struct.Struct("<I")
+RECORD = struct.Struct("<QQBI")
+CREATE = 1
+MOVE = 2
+DELETE = 3
+
+SEGMENT_PREFIX = "journal-"
+SEGMENT_SUFFIX = ".log"
+
+# Seconds between group commits
+COMMIT_INTERVAL = 0.01
+
+MINESWEEPER_ACTIONS = ("unhide_cell", "flag_cell")
+
+
+class JournalError(Exception):
+    pass
+
+
+class MoveCodec:
+    """ How the moves of one session type are packed into journal records and played back from them.
+
+    Note:
+        Moves are played back through the game's update_game, on an engine of the codec's own that has no board
+        pools, since a pooled board would not be the one the session was given.
+    """
+
+    def __init__(self):
+        self._game = None
+
+    def game(self):
+        if self._game is None:
+            self._game = self.new_game()
+        return self._game
+
+    def new_game(self):
+        raise NotImplementedError
+
+    def encode(self, session: Session, move) -> bytes:
+        """
+        Args:
+            session: the session the move was made in
+            move: the move as the game's update_game received it
+
+        Returns: The move packed into a few bytes.
+        """
+        raise NotImplementedError
+
+    def replay(self, session: Session, payload: bytes):
+        """ Makes the move again on the session. """
+        raise NotImplementedError
+
+
+class MastermindMoveCodec(MoveCodec):
+    def new_game(self):
+        from pyarcade.mastermind import MastermindGame
+        return MastermindGame()
+
+    def encode(self, session: MastermindSession, move) -> bytes:
+        return bytes(move)
+
+    def replay(self, session: MastermindSession, payload: bytes):
+        # A since_index past the end keeps each replayed reply from listing every guess
+        self.game().update_game({"session_id": session.get_id(), "guess": tuple(payload), "since_index": sys.maxsize})
+
+
+class CheckersMoveCodec(MoveCodec):
+    def new_game(self):
+        from pyarcade.checkers import Checkers
+        return Checkers()
+
+    def encode(self, session: CheckerSession, move) -> bytes:
+        origin, dest = move
+        return bytes((*origin, *dest))
+
+    def replay(self, session: CheckerSession, payload: bytes):
+        origin, dest = tuple(payload[:2]), tuple(payload[2:4])
+        # The proxy's validation is what fills the jump cache update_game reads
+        session.get_game().get_valid_moves(session.get_game().get_piece_at(*origin))
+        self.game().update_game({"session_id": session.get_id(), "move": (origin, dest)})
+
+
+class MinesweeperMoveCodec(MoveCodec):
+    def new_game(self):
+        from pyarcade.minesweeper import MinesweeperGame
+        return MinesweeperGame()
+
+    def encode(self, session: MinesweeperSession, move) -> bytes:
+        # The seed goes with every move, since the first unhide can swap it for the seed of a pooled board
+        action, location = move
+        seed = session.get_seed()
+        return bytes((MINESWEEPER_ACTIONS.index(action), *location)) + seed.to_bytes(seed.bit_length() // 8 + 1,
+                                                                                     "little")
+
+    def replay(self, session: MinesweeperSession, payload: bytes):
+        session.seed = int.from_bytes(payload[3:], "little")
+        self.game().update_game({"session_id": session.get_id(), MINESWEEPER_ACTIONS[payload[0]]: tuple(payload[1:3])})
+
+
+MOVE_CODECS = {MastermindSession: MastermindMoveCodec(), CheckerSession: CheckersMoveCodec(),
+               MinesweeperSession: MinesweeperMoveCodec()}
+
+
+def register_move_codec(session_type: type, codec: MoveCodec):
+    """ Lets the sessions of a game from a plugin be journaled. """
+    if MOVE_CODECS.get(session_type, codec) is not codec:
+        raise JournalError(f"{session_type.__name__} already has a move codec")
+    MOVE_CODECS[session_type] = codec
+
+
+def encode_move(session: Session, move) -> bytes:
+    """
+    Args:
+        session: the session the move was made in
+        move: the move as the game's update_game received it
+
+    Returns: The move packed into a few bytes by the codec of the session's type.
+    """
+    codec = MOVE_CODECS.get(type(session))
+    if codec is None:
+        raise JournalError(f"cannot journal moves of {type(session).__name__}")
+
+    return codec.encode(session, move)
+
+
+def segment_name(first_sequence: int) -> str:
+    return f"{SEGMENT_PREFIX}{first_sequence:020d}{SEGMENT_SUFFIX}"
+
+
+def read_segment(path: str):
+    """
+    Returns: A generator of (sequence, session_id, record_type, payload, end) for every whole record in the
+    segment, end being where the record stops in the file.
+    """
+    with open(path, "rb") as segment_file:
+        data = segment_file.read()
+
+    position = 0
+    while position + CHECKSUM.size + RECORD.size <= len(data):
+        crc, = CHECKSUM.unpack_from(data, position)
+        sequence, session_id, record_type, length = RECORD.unpack_from(data, position + CHECKSUM.size)
+        start = position + CHECKSUM.size + RECORD.size
+        end = start + length
+        if end > len(data) or zlib.crc32(data[position + CHECKSUM.size:end]) != crc:
+            return
+
+        yield sequence, session_id, record_type, data[start:end], end
+        position = end
+
+
+class Journal:
+    """ An append-only journal of every session created, every move made and every session deleted.
+
+    Note:
+        Appending only copies the record into a buffer. A background thread writes the buffer out and fsyncs it
+        every commit_interval seconds, so a crash loses at most that much play, and a single fsync covers every
+        record appended since the last one. With sync=True each append also waits for the commit covering it.
+        Replaying the journal over the latest snapshot brings every session back to its last committed move.
+
+        A commit that fails, for instance on a full disk, puts its records back in the buffer and the background
+        thread logs the error and tries again. Since part of them may have reached the segment, the retry writes them
+        to a new segment: reading stops at any torn record and skips the ones it has already read. While commits
+        fail, waiting for one raises JournalError as soon as another attempt fails, and appending raises JournalError
+        once the thread is gone.
+    """
+
+    def __init__(self, directory: str, commit_interval: float = COMMIT_INTERVAL, sync: bool = False,
+                 retain_segments: bool = False):
+        """
+        Args:
+            directory: where the segments are kept. Created if it does not exist.
+            commit_interval: seconds between group commits
+            sync: make every append wait until its record is on disk
+            retain_segments: keep the segments a snapshot covers as an audit trail instead of removing them
+        """
+        self.directory = directory
+        self.commit_interval = commit_interval
+        self.sync = sync
+        self.retain_segments = retain_segments
+        os.makedirs(directory, exist_ok=True)
+
+        # Appends take _lock, writes take _write_lock and then _lock just long enough to swap the buffer out
+        self._lock = Lock()
+        self._write_lock = Lock()
+        self._committed = Condition()
+        self._buffer = bytearray()
+        self._sequence = self.recover()
+        self._durable = self._sequence
+        self._file = open(os.path.join(directory, segment_name(self._sequence + 1)), "ab")
+        self._stopped = Event()
+        self._worker = None
+        # Error of the last commit if it failed, None once one succeeds
+        self.error = None
+        self._failures = 0
+
+    def segments(self) -> list:
+        """
+        Returns: (first_sequence, path) of every segment, oldest first.
+        """
+        names = [name for name in os.listdir(self.directory)
+                 if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)]
+        return sorted((int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]), os.path.join(self.directory, name))
+                      for name in names)
+
+    def recover(self) -> int:
+        """
+        Returns: The sequence of the last whole record on disk, or 0 if there is none. A torn record left at the end
+        of the newest segment by a crash is cut off, since records appended after it could never be read.
+        """
+        segments = self.segments()
+        if not segments:
+            return 0
+
+        # Only the newest segment can end in a torn record. Rotating fsyncs a segment before starting the next.
+        first_sequence, path = segments[-1]
+        sequence, end = first_sequence - 1, 0
+        for sequence, session_id, record_type, payload, end in read_segment(path):
+            pass
+
+        if os.path.getsize(path) > end:
+            os.truncate(path, end)
+        return sequence
+
+    def records(self, after_sequence: int = 0):
+        """
+        Returns: A generator of the (sequence, session_id, record_type, payload) of every record after
+        after_sequence, in order. Records a failed commit left in a segment before they were written again in the
+        next are only given once.
+        """
+        segments = self.segments()
+        for idx, (first_sequence, path) in enumerate(segments):
+            if idx + 1 < len(segments) and segments[idx + 1][0] <= after_sequence + 1:
+                continue
+
+            for sequence, session_id, record_type, payload, end in read_segment(path):
+                if sequence > after_sequence:
+                    after_sequence = sequence
+                    yield sequence, session_id, record_type, payload
+
+    def _append(self, session_id: int, record_type: int, payload: bytes) -> int:
+        if self._worker is not None and not self._worker.is_alive():
+            raise JournalError("the journal's commit thread has stopped") from self.error
+
+        with self._lock:
+            self._sequence += 1
+            sequence = self._sequence
+            record = RECORD.pack(sequence, session_id, record_type, len(payload)) + payload
+            self._buffer += CHECKSUM.pack(zlib.crc32(record))
+            self._buffer += record
+
+        if self.sync:
+            self.wait_for(sequence)
+        return sequence
+
+    def append_create(self, session: Session):
+        kind, blob = encode_session(session)
+        session._journal_sequence = self._append(session.get_id(), CREATE, bytes((kind,)) + blob)
+
+    def append_move(self, session: Session, move):
+        session._journal_sequence = self._append(session.get_id(), MOVE, encode_move(session, move))
+
+    def append_delete(self, session_id: int):
+        self._append(session_id, DELETE, b"")
+
+    def commit(self) -> int:
+        """
+        Returns: The last sequence now on disk, after writing and fsyncing everything appended so far.
+        """
+        with self._write_lock:
+            return self._commit()
+
+    def _commit(self) -> int:
+        with self._lock:
+            pending, self._buffer = self._buffer, bytearray()
+            sequence = self._sequence
+
+        if pending:
+            try:
+                if self.error is not None:
+                    self._start_segment(self._durable + 1)
+                self._file.write(pending)
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            except OSError as error:
+                with self._lock:
+                    self._buffer[:0] = pending
+                with self._committed:
+                    self.error = error
+                    self._failures += 1
+                    self._committed.notify_all()
+                raise
+
+        with self._committed:
+            self._durable = sequence
+            self.error = None
+            self._committed.notify_all()
+        return sequence
+
+    def _start_segment(self, first_sequence: int):
+        """ Moves on to a new segment for the records from first_sequence on, after a failed commit. """
+        path = os.path.join(self.directory, segment_name(first_sequence))
+        try:
+            # Closing flushes what the failed write left buffered, which the new segment has again anyway
+            self._file.close()
+        except OSError:
+            pass
+
+        # A segment named after the first uncommitted record has nothing committed in it, so it can start over
+        self._file = open(path, "wb" if path == self._file.name else "ab")
+
+    def wait_for(self, sequence: int):
+        """ Blocks until the record with this sequence is on disk. """
+        if self._worker is None:
+            # Nothing else is going to commit it
+            self.commit()
+            return
+
+        with self._committed:
+            failures = self._failures
+            while self._durable < sequence:
+                if self._failures != failures:
+                    raise JournalError(f"record {sequence} could not be committed") from self.error
+                self._committed.wait(self.commit_interval)
+
+    def rotate(self) -> int:
+        """
+        Returns: The last sequence in the segments before the one this starts. Everything appended from here on goes
+        in the new segment.
+        """
+        with self._write_lock:
+            sequence = self._commit()
+            # Records appended since the commit are still in the buffer and go to the new segment
+            self._file.close()
+            self._file = open(os.path.join(self.directory, segment_name(sequence + 1)), "ab")
+
+        return sequence
+
+    def discard_through(self, sequence: int) -> int:
+        """
+        Returns: The number of segments removed. A segment is removed once every record in it is at or before
+        sequence, which is what a snapshot recording that sequence already includes.
+        """
+        segments = self.segments()
+        removed = 0
+        for idx in range(len(segments) - 1):
+            if segments[idx + 1][0] <= sequence + 1:
+                os.unlink(segments[idx][1])
+                removed += 1
+        return removed
+
+    def start(self):
+        if self._worker is None:
+            self._stopped.clear()
+            self._worker = Thread(target=self._commit_loop, name="journal-commit", daemon=True)
+            self._worker.start()
+
+    def stop(self):
+        if self._worker is not None:
+            self._stopped.set()
+            self._worker.join()
+            self._worker = None
+
+        self.commit()
+
+    def close(self):
+        self.stop()
+        self._file.close()
+
+    def _commit_loop(self):
+        while not self._stopped.wait(self.commit_interval):
+            try:
+                self.commit()
+            except OSError:
+                logger.exception("journal commit to %s failed, retrying in %s seconds", self.directory,
+                                 self.commit_interval)
+
+
+def replay_journal(journal: Journal, session_manager: SessionManager = None, after_sequence: int = 0) -> int:
+    """
+    Args:
+        journal: journal to replay
+        session_manager: whose active sessions to replay into. Defaults to the singleton.
+        after_sequence: the sequence the restored snapshot recorded. Earlier records are already in it.
+
+    Returns: The number of records applied.
+
+    Note:
+        Moves are replayed through each game's update_game, so they must be replayed before the journal is attached
+        to the session manager or they would be journaled again. A record is skipped if its session already has it,
+        which is the case for sessions that changed after the snapshot started but before they were written.
+    """
+    session_manager = session_manager or SessionManager.singleton()
+    sessions = session_manager.active_sessions
+    applied = 0
+    max_id = 0
+
+    for sequence, session_id, record_type, payload in journal.records(after_sequence):
+        max_id = max(max_id, session_id)
+
+        if record_type == CREATE:
+            if session_id not in sessions:
+                session = decode_session(payload[0], payload[1:])
+                session._journal_sequence = sequence
+                sessions[session_id] = session
+                applied += 1
+            continue
+
+        if record_type == DELETE:
+            if session_id in sessions:
+                del sessions[session_id]
+                applied += 1
+            continue
+
+        session = sessions.get(session_id)
+        if session is None or session._journal_sequence >= sequence:
+            continue
+
+        codec = MOVE_CODECS.get(type(session))
+        if codec is None:
+            raise JournalError(f"cannot replay moves of {type(session).__name__}")
+
+        codec.replay(session, payload)
+        session._journal_sequence = sequence
+        applied += 1
+
+    advance_session_ids(max_id)
+    return applied
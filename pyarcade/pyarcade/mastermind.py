@@ -1,15 +1,19 @@
 from pyarcade.game_interface import GameInterface
-from pyarcade.session_manager import SessionManager
-from random import sample
+from pyarcade.session_manager import SessionManager, new_seed
+from pyarcade.mastermind_scores import ScoreTable, SEQUENCES, CODE_LENGTH, ALPHABET_SIZE, score_histogram
+from random import Random
 
 
 class MastermindGame(GameInterface):
     """ A class representing a Mastermind game session.
 
     Note:
-        For now, Mastermind must have a hidden sequence of length 4 in which all 4 integers may take on values
-        between 0 and 9.
+        By default Mastermind has a hidden sequence of length 4 in which all 4 integers are unique and may take on
+        values between 0 and 9. A create request can change the code length, the alphabet size and whether symbols
+        may repeat.
     """
+    MAX_CODE_LENGTH = 10
+    MAX_ALPHABET_SIZE = 36
 
     def __init__(self):
         self.session_manager = SessionManager.singleton()
@@ -18,24 +22,37 @@ class MastermindGame(GameInterface):
         """ Upon calling create_game, the Mastermind game should initialize its hidden sequence
 
          Args:
-             request: dictionary containing single key-value pair. The key is "game_id".
+             request: dictionary containing the key "game_id" and optionally "seed", "code_length", "alphabet_size"
+             and "repeats". The same seed and options always produce the same hidden sequence.
 
          Returns:
             reply: dictionary containing the session_id in the request.
         """
-        hidden_sequence = tuple(sample(range(10), 4))
-        return self.session_manager.init_mastermind_session(hidden_sequence)
+        seed = request["seed"] if "seed" in request else new_seed()
+        code_length = request.get("code_length", CODE_LENGTH)
+        alphabet_size = request.get("alphabet_size", ALPHABET_SIZE)
+        repeats = request.get("repeats", False)
+        rng = Random(seed)
+
+        if repeats:
+            hidden_sequence = tuple(rng.randrange(alphabet_size) for idx in range(code_length))
+        else:
+            hidden_sequence = tuple(rng.sample(range(alphabet_size), code_length))
+
+        return self.session_manager.init_mastermind_session(hidden_sequence, seed, code_length, alphabet_size, repeats)
 
     def read_game(self, request: dict) -> dict:
         """
         Args:
-            request: dictionary containing single key-value pair. The key is "session_id". The value is a
-            integer unique to all ongoing game sessions.
+            request: dictionary containing the key "session_id" and optionally "since_index". The value of
+            "session_id" is a integer unique to all ongoing game sessions. The value of "since_index" is the number
+            of guesses the caller already has.
 
         Returns:
             reply: dictionary containing three keys.
-                "guesses": all previous guesses and their respective numbers of cows and bulls
-                for this game_session. All guesses should be kept as a list of tuples under the key "guesses."
+                "guesses": all previous guesses, or only those from since_index on, and their respective numbers
+                of cows and bulls for this game_session. All guesses should be kept as a list of tuples under the
+                key "guesses."
                 A guess of (0, 1, 2, 3) that has one cow and two bulls should be APPENDED to the list as
                 ((0, 1, 2, 3), (1, 2)).
                 "session_id": session_id provided with the original request.
@@ -46,19 +63,23 @@ class MastermindGame(GameInterface):
         """
         session = self.session_manager.get_session_by_id(request["session_id"])
 
-        return {"guesses": session.get_guesses(), "session_id": session.get_id(), "done": session.is_done()}
+        return {"guesses": session.get_guesses(request.get("since_index", 0)),
+                "session_id": session.get_id(),
+                "done": session.is_done()}
 
     def update_game(self, request: dict) -> dict:
         """
         Args:
-            request: dictionary containing two key-value pairs. One key is "session_id". The value is a
-            integer unique to all ongoing game sessions. The second key is "guess." The value should be a tuple
-            of four integers.
+            request: dictionary containing two key-value pairs and optionally "since_index". One key is
+            "session_id". The value is a integer unique to all ongoing game sessions. The second key is "guess." The
+            value should be a tuple of four integers. The value of "since_index" is the number of guesses the caller
+            already has.
 
         Returns:
             reply: dictionary containing three keys.
-                "guesses": all previous guesses and their respective numbers of cows and bulls
-                for this game_session. All guesses should be kept as a list of tuples under the key "guesses."
+                "guesses": all previous guesses, or only those from since_index on, and their respective numbers
+                of cows and bulls for this game_session. All guesses should be kept as a list of tuples under the
+                key "guesses."
                 A guess of (0, 1, 2, 3) that has one cow and two bulls should be APPENDED to the list as
                 ((0, 1, 2, 3), (1, 2)).
                 "session_id": session_id provided with the original request.
@@ -68,25 +89,57 @@ class MastermindGame(GameInterface):
             {"guesses": [((0, 1, 2, 3), (1, 2), ((3, 2, 1, 0), (2, 1))], "session_id": 1, "done": False}
         """
         game_session = self.session_manager.get_session_by_id(request["session_id"])
-        sequence_to_guess = game_session.get_sequence()
-        bulls = cows = 0
-
-        for guess_idx, guess in enumerate(request["guess"]):
-            if guess in sequence_to_guess:
-                if sequence_to_guess[guess_idx] == guess:
-                    bulls += 1
-                else:
-                    cows += 1
+        if game_session.is_standard():
+            cows, bulls = ScoreTable.singleton().score(request["guess"], game_session.get_sequence())
+        else:
+            cows, bulls = score_histogram(request["guess"], game_session.get_sequence(),
+                                          game_session.get_alphabet_size())
 
-        game_session.insert_guess((request["guess"], (cows, bulls)))
+        with game_session.lock():
+            game_session.insert_guess((request["guess"], (cows, bulls)))
 
-        if bulls == 4:
-            game_session.set_to_done()
+            if bulls == game_session.get_code_length():
+                game_session.set_to_done()
+            self.session_manager.journal_move(game_session, request["guess"])
 
-        return {"guesses": game_session.get_guesses(),
+        return {"guesses": game_session.get_guesses(request.get("since_index", 0)),
                 "session_id": game_session.get_id(),
                 "done": game_session.is_done()}
 
+    def hint_game(self, request: dict) -> dict:
+        """
+        Args:
+            request: dictionary containing single key-value pair. The key is "session_id". The value is a
+            integer unique to all ongoing game sessions.
+
+        Returns:
+            reply: dictionary containing five keys.
+                "candidates": every sequence still consistent with the guesses so far.
+                "next_guess": the guess that leaves the fewest candidates in the worst case, or None if no
+                sequence is consistent with the guesses.
+                "entropy_guess": the guess whose score is expected to tell the most about the hidden sequence, or
+                None if no sequence is consistent with the guesses.
+                "session_id": session_id provided with the original request.
+                "done": True or False depending on whether the game is over.
+
+        Note:
+            Both guesses are searched for the first time a set of candidates is seen, and cached per set. The
+            opening needs no search. Otherwise each search scores every guess against every candidate: about 80 ms
+            for both on the 1440 candidates one opening can leave, less for smaller sets, plus about 200 ms the first
+            time the process builds the score table.
+        """
+        # The solver pulls in numpy, so playing without hints never loads it
+        from pyarcade.mastermind_solver import next_guess, next_entropy_guess
+
+        session = self.session_manager.get_session_by_id(request["session_id"])
+        candidates = session.get_candidates()
+
+        return {"candidates": [SEQUENCES[code] for code in candidates],
+                "next_guess": next_guess(candidates),
+                "entropy_guess": next_entropy_guess(candidates),
+                "session_id": session.get_id(),
+                "done": session.is_done()}
+
     def delete_game(self, request: dict) -> dict:
         """
         Args:
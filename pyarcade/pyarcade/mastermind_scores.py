@@ -0,0 +1,161 @@
+from itertools import permutations
+
+from pyarcade.game_ids import CODE_LENGTH, ALPHABET_SIZE
+from pyarcade.singleton import Singleton
+
+# The standard game, CODE_LENGTH and ALPHABET_SIZE, is the only one the table covers
+
+# Every hidden sequence of 4 unique digits from 0-9. A sequence's code is its index in this list.
+SEQUENCES = list(permutations(range(ALPHABET_SIZE), CODE_LENGTH))
+SEQUENCE_CODES = {sequence: code for code, sequence in enumerate(SEQUENCES)}
+SEQUENCE_COUNT = len(SEQUENCES)
+
+# A score (cows, bulls) is stored as the single byte cows * 5 + bulls
+SCORES = [(cows, bulls) for cows in range(5) for bulls in range(5)]
+UNSCORED = 0xFF
+
+
+def encode_score(cows: int, bulls: int) -> int:
+    return cows * 5 + bulls
+
+
+def decode_score(score_code: int) -> tuple:
+    return SCORES[score_code]
+
+
+def score_guess(guess: tuple, sequence: tuple) -> tuple:
+    """
+    Args:
+        guess: the guessed digits
+        sequence: the hidden digits
+
+    Returns: The (cows, bulls) for the guess. This is the plain loop that the table is filled from.
+    """
+    bulls = cows = 0
+
+    for guess_idx, digit in enumerate(guess):
+        if digit in sequence:
+            if sequence[guess_idx] == digit:
+                bulls += 1
+            else:
+                cows += 1
+
+    return cows, bulls
+
+
+def sequence_mask(predicate) -> int:
+    """
+    Args:
+        predicate: function of a sequence returning True or False
+
+    Returns: An int holding one byte per sequence, most significant byte first, that is 1 where the predicate holds.
+    """
+    return int.from_bytes(bytes(1 if predicate(sequence) else 0 for sequence in SEQUENCES), "big")
+
+
+def score_histogram(guess: tuple, sequence: tuple, alphabet_size: int) -> tuple:
+    """
+    Args:
+        guess: the guessed symbols
+        sequence: the hidden symbols
+        alphabet_size: number of symbols, which are 0 to alphabet_size - 1
+
+    Returns: The (cows, bulls) for the guess in any variant, repeats allowed. Positions that are not bulls are
+    counted per symbol, and each symbol contributes the smaller of its two counts as cows. This is linear in the
+    code length where the plain loop is quadratic.
+    """
+    bulls = 0
+    guess_counts = [0] * alphabet_size
+    sequence_counts = [0] * alphabet_size
+
+    for guess_symbol, sequence_symbol in zip(guess, sequence):
+        if guess_symbol == sequence_symbol:
+            bulls += 1
+        else:
+            guess_counts[guess_symbol] += 1
+            sequence_counts[sequence_symbol] += 1
+
+    return sum(map(min, guess_counts, sequence_counts)), bulls
+
+
+class ScoreTable(Singleton):
+    """ The score of every guess against every hidden sequence, one byte per pair.
+
+    Note:
+        The 5040 x 5040 table is a single bytearray indexed by guess_code * SEQUENCE_COUNT + sequence_code. It is
+        allocated on first use and every entry starts as UNSCORED. Single lookups fill in the pair (and its mirror,
+        since scoring is symmetric) on a miss, while row() fills in a guess's whole row for bulk scoring.
+
+        Whole rows are computed without a Python loop per sequence. A score byte equals 5 * common - 4 * bulls, where
+        common is how many digits the guess shares with the sequence. Both counts are sums of per-digit and
+        per-position 0/1 byte masks held in big ints, and no byte ever carries or borrows, so a row is a handful of
+        big int additions.
+    """
+
+    def __init__(self):
+        self.table = bytearray([UNSCORED]) * (SEQUENCE_COUNT * SEQUENCE_COUNT)
+        self._rows_built = bytearray(SEQUENCE_COUNT)
+        self._digit_masks = [sequence_mask(lambda sequence: digit in sequence) for digit in range(10)]
+        self._position_masks = [[sequence_mask(lambda sequence: sequence[position] == digit) for digit in range(10)]
+                                for position in range(4)]
+
+    def score_code(self, guess_code: int, sequence_code: int) -> int:
+        """
+        Args:
+            guess_code: code of the guessed sequence
+            sequence_code: code of the hidden sequence
+
+        Returns: The encoded score of the guess.
+        """
+        score_code = self.table[guess_code * SEQUENCE_COUNT + sequence_code]
+
+        if score_code == UNSCORED:
+            score_code = encode_score(*score_guess(SEQUENCES[guess_code], SEQUENCES[sequence_code]))
+            self.table[guess_code * SEQUENCE_COUNT + sequence_code] = score_code
+            self.table[sequence_code * SEQUENCE_COUNT + guess_code] = score_code
+
+        return score_code
+
+    def score(self, guess: tuple, sequence: tuple) -> tuple:
+        """
+        Args:
+            guess: the guessed digits
+            sequence: the hidden digits
+
+        Returns: The (cows, bulls) for the guess. Anything that is not 4 unique digits from 0-9 is scored with the
+        plain loop.
+        """
+        guess_code = SEQUENCE_CODES.get(tuple(guess))
+        sequence_code = SEQUENCE_CODES.get(tuple(sequence))
+
+        if guess_code is None or sequence_code is None:
+            return score_guess(guess, sequence)
+
+        return SCORES[self.score_code(guess_code, sequence_code)]
+
+    def row(self, guess_code: int) -> memoryview:
+        """
+        Args:
+            guess_code: code of the guessed sequence
+
+        Returns: The encoded scores of the guess against every sequence, indexed by sequence code.
+        """
+        start = guess_code * SEQUENCE_COUNT
+
+        if not self._rows_built[guess_code]:
+            guess = SEQUENCES[guess_code]
+            common = sum(self._digit_masks[digit] for digit in guess)
+            bulls = sum(self._position_masks[position][digit] for position, digit in enumerate(guess))
+            self.table[start:start + SEQUENCE_COUNT] = (5 * common - 4 * bulls).to_bytes(SEQUENCE_COUNT, "big")
+            self._rows_built[guess_code] = 1
+
+        return memoryview(self.table)[start:start + SEQUENCE_COUNT]
+
+    def build(self) -> bytearray:
+        """
+        Returns: The whole table with every row filled in, for callers that score many guesses at once.
+        """
+        for guess_code in range(SEQUENCE_COUNT):
+            self.row(guess_code)
+
+        return self.table
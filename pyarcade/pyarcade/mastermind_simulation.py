@@ -0,0 +1,99 @@
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from random import Random
+import time
+
+from pyarcade.game_ids import MASTERMIND_ID
+from pyarcade.mastermind import MastermindGame
+from pyarcade.mastermind_scores import SEQUENCES
+from pyarcade.mastermind_solver import entropy_guess, minimax_guess
+
+
+def random_consistent_strategy(candidates: list, rng: Random) -> tuple:
+    return SEQUENCES[rng.choice(candidates)]
+
+
+def minimax_strategy(candidates: list, rng: Random) -> tuple:
+    return SEQUENCES[minimax_guess(tuple(candidates))]
+
+
+def entropy_strategy(candidates: list, rng: Random) -> tuple:
+    return SEQUENCES[entropy_guess(tuple(candidates))]
+
+
+# A strategy takes the codes of the sequences still consistent with the guesses so far and an RNG, and returns the
+# digits to guess next
+STRATEGIES = {
+    "random": random_consistent_strategy,
+    "minimax": minimax_strategy,
+    "entropy": entropy_strategy
+}
+
+
+def play_game(game: MastermindGame, strategy, seed: int) -> int:
+    """
+    Args:
+        game: the game to play through, using its create_game and update_game like any other client
+        strategy: one of the functions in STRATEGIES
+        seed: seed for both the hidden sequence and the strategy's RNG
+
+    Returns: The number of guesses the strategy needed. The session is deleted afterwards.
+    """
+    session_id = game.create_game({"game_id": MASTERMIND_ID, "seed": seed})["session_id"]
+    session = game.session_manager.get_session_by_id(session_id)
+    rng = Random(seed)
+
+    while not session.is_done():
+        game.update_game({"session_id": session_id, "guess": strategy(session.get_candidates(), rng)})
+
+    guesses = session.guess_count()
+    game.delete_game({"session_id": session_id})
+    return guesses
+
+
+def play_games(strategy_name: str, seeds: list) -> list:
+    """
+    Args:
+        strategy_name: key into STRATEGIES
+        seeds: one seed per game
+
+    Returns: The number of guesses each game needed. This is the unit of work sent to each worker process.
+    """
+    game = MastermindGame()
+    strategy = STRATEGIES[strategy_name]
+    return [play_game(game, strategy, seed) for seed in seeds]
+
+
+def simulate(strategy_name: str, games: int, processes: int = None, first_seed: int = 0, chunk_size: int = 50) \
+        -> dict:
+    """
+    Args:
+        strategy_name: key into STRATEGIES
+        games: number of games to play
+        processes: worker processes. None uses the CPU count and 0 plays every game in this process.
+        first_seed: games are seeded first_seed, first_seed + 1, ... so a run can be repeated exactly
+        chunk_size: games handed to a worker at a time
+
+    Returns: A dictionary with the strategy, the number of games, the seconds taken, games_per_second,
+    average_guesses, max_guesses and distribution, which maps a guess count to how many games needed it.
+    """
+    seeds = list(range(first_seed, first_seed + games))
+    chunks = [seeds[idx:idx + chunk_size] for idx in range(0, games, chunk_size)]
+    start = time.perf_counter()
+
+    if processes == 0:
+        results = [play_games(strategy_name, chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            results = list(executor.map(play_games, [strategy_name] * len(chunks), chunks))
+
+    seconds = time.perf_counter() - start
+    guess_counts = [guesses for chunk in results for guesses in chunk]
+
+    return {"strategy": strategy_name,
+            "games": games,
+            "seconds": seconds,
+            "games_per_second": games / seconds if seconds else 0.0,
+            "average_guesses": sum(guess_counts) / games if games else 0.0,
+            "max_guesses": max(guess_counts, default=0),
+            "distribution": dict(sorted(Counter(guess_counts).items()))}
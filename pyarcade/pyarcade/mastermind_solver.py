@@ -0,0 +1,257 @@
+from functools import lru_cache
+from math import log2
+from operator import itemgetter
+
+try:
+    import numpy as np
+except ImportError:
+    # NumPy is optional. Without it minimax_guess and entropy_guess loop over the guesses with best_guess.
+    np = None
+
+from pyarcade.mastermind_scores import ScoreTable, SCORES, SEQUENCES, SEQUENCE_CODES, SEQUENCE_COUNT, UNSCORED, \
+    encode_score, score_guess
+
+# Every score a guess of 4 unique digits can receive
+SCORE_CODES = [encode_score(cows, bulls) for cows, bulls in SCORES if cows + bulls <= 4]
+UNSCORED_BYTE = bytes([UNSCORED])
+# Candidate sets up to this size are scored by gathering their bytes rather than masking whole rows
+GATHER_LIMIT = 256
+# Candidates whose table rows vectorized_partition_sizes offsets at a time
+PARTITION_CHUNK = 128
+# The best opening by any cost. Relabelling digits or positions maps any sequence to any other without changing
+# scores, so every opening splits the candidates the same way and the tie goes to the lowest code.
+OPENING = 0
+
+
+def all_candidates() -> list:
+    return list(range(SEQUENCE_COUNT))
+
+
+def narrow_candidates(candidates: list, guess: tuple, score: tuple) -> list:
+    """
+    Args:
+        candidates: codes of the sequences still consistent with earlier guesses
+        guess: the guessed digits
+        score: the (cows, bulls) the guess received
+
+    Returns: The codes of the candidates that would have given the guess the same score.
+    """
+    guess_code = SEQUENCE_CODES.get(tuple(guess))
+
+    if guess_code is None:
+        return [code for code in candidates if score_guess(guess, SEQUENCES[code]) == tuple(score)]
+
+    row = ScoreTable.singleton().row(guess_code)
+    score_code = encode_score(*score)
+    return [code for code in candidates if row[code] == score_code]
+
+
+def candidate_scores(candidates: tuple):
+    """
+    Args:
+        candidates: codes of the sequences still consistent with the guesses so far
+
+    Returns: A function taking a table row and returning the candidates' score bytes from it. Few candidates are
+    gathered one by one with itemgetter. For many candidates it is cheaper to work on the whole row: non-candidates
+    are masked to UNSCORED by OR-ing the row with a big int mask and then dropped with bytes.translate.
+    """
+    if len(candidates) <= GATHER_LIMIT:
+        # The extra item makes itemgetter return a tuple even for a single candidate
+        gather = itemgetter(*candidates, candidates[0])
+        return lambda row: bytes(gather(row)[:-1])
+
+    mask = bytearray([UNSCORED]) * SEQUENCE_COUNT
+    for code in candidates:
+        mask[code] = 0
+    excluded = int.from_bytes(mask, "big")
+
+    return lambda row: (int.from_bytes(row, "big") | excluded).to_bytes(SEQUENCE_COUNT, "big") \
+        .translate(None, UNSCORED_BYTE)
+
+
+def partition_sizes(guess_code: int, scores_of) -> list:
+    """
+    Args:
+        guess_code: code of the guess
+        scores_of: function from candidate_scores
+
+    Returns: How many candidates give the guess each score in SCORE_CODES.
+    """
+    return list(map(scores_of(ScoreTable.singleton().row(guess_code)).count, SCORE_CODES))
+
+
+def best_guess(candidates: tuple, cost) -> int:
+    """
+    Args:
+        candidates: codes of the sequences still consistent with the guesses so far
+        cost: function of a guess's partition_sizes, lower is better
+
+    Returns: The code of the guess with the lowest cost. Ties go to a guess that could itself be the answer, then
+    to the lowest code.
+    """
+    if len(candidates) <= 2:
+        return candidates[0]
+
+    scores_of = candidate_scores(candidates)
+    candidate_set = set(candidates)
+
+    best_code = None
+    best_cost = None
+    best_is_candidate = False
+
+    for guess_code in range(SEQUENCE_COUNT):
+        guess_cost = cost(partition_sizes(guess_code, scores_of))
+        is_candidate = guess_code in candidate_set
+
+        if best_code is None or guess_cost < best_cost \
+                or (guess_cost == best_cost and is_candidate and not best_is_candidate):
+            best_code, best_cost, best_is_candidate = guess_code, guess_cost, is_candidate
+
+    return best_code
+
+
+def expected_information_cost(sizes: list) -> float:
+    # Maximizing the entropy of the partition is the same as minimizing sum(n * log(n)) over its parts. Rounding
+    # keeps partitions that only differ in order exactly tied.
+    return round(sum(size * log2(size) for size in sizes if size > 1), 9)
+
+
+def vectorized_partition_sizes(candidates: tuple):
+    """
+    Args:
+        candidates: codes of the sequences still consistent with the guesses so far
+
+    Returns: A SEQUENCE_COUNT x 32 array of how many candidates give each guess each score code, computed with NumPy.
+
+    Note:
+        Scoring is symmetric, so the candidates' rows of the table hold every guess's score against them. Each
+        score is offset by 32 * guess_code so a single np.bincount gives the partition sizes of every guess. The rows
+        are offset PARTITION_CHUNK at a time into a reused int32 buffer, which keeps memory to a few megabytes
+        however many candidates there are.
+    """
+    table = np.frombuffer(ScoreTable.singleton().build(), dtype=np.uint8).reshape(SEQUENCE_COUNT, SEQUENCE_COUNT)
+    codes = np.array(candidates)
+    offsets = np.arange(0, 32 * SEQUENCE_COUNT, 32, dtype=np.int32)
+    buffer = np.empty((min(len(codes), PARTITION_CHUNK), SEQUENCE_COUNT), dtype=np.int32)
+    sizes = np.zeros(32 * SEQUENCE_COUNT, dtype=np.int64)
+
+    for start in range(0, len(codes), PARTITION_CHUNK):
+        rows = table[codes[start:start + PARTITION_CHUNK]]
+        scores = buffer[:len(rows)]
+        np.add(rows, offsets, out=scores)
+        sizes += np.bincount(scores.ravel(), minlength=32 * SEQUENCE_COUNT)
+
+    return sizes.reshape(SEQUENCE_COUNT, 32)
+
+
+def lowest_cost_guess(codes, costs) -> int:
+    """
+    Args:
+        codes: NumPy array of the codes of the candidates
+        costs: NumPy array of the cost of every guess, lower is better
+
+    Returns: The code of the guess with the lowest cost, breaking ties the same way as best_guess.
+    """
+    tied = costs == costs.min()
+    tied_candidates = np.flatnonzero(tied[codes])
+    if len(tied_candidates):
+        return int(codes[tied_candidates].min())
+
+    return int(np.flatnonzero(tied)[0])
+
+
+def vectorized_minimax_guess(candidates: tuple) -> int:
+    """
+    Args:
+        candidates: codes of the sequences still consistent with the guesses so far
+
+    Returns: The same guess as best_guess(candidates, max), computed with NumPy.
+    """
+    return lowest_cost_guess(np.array(candidates), vectorized_partition_sizes(candidates).max(axis=1))
+
+
+def vectorized_entropy_guess(candidates: tuple) -> int:
+    """
+    Args:
+        candidates: codes of the sequences still consistent with the guesses so far
+
+    Returns: The same guess as best_guess(candidates, expected_information_cost), computed with NumPy.
+    """
+    sizes = vectorized_partition_sizes(candidates)
+    costs = np.round((sizes * np.log2(np.maximum(sizes, 1))).sum(axis=1), 9)
+    return lowest_cost_guess(np.array(candidates), costs)
+
+
+@lru_cache(maxsize=1024)
+def minimax_guess(candidates: tuple) -> int:
+    """
+    Args:
+        candidates: codes of the sequences still consistent with the guesses so far
+
+    Returns: The code of the guess whose largest group of candidates sharing a score is smallest (Knuth's rule).
+
+    Note:
+        Results are cached since sessions that follow the hints walk through the same candidate sets.
+    """
+    if len(candidates) == SEQUENCE_COUNT:
+        return OPENING
+
+    if np is None or len(candidates) <= 2:
+        return best_guess(candidates, max)
+
+    return vectorized_minimax_guess(candidates)
+
+
+@lru_cache(maxsize=1024)
+def entropy_guess(candidates: tuple) -> int:
+    """
+    Args:
+        candidates: codes of the sequences still consistent with the guesses so far
+
+    Returns: The code of the guess whose score tells the most about the answer on average, that is whose partition
+    of the candidates has the highest entropy.
+    """
+    if len(candidates) == SEQUENCE_COUNT:
+        return OPENING
+
+    if np is None or len(candidates) <= 2:
+        return best_guess(candidates, expected_information_cost)
+
+    return vectorized_entropy_guess(candidates)
+
+
+def first_guess() -> int:
+    """
+    Returns: The minimax opening. A full search would be the most expensive of the game, but by symmetry it always
+    gives OPENING.
+    """
+    return OPENING
+
+
+def next_guess(candidates: list) -> tuple:
+    """
+    Args:
+        candidates: codes of the sequences still consistent with the guesses so far
+
+    Returns: The digits of the minimax guess, or None if no sequence is consistent with the guesses.
+    """
+    if not candidates:
+        return None
+
+    if len(candidates) == SEQUENCE_COUNT:
+        return SEQUENCES[first_guess()]
+
+    return SEQUENCES[minimax_guess(tuple(candidates))]
+
+
+def next_entropy_guess(candidates: list) -> tuple:
+    """
+    Args:
+        candidates: codes of the sequences still consistent with the guesses so far
+
+    Returns: The digits of the entropy maximizing guess, or None if no sequence is consistent with the guesses.
+    """
+    if not candidates:
+        return None
+
+    return SEQUENCES[entropy_guess(tuple(candidates))]
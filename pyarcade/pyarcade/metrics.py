@@ -0,0 +1,166 @@
+from bisect import bisect_left
+from threading import Lock, local
+import weakref
+
+from pyarcade.singleton import Singleton
+
+# Upper bounds in seconds of the request duration histogram buckets
+DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def format_labels(names: tuple, values: tuple) -> str:
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in values)
+    return ",".join(f'{name}="{value}"' for name, value in zip(names, escaped))
+
+
+def new_shard() -> dict:
+    return {"durations": {}, "rejections": {}}
+
+
+def merge_shard(total: dict, shard: dict):
+    """ Adds the counts of shard into total. """
+    for key, histogram in list(shard["durations"].items()):
+        summed = total["durations"].setdefault(key, [0] * (len(histogram) - 1) + [0.0])
+        for idx, value in enumerate(histogram):
+            summed[idx] += value
+
+    rejections = total["rejections"]
+    for key, rejected in list(shard["rejections"].items()):
+        rejections[key] = rejections.get(key, 0) + rejected
+
+
+class ShardOwner:
+    """ Holds a thread's shard in its thread local storage, so the shard can be retired once the thread is gone. """
+    __slots__ = ("shard", "__weakref__")
+
+    def __init__(self, shard: dict):
+        self.shard = shard
+
+
+class Metrics(Singleton):
+    """ Request durations and proxy rejections, exported in the Prometheus text format.
+
+    Note:
+        Every thread records into its own shard, so recording never takes a lock. The lock is only taken when a
+        thread registers its shard, when the shard is retired, and when exporting. A shard's counts only ever grow,
+        so summing shards while other threads record gives at worst a slightly stale total.
+
+        The threaded development server starts a thread per request, so a shard is retired once its thread ends:
+        its counts are merged into one shared shard for finished threads and it is dropped, keeping the number of
+        shards to the number of live threads plus one.
+    """
+
+    def __init__(self):
+        self._local = local()
+        self._retired = new_shard()
+        self._shards = [self._retired]
+        self._lock = Lock()
+
+    def _shard(self) -> dict:
+        owner = getattr(self._local, "owner", None)
+        if owner is None:
+            owner = ShardOwner(new_shard())
+            self._local.owner = owner
+            # The thread local storage, and with it the owner, is released when the thread ends
+            weakref.finalize(owner, self._retire, owner.shard)
+            with self._lock:
+                self._shards.append(owner.shard)
+        return owner.shard
+
+    def _retire(self, shard: dict):
+        with self._lock:
+            merge_shard(self._retired, shard)
+            # Shards with the same counts are equal, so the shard is found by identity rather than removed by value
+            self._shards = [other for other in self._shards if other is not shard]
+
+    def observe_request(self, route: str, game: str, seconds: float):
+        """
+        Args:
+            route: the matched route rule
+            game: name of the game the request was for, or "" for routes that are not per game
+            seconds: how long the request took
+        """
+        durations = self._shard()["durations"]
+        key = (route, game)
+        histogram = durations.get(key)
+        if histogram is None:
+            # One count per bucket, then one for anything slower, then the sum of the durations
+            histogram = durations[key] = [0] * (len(DURATION_BUCKETS) + 1) + [0.0]
+
+        histogram[bisect_left(DURATION_BUCKETS, seconds)] += 1
+        histogram[-1] += seconds
+
+    def count_rejection(self, game: str, validator: str):
+        """
+        Args:
+            game: name of the game whose proxy rejected the request
+            validator: name of the check the request failed
+        """
+        rejections = self._shard()["rejections"]
+        key = (game, validator)
+        rejections[key] = rejections.get(key, 0) + 1
+
+    def totals(self) -> dict:
+        """
+        Returns: A shard holding the counts summed over all threads.
+        """
+        total = new_shard()
+        # Holding the lock keeps a shard from being counted both on its own and after being merged when retired
+        with self._lock:
+            for shard in self._shards:
+                merge_shard(total, shard)
+        return total
+
+    def durations(self) -> dict:
+        """
+        Returns: Every (route, game) mapped to its histogram summed over all threads.
+        """
+        return self.totals()["durations"]
+
+    def rejections(self) -> dict:
+        """
+        Returns: Every (game, validator) mapped to its rejection count summed over all threads.
+        """
+        return self.totals()["rejections"]
+
+    def shards(self) -> list:
+        with self._lock:
+            return list(self._shards)
+
+    def export(self, live_sessions: dict) -> str:
+        """
+        Args:
+            live_sessions: game name mapped to how many of its sessions are active
+
+        Returns: Every metric in the Prometheus text exposition format.
+        """
+        totals = self.totals()
+        lines = ["# HELP pyarcade_request_duration_seconds Time taken to handle a request.",
+                 "# TYPE pyarcade_request_duration_seconds histogram"]
+        for (route, game), histogram in sorted(totals["durations"].items()):
+            labels = format_labels(("route", "game"), (route, game))
+            cumulative = 0
+            for bound, observed in zip(DURATION_BUCKETS + ("+Inf",), histogram):
+                cumulative += observed
+                lines.append(f'pyarcade_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"pyarcade_request_duration_seconds_sum{{{labels}}} {histogram[-1]}")
+            lines.append(f"pyarcade_request_duration_seconds_count{{{labels}}} {cumulative}")
+
+        lines += ["# HELP pyarcade_proxy_rejections_total Requests rejected by a proxy, by the check that failed.",
+                  "# TYPE pyarcade_proxy_rejections_total counter"]
+        for (game, validator), rejected in sorted(totals["rejections"].items()):
+            lines.append(f"pyarcade_proxy_rejections_total{{{format_labels(('game', 'validator'), (game, validator))}}}"
+                         f" {rejected}")
+
+        lines += ["# HELP pyarcade_live_sessions Active sessions.",
+                  "# TYPE pyarcade_live_sessions gauge"]
+        for game, sessions in sorted(live_sessions.items()):
+            lines.append(f"pyarcade_live_sessions{{{format_labels(('game',), (game,))}}} {sessions}")
+
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            for shard in self._shards:
+                shard["durations"].clear()
+                shard["rejections"].clear()
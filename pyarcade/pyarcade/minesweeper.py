@@ -1,5 +1,6 @@
 from pyarcade.game_interface import GameInterface
 from pyarcade.minesweeper_builder import MinesweeperBoardBuilder
+from pyarcade.minesweeper_no_guess import NoGuessBoardPool, generate_no_guess_board
 from pyarcade.session_manager import SessionManager, MinesweeperSession
 from copy import deepcopy
 
@@ -13,8 +14,13 @@ class MinesweeperGame(GameInterface):
         For now, MinesweeperGame will have a 9x9 board with only 10 mines.
     """
 
-    def __init__(self):
+    def __init__(self, no_guess_pool: NoGuessBoardPool = None):
+        """
+        Args:
+            no_guess_pool: Optional pool of pre-generated no-guess boards. Without one they are generated inline.
+        """
         self.session_manager = SessionManager.singleton()
+        self.no_guess_pool = no_guess_pool
 
     @staticmethod
     def print_board(board: dict) -> str:
@@ -41,9 +47,10 @@ class MinesweeperGame(GameInterface):
     @staticmethod
     def print_player_board(player_board: dict, board: dict) -> str:
         reply = ""
-        for key in board.keys():
+        # Iterate over the player board since the mine board is not generated until the first unhide
+        for key in player_board.keys():
             line = ""
-            for cell in range(len(board[key])):
+            for cell in range(len(player_board[key])):
                 if isinstance(player_board[key][cell], str):
                     line += 'F '
                 elif player_board[key][cell]:
@@ -86,14 +93,47 @@ class MinesweeperGame(GameInterface):
         MinesweeperGame.print_board(session.data["board"])
 
     @staticmethod
-    def unhide_cell(location: tuple, session: MinesweeperSession):
+    def generate_board(location: tuple, session: MinesweeperSession, no_guess_pool: NoGuessBoardPool = None):
+        """
+        Args:
+            location: Location of the player's first unhide. It and its neighbors are kept free of mines.
+            session: The session that is being modified
+            no_guess_pool: Optional pool to take a no-guess board from. Sessions created with a seed never use it.
+
+        Returns: Nothing. Places the mines and adjacency counts in place. A no-guess session that cannot get a
+        no-guess board falls back to an ordinary board.
+        """
+        generated = None
+        if session.is_no_guess():
+            if no_guess_pool is not None and not session.is_seeded():
+                # Record the pooled board's seed so the session can still be replayed
+                session.seed, generated = no_guess_pool.pop(location)
+            else:
+                generated = generate_no_guess_board(MinesweeperBoardBuilder.EASY_SIZE,
+                                                    MinesweeperBoardBuilder.EASY_SIZE,
+                                                    MinesweeperBoardBuilder.EASY_MINES, location, session.get_seed())
+
+        if generated is None:
+            generated = MinesweeperBoardBuilder.initialize_board(safe_cell=location, rng=session.get_rng())
+
+        session.data["board"], session.data["mines"] = generated
+
+    @staticmethod
+    def unhide_cell(location: tuple, session: MinesweeperSession, no_guess_pool: NoGuessBoardPool = None):
         """
         Args:
             location: Location on the board of where to flag
             session: The session that is being modified
+            no_guess_pool: Optional pool of no-guess boards used if this is the first unhide
 
         Returns: Nothing. It modifies in place. If player unhides a mine then update game state to done.
         """
+        # Mines are placed lazily on the first unhide so the first click is always safe
+        if not session.is_board_generated():
+            MinesweeperGame.generate_board(location, session, no_guess_pool)
+
+        session.invalidate_hint()
+
         # Location stores in (row,column)
         if session.data["board"][location[0]][location[1]] == 'mine':
             MinesweeperGame.end_game(session)
@@ -110,6 +150,8 @@ class MinesweeperGame(GameInterface):
 
         Returns: Nothing. It modifies inplace.
         """
+        session.invalidate_hint()
+
         # Will not get bad input, so only cells that are hidden can be flagged
         if session.data["player_board"][location[0]][location[1]] == 'flag':
             session.data["player_board"][location[0]][location[1]] = True
@@ -123,24 +165,28 @@ class MinesweeperGame(GameInterface):
     def create_game(self, request: dict) -> dict:
         """
         Args:
-            request: dictionary containing single key-value pair. The key is "game_id". The value
-            is an integer denoting which game should be created
+            request: dictionary containing the key "game_id" and optionally "seed" and "no_guess". The mines are
+            placed with an RNG seeded from "seed", so a seed and the moves played fully describe the session. If
+            "no_guess" is True the board can be solved from the first click without guessing.
 
         Returns:
             reply: dictionary containing a single key-value pair. The key is "session_id". The value is a
             integer unique to all ongoing game sessions.
+
+        Note: The mine board is not generated here. It is built on the first unhide_cell so that the first click can
+        never hit a mine and sessions that are never played cost almost nothing.
         """
 
-        board, mines = MinesweeperBoardBuilder.initialize_board()
         # Player board stores the state of whether or not cells are hidden or flagged.
         player_board = {}
         for length in range(MinesweeperBoardBuilder.EASY_SIZE):
             player_board[length] = [True] * MinesweeperBoardBuilder.EASY_SIZE
-        new_game_session = {"player_board": player_board, "board": board,
-                            "mines": mines, "cells_hidden": MinesweeperBoardBuilder.EASY_SIZE ** 2,
+        new_game_session = {"player_board": player_board, "board": None,
+                            "mines": None, "cells_hidden": MinesweeperBoardBuilder.EASY_SIZE ** 2,
                             "flags": MinesweeperBoardBuilder.EASY_MINES}
 
-        return self.session_manager.init_minesweeper_session(new_game_session)
+        return self.session_manager.init_minesweeper_session(new_game_session, request.get("seed"),
+                                                             request.get("no_guess", False))
 
     def read_game(self, request: dict) -> dict:
         """
@@ -178,17 +224,45 @@ class MinesweeperGame(GameInterface):
             reply: dictionary describing the game's new state.
         """
         session = self.session_manager.get_session_by_id(request["session_id"])
-        if "unhide_cell" in request:
-            location = request["unhide_cell"]
-            MinesweeperGame.unhide_cell(location, session)
-            request.pop("unhide_cell")
-        if "flag_cell" in request:
-            location = request["flag_cell"]
-            MinesweeperGame.flag_cell(location, session)
-            request.pop("flag_cell")
+        with session.lock():
+            if "unhide_cell" in request:
+                location = request["unhide_cell"]
+                MinesweeperGame.unhide_cell(location, session, self.no_guess_pool)
+                self.session_manager.journal_move(session, ("unhide_cell", location))
+                request.pop("unhide_cell")
+            if "flag_cell" in request:
+                location = request["flag_cell"]
+                MinesweeperGame.flag_cell(location, session)
+                self.session_manager.journal_move(session, ("flag_cell", location))
+                request.pop("flag_cell")
+            session.changed()
 
         return self.read_game(request)
 
+    def hint_game(self, request: dict) -> dict:
+        """
+        Args:
+            request: dictionary containing single key-value pair. The key is "session_id". The value is a
+            integer unique to all ongoing game sessions.
+
+        Returns:
+            reply: dictionary containing four keys. "safe_cells" is a list of hidden cells that cannot be mines and
+            "mine_cells" is a list of unflagged cells that must be mines given the unhidden numbers and the flags.
+            Both are empty before the first unhide. "session_id" and "done" are as in read_game.
+        """
+        session = self.session_manager.get_session_by_id(request["session_id"])
+
+        if session.get_hint() is None:
+            if session.is_board_generated():
+                session.set_hint(session.get_solver().solve(session.data["player_board"], session.data["board"]))
+            else:
+                session.set_hint(([], []))
+
+        safe_cells, mine_cells = session.get_hint()
+
+        return {"safe_cells": safe_cells, "mine_cells": mine_cells, "session_id": session.get_id(),
+                "done": session.is_done()}
+
     def delete_game(self, request: dict) -> dict:
         """
         Args:
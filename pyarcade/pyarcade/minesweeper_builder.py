@@ -1,10 +1,13 @@
-from random import sample
+from random import Random
 
 
 class MinesweeperBoardBuilder:
     EASY_SIZE = 9
     EASY_MINES = 10
 
+    # (rows, columns, mines) for each standard difficulty
+    DIFFICULTIES = {"easy": (9, 9, 10), "intermediate": (16, 16, 40), "expert": (16, 30, 99)}
+
     def __init__(self):
         pass
 
@@ -57,21 +60,58 @@ class MinesweeperBoardBuilder:
         return board
 
     @staticmethod
-    def initialize_board() -> tuple:
+    def in_safe_zone(row: int, column: int, safe_cell: tuple) -> bool:
         """
-        Returns: A dictionary representing a minesweeperGame board. The keys are rows and the values are lists that
-        represent the columns. The column is a list of numbers indicating how many mines are adjacent to that location.
+        Args:
+            row: Location on board
+            column: Location on board
+            safe_cell: The (row, column) of the first cell the player unhides
+
+        Returns: True if the location is the safe cell or one of its neighbors
+        """
+        if safe_cell is None:
+            return False
+        return abs(row - safe_cell[0]) <= 1 and abs(column - safe_cell[1]) <= 1
+
+    @staticmethod
+    def place_mines(rows: int, columns: int, mine_count: int, safe_cell: tuple = None, rng: Random = None) -> tuple:
+        """
+        Args:
+            rows: Number of rows on the board
+            columns: Number of columns on the board
+            mine_count: Number of mines to place
+            safe_cell: Optional (row, column) of the player's first click. No mines are placed on it or its neighbors.
+            rng: Optional RNG used to place the mines. A session passes its own seeded RNG so boards are reproducible.
+
+        Returns: A tuple of the board and the list of mine locations. The board is a dictionary whose keys are rows and
+        whose values are lists of numbers indicating how many mines are adjacent to that location.
         """
 
-        board = {0: [0]*9, 1: [0]*9, 2: [0]*9, 3: [0]*9, 4: [0]*9, 5: [0]*9, 6: [0]*9, 7: [0]*9, 8: [0]*9}
+        board = {row_loc: [0] * columns for row_loc in range(rows)}
         mines = []
-        for row_loc in range(9):
-            for col_loc in range(9):
+        for row_loc in range(rows):
+            for col_loc in range(columns):
                 # Creates a list of board locations
-                mines.append((row_loc, col_loc))
+                if not MinesweeperBoardBuilder.in_safe_zone(row_loc, col_loc, safe_cell):
+                    mines.append((row_loc, col_loc))
+        if rng is None:
+            rng = Random()
         # Randomly picks locations to assign mines
-        mines = sample(mines, MinesweeperBoardBuilder.EASY_MINES)
+        mines = rng.sample(mines, mine_count)
         for row, column in mines:
             board[row][column] = 'mine'
         board = MinesweeperBoardBuilder.count_adjacent_mines(mines, board)
         return board, mines
+
+    @staticmethod
+    def initialize_board(safe_cell: tuple = None, rng: Random = None) -> tuple:
+        """
+        Args:
+            safe_cell: Optional (row, column) of the player's first click. No mines are placed on it or its neighbors.
+            rng: Optional RNG used to place the mines. A session passes its own seeded RNG so boards are reproducible.
+
+        Returns: A dictionary representing a minesweeperGame board. The keys are rows and the values are lists that
+        represent the columns. The column is a list of numbers indicating how many mines are adjacent to that location.
+        """
+        return MinesweeperBoardBuilder.place_mines(MinesweeperBoardBuilder.EASY_SIZE, MinesweeperBoardBuilder.EASY_SIZE,
+                                                   MinesweeperBoardBuilder.EASY_MINES, safe_cell, rng)
@@ -0,0 +1,256 @@
+from collections import deque
+from itertools import repeat
+from random import Random
+from threading import Event, Lock, Thread
+import logging
+import os
+
+from pyarcade.minesweeper_builder import MinesweeperBoardBuilder
+from pyarcade.minesweeper_solver import MinesweeperSolver
+from pyarcade.session_manager import new_seed
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 200
+
+
+def has_enclosed_cell(board: dict, rows: int, columns: int) -> bool:
+    """
+    Args:
+        board: The game board
+        rows: Number of rows on the board
+        columns: Number of columns on the board
+
+    Returns: True if some cell without a mine only borders mines. Nothing next to it can ever be unhidden, so the
+    board cannot be solved without guessing. This is a cheap check that rejects a layout before solving it.
+    """
+    for row in range(rows):
+        for column in range(columns):
+            if board[row][column] == 'mine':
+                continue
+
+            enclosed = True
+            for near_row in range(max(row - 1, 0), min(row + 2, rows)):
+                for near_column in range(max(column - 1, 0), min(column + 2, columns)):
+                    if (near_row, near_column) != (row, column) and board[near_row][near_column] != 'mine':
+                        enclosed = False
+            if enclosed:
+                return True
+
+    return False
+
+
+def is_solvable_without_guessing(board: dict, mines: list, first_click: tuple, solver: MinesweeperSolver = None) \
+        -> bool:
+    """
+    Args:
+        board: The game board
+        mines: Locations of the mines on the board
+        first_click: The (row, column) the player unhides first
+        solver: Optional solver to reuse between boards
+
+    Returns: True if playing only the moves the solver can prove unhides every cell without a mine. Play stops as
+    soon as the solver finds nothing, which is the common way a layout is rejected.
+    """
+    rows = len(board)
+    columns = len(board[0])
+    if has_enclosed_cell(board, rows, columns):
+        return False
+
+    if solver is None:
+        solver = MinesweeperSolver()
+
+    player_board = {row: [True] * columns for row in range(rows)}
+    cells_left = rows * columns - len(mines)
+    to_unhide = [first_click]
+
+    while to_unhide:
+        # Unhide like a player would, opening every neighbor of a zero straight away
+        while to_unhide:
+            row, column = to_unhide.pop()
+            if player_board[row][column] is not True:
+                continue
+
+            player_board[row][column] = False
+            cells_left -= 1
+            if board[row][column] == 0:
+                for near_row in range(max(row - 1, 0), min(row + 2, rows)):
+                    for near_column in range(max(column - 1, 0), min(column + 2, columns)):
+                        if player_board[near_row][near_column] is True:
+                            to_unhide.append((near_row, near_column))
+
+        if cells_left == 0:
+            return True
+
+        to_unhide, certain_mines = solver.solve(player_board, board)
+        for row, column in certain_mines:
+            player_board[row][column] = 'flag'
+
+    return False
+
+
+def generate_no_guess_board(rows: int, columns: int, mine_count: int, first_click: tuple, seed: int,
+                            max_attempts: int = MAX_ATTEMPTS):
+    """
+    Args:
+        rows: Number of rows on the board
+        columns: Number of columns on the board
+        mine_count: Number of mines to place
+        first_click: The (row, column) the player unhides first. It and its neighbors never hold a mine.
+        seed: Seed for the layouts tried. The same arguments always give the same board.
+        max_attempts: How many layouts to try before giving up
+
+    Returns: A tuple of the board and the list of mine locations, or None if no layout within max_attempts could be
+    solved without guessing.
+    """
+    rng = Random(seed)
+    solver = MinesweeperSolver()
+
+    for attempt in range(max_attempts):
+        board, mines = MinesweeperBoardBuilder.place_mines(rows, columns, mine_count, first_click, rng)
+        if is_solvable_without_guessing(board, mines, first_click, solver):
+            return board, mines
+
+    return None
+
+
+class NoGuessBoardPool:
+    """ Ready no-guess boards for each first click, refilled in the background over a process pool.
+
+    Note:
+        Each entry is (seed, result) where result is what generate_no_guess_board returned for that seed, so a
+        session that takes a pooled board can record the seed and still be replayed.
+
+        A single thread, started on the first pop, refills every first click in the order they ran low, so the
+        number of threads does not grow with the size of the board. A refill that fails is logged and the first
+        click is tried again on its next pop.
+    """
+    LOW_WATER = 2
+    HIGH_WATER = 8
+
+    def __init__(self, rows: int = MinesweeperBoardBuilder.EASY_SIZE, columns: int = MinesweeperBoardBuilder.EASY_SIZE,
+                 mine_count: int = MinesweeperBoardBuilder.EASY_MINES, low_water: int = LOW_WATER,
+                 high_water: int = HIGH_WATER, processes: int = None):
+        """
+        Args:
+            rows: Number of rows on the board
+            columns: Number of columns on the board
+            mine_count: Number of mines to place
+            low_water: refill is triggered once fewer than this many boards are left for a first click
+            high_water: refill stops once this many boards are ready for a first click
+            processes: Number of worker processes. Defaults to the number of CPUs.
+        """
+        self.rows = rows
+        self.columns = columns
+        self.mine_count = mine_count
+        self.low_water = low_water
+        self.high_water = high_water
+        self.processes = processes or os.cpu_count() or 1
+        self._boards = {}
+        # First clicks waiting for a refill, in the order they ran low. A dict keeps each one queued only once.
+        self._refills = {}
+        self._refill_needed = Event()
+        self._lock = Lock()
+        self._start_lock = Lock()
+        self._executor = None
+        self._worker = None
+        self._running = False
+
+    def size(self, first_click: tuple) -> int:
+        with self._lock:
+            return len(self._boards.get(first_click, ()))
+
+    def pop(self, first_click: tuple) -> tuple:
+        """
+        Args:
+            first_click: The (row, column) the player unhides first
+
+        Returns: A (seed, result) entry. If there is no board ready for this first click, one is generated inline.
+        """
+        self.start()
+
+        with self._lock:
+            boards = self._boards.setdefault(first_click, deque())
+            entry = boards.popleft() if boards else None
+            if len(boards) < self.low_water:
+                self._refills[first_click] = True
+                self._refill_needed.set()
+
+        if entry is None:
+            return self.generate_one(first_click)
+
+        return entry
+
+    def generate_one(self, first_click: tuple) -> tuple:
+        seed = new_seed()
+        return seed, generate_no_guess_board(self.rows, self.columns, self.mine_count, first_click, seed)
+
+    def generate(self, first_click: tuple, count: int) -> list:
+        """
+        Args:
+            first_click: The (row, column) the player unhides first
+            count: Number of boards to generate
+
+        Returns: A list of count (seed, result) entries, generated in parallel across the worker processes.
+        """
+        with self._lock:
+            if self._executor is None:
+                # Imported here since it pulls in multiprocessing, which startup can do without
+                from concurrent.futures import ProcessPoolExecutor
+                self._executor = ProcessPoolExecutor(max_workers=self.processes)
+            executor = self._executor
+
+        seeds = [new_seed() for idx in range(count)]
+        results = executor.map(generate_no_guess_board, repeat(self.rows), repeat(self.columns),
+                               repeat(self.mine_count), repeat(first_click), seeds)
+        return list(zip(seeds, results))
+
+    def fill(self, first_click: tuple):
+        with self._lock:
+            missing = self.high_water - len(self._boards.setdefault(first_click, deque()))
+
+        if missing > 0:
+            entries = self.generate(first_click, missing)
+            with self._lock:
+                self._boards[first_click].extend(entries)
+
+    def start(self):
+        with self._start_lock:
+            if self._worker is not None:
+                return
+
+            self._running = True
+            self._worker = Thread(target=self._refill_loop, name="no-guess-pool-refill", daemon=True)
+            self._worker.start()
+
+    def stop(self):
+        with self._start_lock:
+            if self._worker is not None:
+                self._running = False
+                self._refill_needed.set()
+                self._worker.join()
+                self._worker = None
+
+        with self._lock:
+            executor, self._executor = self._executor, None
+
+        if executor is not None:
+            executor.shutdown()
+
+    def _refill_loop(self):
+        while self._running:
+            self._refill_needed.wait()
+            self._refill_needed.clear()
+
+            while self._running:
+                with self._lock:
+                    if not self._refills:
+                        break
+                    first_click = next(iter(self._refills))
+                    del self._refills[first_click]
+
+                try:
+                    self.fill(first_click)
+                except Exception:
+                    logger.exception("no-guess board refill for first click %s failed, retrying on its next pop",
+                                     first_click)
@@ -0,0 +1,207 @@
+def count_bits(mask: int) -> int:
+    return bin(mask).count("1")
+
+
+def bits_of(mask: int) -> list:
+    """
+    Args:
+        mask: bitset of cell indices
+
+    Returns: The cell indices set in the mask, lowest first.
+    """
+    bits = []
+    while mask:
+        low = mask & -mask
+        bits.append(low.bit_length() - 1)
+        mask ^= low
+    return bits
+
+
+class MinesweeperSolver:
+    """ Finds cells that are provably safe or provably mines from what the player can see.
+
+    Note:
+        Cells are numbered row * columns + column and every set of cells is an int bitset. A constraint is a pair
+        (cells, mines) saying exactly that many of those hidden cells are mines. Flagged cells are taken to be mines.
+        Trivial and subset deductions are propagated first. What is left is split into connected frontier components
+        and each component small enough is solved by exact enumeration. Component results are cached by their
+        constraints, so after a move only the components the move touched are enumerated again.
+    """
+    MAX_COMPONENT_CELLS = 16
+    MAX_CACHED_COMPONENTS = 256
+
+    def __init__(self):
+        self._component_cache = {}
+
+    @staticmethod
+    def build_constraints(player_board: dict, board: dict) -> list:
+        """
+        Args:
+            player_board: The player's view. True is hidden, False is unhidden and 'flag' is flagged.
+            board: The solution board with adjacency counts
+
+        Returns: A list of (cells, mines) constraints, one per unhidden number that borders a hidden cell.
+        """
+        rows = len(player_board)
+        columns = len(player_board[0])
+        constraints = []
+
+        for row in range(rows):
+            for column in range(columns):
+                if player_board[row][column] is not False:
+                    continue
+
+                hidden = 0
+                mines = board[row][column]
+                for near_row in range(max(row - 1, 0), min(row + 2, rows)):
+                    for near_column in range(max(column - 1, 0), min(column + 2, columns)):
+                        state = player_board[near_row][near_column]
+                        if isinstance(state, str):
+                            mines -= 1
+                        elif state:
+                            hidden |= 1 << (near_row * columns + near_column)
+
+                if hidden:
+                    constraints.append((hidden, mines))
+
+        return constraints
+
+    @staticmethod
+    def propagate(constraints: list) -> tuple:
+        """
+        Args:
+            constraints: (cells, mines) constraints
+
+        Returns: A tuple (safe, mines, constraints) of the cells deduced safe, the cells deduced to be mines and the
+        constraints that are still undecided.
+        """
+        safe = mines = 0
+        pending = set(constraints)
+        changed = True
+
+        while changed:
+            changed = False
+            reduced = set()
+
+            for cells, count in pending:
+                count -= count_bits(cells & mines)
+                cells &= ~(safe | mines)
+                size = count_bits(cells)
+                if not cells or count < 0 or count > size:
+                    # Nothing left to decide, or contradicted by a misplaced flag
+                    continue
+                if count == 0:
+                    safe |= cells
+                    changed = True
+                elif count == size:
+                    mines |= cells
+                    changed = True
+                else:
+                    reduced.add((cells, count))
+
+            # If one constraint's cells are a subset of another's, the difference holds the difference in mines
+            for small_cells, small_count in list(reduced):
+                for big_cells, big_count in list(reduced):
+                    if small_cells != big_cells and small_cells & big_cells == small_cells:
+                        derived = (big_cells & ~small_cells, big_count - small_count)
+                        if derived not in reduced:
+                            reduced.add(derived)
+                            changed = True
+
+            pending = reduced
+
+        return safe, mines, list(pending)
+
+    @staticmethod
+    def split_components(constraints: list) -> list:
+        """
+        Args:
+            constraints: (cells, mines) constraints
+
+        Returns: A list of (cells, constraints) where no two components share a cell.
+        """
+        components = []
+        for constraint in constraints:
+            cells = constraint[0]
+            members = [constraint]
+            disjoint = []
+            for component in components:
+                if component[0] & cells:
+                    cells |= component[0]
+                    members.extend(component[1])
+                else:
+                    disjoint.append(component)
+            disjoint.append((cells, members))
+            components = disjoint
+
+        return components
+
+    @staticmethod
+    def enumerate_component(cells: int, constraints: tuple) -> tuple:
+        """
+        Args:
+            cells: Every cell in the component
+            constraints: The component's (cells, mines) constraints
+
+        Returns: A tuple (safe, mines) of the cells that are safe in every solution and the cells that are mines in
+        every solution. Both are empty if there is no solution.
+        """
+        order = bits_of(cells)
+        touching = {cell: [constraint for constraint in constraints if constraint[0] >> cell & 1] for cell in order}
+        always_mine = cells
+        ever_mine = 0
+        solved = False
+
+        def assign(idx: int, mine_cells: int, unassigned: int):
+            nonlocal always_mine, ever_mine, solved
+            if idx == len(order):
+                always_mine &= mine_cells
+                ever_mine |= mine_cells
+                solved = True
+                return
+
+            bit = 1 << order[idx]
+            rest = unassigned & ~bit
+            for candidate in (mine_cells, mine_cells | bit):
+                for constraint_cells, count in touching[order[idx]]:
+                    placed = count_bits(candidate & constraint_cells)
+                    if placed > count or placed + count_bits(rest & constraint_cells) < count:
+                        break
+                else:
+                    assign(idx + 1, candidate, rest)
+
+        assign(0, 0, cells)
+
+        if not solved:
+            return 0, 0
+
+        return cells & ~ever_mine, always_mine
+
+    def solve_component(self, cells: int, constraints: list) -> tuple:
+        key = tuple(sorted(constraints))
+        if key not in self._component_cache:
+            if len(self._component_cache) >= MinesweeperSolver.MAX_CACHED_COMPONENTS:
+                self._component_cache.clear()
+            self._component_cache[key] = MinesweeperSolver.enumerate_component(cells, key)
+
+        return self._component_cache[key]
+
+    def solve(self, player_board: dict, board: dict) -> tuple:
+        """
+        Args:
+            player_board: The player's view. True is hidden, False is unhidden and 'flag' is flagged.
+            board: The solution board with adjacency counts
+
+        Returns: A tuple (safe_cells, mine_cells) of sorted (row, column) lists. Components with more than
+        MAX_COMPONENT_CELLS cells are only solved as far as propagation gets, which keeps the time bounded.
+        """
+        columns = len(player_board[0])
+        safe, mines, constraints = MinesweeperSolver.propagate(MinesweeperSolver.build_constraints(player_board, board))
+
+        for cells, members in MinesweeperSolver.split_components(constraints):
+            if count_bits(cells) <= MinesweeperSolver.MAX_COMPONENT_CELLS:
+                component_safe, component_mines = self.solve_component(cells, members)
+                safe |= component_safe
+                mines |= component_mines
+
+        return [divmod(cell, columns) for cell in bits_of(safe)], [divmod(cell, columns) for cell in bits_of(mines)]
@@ -0,0 +1,267 @@
+import struct
+
+try:
+    import msgpack
+except ImportError:
+    # msgpack is optional. Without it the pure Python packer and unpacker below speak the same format.
+    msgpack = None
+
+JSON_MIMETYPE = "application/json"
+MIMETYPE = "application/msgpack"
+# Names clients used for MessagePack before application/msgpack was registered
+MIMETYPES = (MIMETYPE, "application/x-msgpack", "application/vnd.msgpack")
+
+# Arrays and maps nested deeper than this are refused rather than unpacked with ever deeper recursion
+MAX_DEPTH = 32
+
+UINT8 = struct.Struct(">BB")
+UINT16 = struct.Struct(">BH")
+UINT32 = struct.Struct(">BI")
+UINT64 = struct.Struct(">BQ")
+INT8 = struct.Struct(">Bb")
+INT16 = struct.Struct(">Bh")
+INT32 = struct.Struct(">Bi")
+INT64 = struct.Struct(">Bq")
+FLOAT64 = struct.Struct(">Bd")
+
+
+class MessagePackError(ValueError):
+    pass
+
+
+def negotiate_mimetype(accept_mimetypes) -> str:
+    """
+    Args:
+        accept_mimetypes: the request's parsed Accept header
+
+    Returns: The mimetype to reply in. JSON unless the client prefers MessagePack, so clients that send no Accept
+    header, or accept anything, keep getting JSON.
+    """
+    return accept_mimetypes.best_match((JSON_MIMETYPE,) + MIMETYPES, JSON_MIMETYPE)
+
+
+def packb(obj) -> bytes:
+    """
+    Args:
+        obj: None, bools, ints, floats, strings, bytes, lists, tuples and dicts of them
+
+    Returns: obj in MessagePack. Lists and tuples both become arrays.
+    """
+    if msgpack is not None:
+        return msgpack.packb(obj, use_bin_type=True)
+
+    out = bytearray()
+    pack_into(obj, out)
+    return bytes(out)
+
+
+def unpackb(data: bytes):
+    """
+    Args:
+        data: a single MessagePack value, such as a request body
+
+    Returns: The value, with every array as a tuple, so a move like {"move": [[3, 2], [4, 3]]} comes out with the
+    coordinate pairs the proxies expect and needs no decoding afterwards. Raises MessagePackError if data is not
+    exactly one well formed value.
+    """
+    if msgpack is not None:
+        try:
+            return msgpack.unpackb(data, use_list=False, raw=False, strict_map_key=False)
+        except (ValueError, TypeError) as error:
+            raise MessagePackError(str(error)) from error
+
+    data = bytes(data)
+    try:
+        value, position = unpack_from(data, 0, 0)
+    except (ValueError, TypeError) as error:
+        raise MessagePackError(str(error)) from error
+
+    if position != len(data):
+        raise MessagePackError(f"{len(data) - position} bytes left after the value")
+    return value
+
+
+def pack_into(obj, out: bytearray):
+    if obj is None:
+        out.append(0xc0)
+    elif obj is True:
+        out.append(0xc3)
+    elif obj is False:
+        out.append(0xc2)
+    elif isinstance(obj, int):
+        pack_int(obj, out)
+    elif isinstance(obj, float):
+        out += FLOAT64.pack(0xcb, obj)
+    elif isinstance(obj, str):
+        data = obj.encode()
+        size = len(data)
+        if size < 32:
+            out.append(0xa0 | size)
+        elif size <= 0xff:
+            out += UINT8.pack(0xd9, size)
+        elif size <= 0xffff:
+            out += UINT16.pack(0xda, size)
+        else:
+            out += UINT32.pack(0xdb, size)
+        out += data
+    elif isinstance(obj, (list, tuple)):
+        size = len(obj)
+        if size < 16:
+            out.append(0x90 | size)
+        elif size <= 0xffff:
+            out += UINT16.pack(0xdc, size)
+        else:
+            out += UINT32.pack(0xdd, size)
+        for item in obj:
+            pack_into(item, out)
+    elif isinstance(obj, dict):
+        size = len(obj)
+        if size < 16:
+            out.append(0x80 | size)
+        elif size <= 0xffff:
+            out += UINT16.pack(0xde, size)
+        else:
+            out += UINT32.pack(0xdf, size)
+        for key, value in obj.items():
+            pack_into(key, out)
+            pack_into(value, out)
+    elif isinstance(obj, (bytes, bytearray, memoryview)):
+        data = bytes(obj)
+        size = len(data)
+        if size <= 0xff:
+            out += UINT8.pack(0xc4, size)
+        elif size <= 0xffff:
+            out += UINT16.pack(0xc5, size)
+        else:
+            out += UINT32.pack(0xc6, size)
+        out += data
+    else:
+        raise TypeError(f"cannot pack {type(obj).__name__} as MessagePack")
+
+
+def pack_int(value: int, out: bytearray):
+    if 0 <= value < 0x80:
+        out.append(value)
+    elif -32 <= value < 0:
+        out.append(value & 0xff)
+    elif value >= 0:
+        if value <= 0xff:
+            out += UINT8.pack(0xcc, value)
+        elif value <= 0xffff:
+            out += UINT16.pack(0xcd, value)
+        elif value <= 0xffffffff:
+            out += UINT32.pack(0xce, value)
+        else:
+            out += UINT64.pack(0xcf, value)
+    elif value >= -0x80:
+        out += INT8.pack(0xd0, value)
+    elif value >= -0x8000:
+        out += INT16.pack(0xd1, value)
+    elif value >= -0x80000000:
+        out += INT32.pack(0xd2, value)
+    else:
+        out += INT64.pack(0xd3, value)
+
+
+# Numbers of a fixed size, each struct reading the type byte and then the value
+FIXED = {0xca: struct.Struct(">Bf"), 0xcb: FLOAT64, 0xcc: UINT8, 0xcd: UINT16, 0xce: UINT32, 0xcf: UINT64,
+         0xd0: INT8, 0xd1: INT16, 0xd2: INT32, 0xd3: INT64}
+# Values whose length follows the type byte, as (kind, struct reading the type byte and then the length)
+SIZED = {0xc4: ("bin", UINT8), 0xc5: ("bin", UINT16), 0xc6: ("bin", UINT32),
+         0xd9: ("str", UINT8), 0xda: ("str", UINT16), 0xdb: ("str", UINT32),
+         0xdc: ("array", UINT16), 0xdd: ("array", UINT32), 0xde: ("map", UINT16), 0xdf: ("map", UINT32)}
+
+
+def unpack_from(data: bytes, position: int, depth: int) -> tuple:
+    """
+    Returns: The (value, position after it) of the value starting at position.
+    """
+    if position >= len(data):
+        raise MessagePackError("data ends before the value")
+
+    tag = data[position]
+    if tag < 0x80:
+        return tag, position + 1
+    if tag >= 0xe0:
+        return tag - 0x100, position + 1
+    if tag < 0x90:
+        return unpack_map(data, position + 1, tag & 0x0f, depth)
+    if tag < 0xa0:
+        return unpack_array(data, position + 1, tag & 0x0f, depth)
+    if tag < 0xc0:
+        return unpack_bytes(data, position + 1, tag & 0x1f).decode(), position + 1 + (tag & 0x1f)
+    if tag == 0xc0:
+        return None, position + 1
+    if tag == 0xc2:
+        return False, position + 1
+    if tag == 0xc3:
+        return True, position + 1
+
+    if tag in FIXED:
+        fixed = FIXED[tag]
+        if position + fixed.size > len(data):
+            raise MessagePackError("data ends inside a number")
+        return fixed.unpack_from(data, position)[1], position + fixed.size
+
+    if tag not in SIZED:
+        raise MessagePackError(f"unsupported type byte 0x{tag:02x}")
+
+    kind, header = SIZED[tag]
+    if position + header.size > len(data):
+        raise MessagePackError("data ends inside a length")
+    size = header.unpack_from(data, position)[1]
+    position += header.size
+
+    if kind == "array":
+        return unpack_array(data, position, size, depth)
+    if kind == "map":
+        return unpack_map(data, position, size, depth)
+
+    value = unpack_bytes(data, position, size)
+    return (value.decode() if kind == "str" else value), position + size
+
+
+def unpack_bytes(data: bytes, position: int, size: int) -> bytes:
+    if position + size > len(data):
+        raise MessagePackError("data ends inside a string")
+    return data[position:position + size]
+
+
+def unpack_array(data: bytes, position: int, size: int, depth: int) -> tuple:
+    if depth >= MAX_DEPTH:
+        raise MessagePackError(f"values nested more than {MAX_DEPTH} deep")
+
+    # Arrays of small non-negative ints, such as coordinates, are their own bytes
+    chunk = data[position:position + size]
+    if len(chunk) == size and chunk.isascii():
+        return tuple(chunk), position + size
+
+    items = []
+    for idx in range(size):
+        # Likewise for the pairs inside an array of coordinate pairs
+        tag = data[position] if position < len(data) else 0
+        chunk = data[position + 1:position + 1 + (tag & 0x0f)] if 0x90 <= tag < 0xa0 and depth + 1 < MAX_DEPTH else None
+        if chunk is not None and len(chunk) == tag & 0x0f and chunk.isascii():
+            item = tuple(chunk)
+            position += 1 + len(chunk)
+        else:
+            item, position = unpack_from(data, position, depth + 1)
+        items.append(item)
+    return tuple(items), position
+
+
+def unpack_map(data: bytes, position: int, size: int, depth: int) -> tuple:
+    if depth >= MAX_DEPTH:
+        raise MessagePackError(f"values nested more than {MAX_DEPTH} deep")
+
+    items = {}
+    for idx in range(size):
+        # Keys are nearly always short strings, which are read here rather than through unpack_from
+        tag = data[position] if position < len(data) else 0
+        if 0xa0 <= tag < 0xc0 and position + 1 + (tag & 0x1f) <= len(data):
+            key = data[position + 1:position + 1 + (tag & 0x1f)].decode()
+            position += 1 + (tag & 0x1f)
+        else:
+            key, position = unpack_from(data, position, depth + 1)
+        items[key], position = unpack_from(data, position, depth + 1)
+    return items, position
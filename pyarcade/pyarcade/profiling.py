@@ -0,0 +1,118 @@
+from cProfile import Profile
+from io import StringIO
+from itertools import count
+from pstats import Stats
+from threading import Lock
+import os
+import re
+
+
+class RequestProfiler:
+    """ Profiles one in every sample_every requests with cProfile and aggregates the stats per route.
+
+    Note:
+        Profiling is off until enable is called and can be switched off again at any time. At most one request is
+        profiled at a time. A sampled request that arrives while another is being profiled is simply not profiled,
+        so turning profiling on never makes requests wait on each other.
+    """
+
+    def __init__(self, sample_every: int = 0):
+        """
+        Args:
+            sample_every: profile one in this many requests. 0 leaves profiling off.
+        """
+        self.sample_every = sample_every
+        self._requests = count()
+        self._active = Lock()
+        self._stats_lock = Lock()
+        self._stats = {}
+        self._samples = {}
+
+    def enable(self, sample_every: int):
+        self.sample_every = sample_every
+
+    def disable(self):
+        self.sample_every = 0
+
+    def is_enabled(self) -> bool:
+        return self.sample_every > 0
+
+    def start(self) -> Profile:
+        """
+        Returns: A running profiler if this request was sampled, otherwise None.
+        """
+        sample_every = self.sample_every
+        if sample_every <= 0 or next(self._requests) % sample_every != 0 or not self._active.acquire(blocking=False):
+            return None
+
+        profile = Profile()
+        try:
+            profile.enable()
+        except (RuntimeError, ValueError):
+            # Another profiler, such as a debugger's, is already installed in this thread
+            self._active.release()
+            return None
+
+        return profile
+
+    def stop(self, profile: Profile, route: str):
+        """
+        Args:
+            profile: what start returned for the request
+            route: the route the request matched, which its stats are added to
+        """
+        if profile is None:
+            return
+
+        profile.disable()
+        self._active.release()
+
+        with self._stats_lock:
+            if route in self._stats:
+                self._stats[route].add(profile)
+            else:
+                self._stats[route] = Stats(profile)
+            self._samples[route] = self._samples.get(route, 0) + 1
+
+    def samples(self) -> dict:
+        with self._stats_lock:
+            return dict(self._samples)
+
+    def report(self, sort: str = "cumulative", limit: int = 25) -> str:
+        """
+        Args:
+            sort: a pstats sort key such as "cumulative", "tottime" or "calls"
+            limit: functions listed per route
+
+        Returns: A pstats listing of the slowest functions for each route that has been sampled.
+        """
+        stream = StringIO()
+        with self._stats_lock:
+            for route in sorted(self._stats):
+                stream.write(f"==== {route} ({self._samples[route]} sampled requests) ====\n")
+                self._stats[route].stream = stream
+                self._stats[route].sort_stats(sort).print_stats(limit)
+
+        return stream.getvalue()
+
+    def dump(self, directory: str) -> list:
+        """
+        Args:
+            directory: where to write the stats
+
+        Returns: The paths written, one .prof file per route. They can be loaded with pstats or snakeviz.
+        """
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        with self._stats_lock:
+            for route, stats in self._stats.items():
+                path = os.path.join(directory, (re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root") + ".prof")
+                stats.dump_stats(path)
+                paths.append(path)
+
+        return paths
+
+    def reset(self):
+        with self._stats_lock:
+            self._stats = {}
+            self._samples = {}
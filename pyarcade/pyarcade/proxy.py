@@ -1,35 +1,51 @@
+from typing import TYPE_CHECKING
+
 from pyarcade.game_interface import GameInterface
-from pyarcade.mastermind import MastermindGame
+from pyarcade.mastermind_scores import CODE_LENGTH, ALPHABET_SIZE
+from pyarcade.metrics import Metrics
 from pyarcade.minesweeper_builder import MinesweeperBoardBuilder
 from pyarcade.session_manager import SessionManager
-from pyarcade.checkers import Checkers
-from pyarcade.minesweeper import MinesweeperGame
 from pyarcade.game_ids import *
 
+# The game modules are only imported once the registry loads their game, so importing the proxies stays cheap
+if TYPE_CHECKING:
+    from pyarcade.checkers import Checkers
+    from pyarcade.mastermind import MastermindGame
+    from pyarcade.minesweeper import MinesweeperGame
+
 
 class GameProxy(GameInterface):
-    game_id_map = {MASTERMIND_ID: MastermindGame, CHECKERS_ID: Checkers, MINESWEEPER_ID: MinesweeperGame}
+    # The "game_id" a create request must carry
+    game_id = None
+    # Keys a create request may carry besides "game_id"
+    create_options = ("seed",)
+    # Name of the game in the app's routes, used to label rejections
+    game_name = ""
 
     def __init__(self, game_instance: GameInterface):
         self.game_instance = game_instance
         self.session_manager = SessionManager.singleton()
+        self.metrics = Metrics.singleton()
 
     def create_game(self, request):
         """
                 Args:
-                    request: dictionary containing single key-value pair. The key is "game_id". The value
-                    should be zero.
+                    request: dictionary containing the key "game_id" and optionally any of the keys in
+                    create_options. The value of "game_id" should match the game. The value of "seed" should be a
+                    non-negative integer.
 
                 Returns:
                     reply: dictionary containing a single key-value pair. The key is "session_id". The value is a
                     integer unique to all ongoing game sessions. If the request is invalid, a session_id of
                     zero should be returned. Otherwise, pass the request onto the game.
                 """
-        if request is None \
-                or not self.request_correct_size(request, 1) \
-                or not self.key_present(request, "game_id") \
-                or not self.correct_type(request, "game_id", int()) \
-                or not self.valid_game_id(request["game_id"]):
+        if self.rejected("request_present", request is not None) \
+                or self.rejected("request_correct_size",
+                                 self.request_correct_size(request, 1 + self.create_options_present(request))) \
+                or self.rejected("key_present", self.key_present(request, "game_id")) \
+                or self.rejected("correct_type", self.correct_type(request, "game_id", int())) \
+                or self.rejected("valid_game_id", self.valid_game_id(request["game_id"])) \
+                or self.rejected("valid_create_options", self.valid_create_options(request)):
             return {"session_id": 0}
 
         return self.game_instance.create_game(request)
@@ -46,11 +62,14 @@ class GameProxy(GameInterface):
             zero should be returned. Otherwise, pass the request onto the game.
         """
 
-        if not self.valid_session_request(request):
+        if not self.valid_read_request(request):
             return {"session_id": 0}
 
         return self.game_instance.read_game(request)
 
+    def valid_read_request(self, request: dict) -> bool:
+        return self.valid_session_request(request)
+
     def delete_game(self, request: dict) -> dict:
         """
         Args:
@@ -67,9 +86,39 @@ class GameProxy(GameInterface):
 
         return self.game_instance.delete_game(request)
 
+    def hint_game(self, request: dict) -> dict:
+        """
+        Args:
+            request: dictionary containing single key-value pair. The key is "session_id". The value is a
+            integer unique to all ongoing game sessions.
+
+        Returns:
+            reply: If the session_id is invalid, then a session_id of zero is returned. Otherwise, pass the request
+            onto the game.
+        """
+        if not self.valid_session_request(request):
+            return {"session_id": 0}
+
+        return self.game_instance.hint_game(request)
+
     def update_game(self, request: dict) -> dict:
         raise NotImplemented
 
+    def rejected(self, validator: str, passed: bool) -> bool:
+        """
+        Args:
+            validator: name of the check
+            passed: whether the request passed the check
+
+        Returns: True if the request failed the check, in which case the rejection is counted against the check.
+        Chaining these with "or" keeps the checks short-circuiting in order, so only the first failure is counted.
+        """
+        if passed:
+            return False
+
+        self.metrics.count_rejection(self.game_name, validator)
+        return True
+
     def session_exists(self, request: dict) -> bool:
         return self.session_manager.session_exists(request["session_id"])
 
@@ -77,11 +126,11 @@ class GameProxy(GameInterface):
         return self.session_manager.session_is_done(request["session_id"])
 
     def valid_session_request(self, request: dict, request_size=1) -> bool:
-        return request is not None \
-               and GameProxy.request_correct_size(request, request_size) \
-               and GameProxy.key_present(request, "session_id") \
-               and GameProxy.correct_type(request, "session_id", int()) \
-               and self.session_exists(request)
+        return not (self.rejected("request_present", request is not None)
+                    or self.rejected("request_correct_size", GameProxy.request_correct_size(request, request_size))
+                    or self.rejected("key_present", GameProxy.key_present(request, "session_id"))
+                    or self.rejected("correct_type", GameProxy.correct_type(request, "session_id", int()))
+                    or self.rejected("session_exists", self.session_exists(request)))
 
     @staticmethod
     def tuple_contains_only_int_type(tup_in: tuple) -> bool:
@@ -111,9 +160,19 @@ class GameProxy(GameInterface):
     def key_present(request: dict, key: str) -> bool:
         return key in request
 
+    def create_options_present(self, request: dict) -> int:
+        return sum(1 for key in self.create_options if self.key_present(request, key))
+
+    def valid_create_options(self, request: dict) -> bool:
+        return self.valid_seed(request)
+
+    @staticmethod
+    def valid_seed(request: dict) -> bool:
+        return not GameProxy.key_present(request, "seed") \
+            or (GameProxy.correct_type(request, "seed", int()) and request["seed"] >= 0)
+
     def valid_game_id(self, game_id: int) -> bool:
-        return game_id in GameProxy.game_id_map \
-               and type(self.game_instance) == GameProxy.game_id_map[game_id]
+        return game_id == self.game_id
 
     @staticmethod
     def tuple_correct_size(tup_in: tuple, size: int, is_unique=False) -> bool:
@@ -124,16 +183,75 @@ class GameProxy(GameInterface):
 
 
 class MastermindGameProxy(GameProxy):
+    game_id = MASTERMIND_ID
+    create_options = ("seed", "code_length", "alphabet_size", "repeats")
+    game_name = "mastermind"
 
-    def __init__(self, game_instance: MastermindGame):
+    def __init__(self, game_instance: "MastermindGame"):
         GameProxy.__init__(self, game_instance)
 
+    def valid_read_request(self, request: dict) -> bool:
+        """
+        Args:
+            request: dictionary containing the key "session_id" and optionally "since_index". The value of
+            "since_index" should be a non-negative integer.
+
+        Returns: True if the request may be passed onto the game. Otherwise read_game replies with a session_id of
+        zero.
+        """
+        return not (self.rejected("request_present", request is not None)
+                    or not self.valid_session_request(request, request_size=1 + self.since_index_present(request))
+                    or self.rejected("valid_since_index", self.valid_since_index(request)))
+
+    def since_index_present(self, request: dict) -> int:
+        return 1 if self.key_present(request, "since_index") else 0
+
+    @staticmethod
+    def valid_since_index(request: dict) -> bool:
+        return not GameProxy.key_present(request, "since_index") \
+            or (GameProxy.correct_type(request, "since_index", int()) and request["since_index"] >= 0)
+
+    def valid_create_options(self, request: dict) -> bool:
+        if not GameProxy.valid_create_options(self, request):
+            return False
+
+        game_type = type(self.game_instance)
+        for key, _max in (("code_length", game_type.MAX_CODE_LENGTH), ("alphabet_size", game_type.MAX_ALPHABET_SIZE)):
+            if self.key_present(request, key) \
+                    and not (self.correct_type(request, key, int()) and self.input_in_valid_range((request[key],),
+                                                                                                  _max=_max)):
+                return False
+
+        if self.key_present(request, "repeats") and not self.correct_type(request, "repeats", bool()):
+            return False
+
+        # Without repeats every symbol in the sequence has to be different
+        return request.get("repeats", False) \
+            or request.get("code_length", CODE_LENGTH) <= request.get("alphabet_size", ALPHABET_SIZE)
+
+    def hint_game(self, request: dict) -> dict:
+        """
+        Args:
+            request: dictionary containing single key-value pair. The key is "session_id". The value is a
+            integer unique to all ongoing game sessions.
+
+        Returns:
+            reply: If the session_id is invalid or the session is not the standard 4 unique digits from 0-9 game,
+            then a session_id of zero is returned. Otherwise, pass the request onto the game.
+        """
+        if not self.valid_session_request(request) \
+                or self.rejected("is_standard",
+                                 self.session_manager.get_session_by_id(request["session_id"]).is_standard()):
+            return {"session_id": 0}
+
+        return self.game_instance.hint_game(request)
+
     def update_game(self, request: dict) -> dict:
         """
                 Args:
-                    request: dictionary containing two key-value pairs. One key is "session_id". The value is a
-                    integer unique to all ongoing game sessions. The second key is "guess." The value should be a tuple
-                    of four integers.
+                    request: dictionary containing two key-value pairs and optionally "since_index". One key is
+                    "session_id". The value is a integer unique to all ongoing game sessions. The second key is
+                    "guess." The value should be a tuple with one integer per position of the session's code.
 
                 Returns:
                     reply: dictionary containing a single key-value pair. The key is "session_id". The value is a
@@ -141,25 +259,34 @@ class MastermindGameProxy(GameProxy):
                     zero should be returned. Otherwise, pass the request onto the game.
                 """
 
-        # guess should only be allowed if it is between 0 and 9
-        if not self.valid_session_request(request, request_size=2) \
-                or self.session_is_done(request) \
-                or not self.valid_update_request(request):
+        # guess should only be allowed if every symbol is in the session's alphabet
+        if self.rejected("request_present", request is not None) \
+                or not self.valid_session_request(request, request_size=2 + self.since_index_present(request)) \
+                or self.rejected("valid_since_index", self.valid_since_index(request)) \
+                or self.rejected("session_is_done", not self.session_is_done(request)) \
+                or self.rejected("valid_update_request", self.valid_update_request(request)):
             return {"session_id": 0}
 
         return self.game_instance.update_game(request)
 
     def valid_update_request(self, request: dict) -> bool:
-        return self.key_present(request, "guess") \
-               and self.correct_type(request, "guess", tuple()) \
-               and self.tuple_contains_only_int_type(request["guess"]) \
-               and self.tuple_correct_size(request["guess"], 4, is_unique=True) \
-               and self.input_in_valid_range(request["guess"])
+        if not self.key_present(request, "guess") \
+                or not self.correct_type(request, "guess", tuple()) \
+                or not self.tuple_contains_only_int_type(request["guess"]):
+            return False
+
+        session = self.session_manager.get_session_by_id(request["session_id"])
+        return self.tuple_correct_size(request["guess"], session.get_code_length(),
+                                       is_unique=not session.allows_repeats()) \
+            and len(request["guess"]) == session.get_code_length() \
+            and self.input_in_valid_range(request["guess"], _min=0, _max=session.get_alphabet_size() - 1)
 
 
 class CheckersProxy(GameProxy):
+    game_id = CHECKERS_ID
+    game_name = "checkers"
 
-    def __init__(self, game_instance: Checkers):
+    def __init__(self, game_instance: "Checkers"):
         GameProxy.__init__(self, game_instance)
 
     def update_game(self, request: dict) -> dict:
@@ -176,7 +303,7 @@ class CheckersProxy(GameProxy):
                 """
 
         if not self.valid_session_request(request, request_size=2) \
-                or not self.valid_update_request(request):
+                or self.rejected("valid_update_request", self.valid_update_request(request)):
             return {"session_id": 0}
 
         return self.game_instance.update_game(request)
@@ -203,9 +330,17 @@ class CheckersProxy(GameProxy):
 
 
 class MinesweeperProxy(GameProxy):
-    def __init__(self, game_instance: MinesweeperGame):
+    game_id = MINESWEEPER_ID
+    create_options = ("seed", "no_guess")
+    game_name = "minesweeper"
+
+    def __init__(self, game_instance: "MinesweeperGame"):
         GameProxy.__init__(self, game_instance)
 
+    def valid_create_options(self, request: dict) -> bool:
+        return GameProxy.valid_create_options(self, request) \
+            and (not self.key_present(request, "no_guess") or self.correct_type(request, "no_guess", bool()))
+
     def update_game(self, request: dict) -> dict:
         """
                 Args:
@@ -220,7 +355,7 @@ class MinesweeperProxy(GameProxy):
                 """
 
         if not self.valid_session_request(request, request_size=2) \
-                or not self.valid_update_request(request):
+                or self.rejected("valid_update_request", self.valid_update_request(request)):
             return {"session_id": 0}
 
         return self.game_instance.update_game(request)
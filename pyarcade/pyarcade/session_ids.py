@@ -0,0 +1,92 @@
+from threading import Lock
+import time
+
+# A session id is a positive 53 bit integer laid out from the top bit down as
+#
+#     milliseconds since ID_EPOCH (41 bits) | shard (6 bits) | sequence within the millisecond (6 bits)
+#
+# Every shard stamps its own number into the ids it hands out, so workers never need to agree on anything to keep
+# ids unique, and the shard that owns a session can be read straight off its id. Ids only reveal how many sessions
+# a shard created within the same millisecond, and they keep growing across restarts.
+#
+# 53 bits is as much as a double holds exactly. JavaScript and many other JSON clients parse every number as one, and
+# would round a longer id into one that does not exist. 64 sessions a millisecond is still far more than a shard
+# creates, and the timestamp lasts until 2089.
+ID_EPOCH = 1577836800000  # 2020-01-01 UTC, in milliseconds
+TIMESTAMP_BITS = 41
+SHARD_BITS = 6
+SEQUENCE_BITS = 6
+ID_BITS = TIMESTAMP_BITS + SHARD_BITS + SEQUENCE_BITS
+
+MAX_SHARD = (1 << SHARD_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+SHARD_SHIFT = SEQUENCE_BITS
+TIMESTAMP_SHIFT = SHARD_BITS + SEQUENCE_BITS
+
+
+def shard_of(session_id: int) -> int:
+    """
+    Returns: The shard that created the session.
+    """
+    return (session_id >> SHARD_SHIFT) & MAX_SHARD
+
+
+def created_at(session_id: int) -> float:
+    """
+    Returns: When the session was created, in seconds since the Unix epoch.
+    """
+    return ((session_id >> TIMESTAMP_SHIFT) + ID_EPOCH) / 1000
+
+
+class SessionIdGenerator:
+    """ Hands out the session ids of one shard, in increasing order.
+
+    Note:
+        If the clock goes backwards, ids carry on from the last millisecond used rather than repeating earlier ones.
+        Once the MAX_SEQUENCE + 1 ids of a millisecond are used up the generator moves on to the next millisecond
+        early, which the clock then catches up with.
+    """
+
+    def __init__(self, shard: int = 0, clock=time.time):
+        """
+        Args:
+            shard: number of the shard or worker, from 0 to MAX_SHARD
+            clock: returns the time in seconds since the Unix epoch
+        """
+        if not 0 <= shard <= MAX_SHARD:
+            raise ValueError(f"shard must be from 0 to {MAX_SHARD}, not {shard}")
+
+        self.shard = shard
+        self.clock = clock
+        self._lock = Lock()
+        self._last_millisecond = 0
+        self._sequence = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> int:
+        with self._lock:
+            millisecond = int(self.clock() * 1000) - ID_EPOCH
+            if millisecond > self._last_millisecond:
+                self._last_millisecond = millisecond
+                self._sequence = 0
+            elif self._sequence < MAX_SEQUENCE:
+                self._sequence += 1
+            else:
+                self._last_millisecond += 1
+                self._sequence = 0
+
+            return self._last_millisecond << TIMESTAMP_SHIFT | self.shard << SHARD_SHIFT | self._sequence
+
+    def advance_past(self, session_id: int):
+        """ Makes every id handed out from now on larger than session_id, such as the largest id restored from disk. """
+        with self._lock:
+            last = self._last_millisecond << TIMESTAMP_SHIFT | self.shard << SHARD_SHIFT | self._sequence
+            if session_id < last:
+                return
+
+            # The next id takes the following sequence in the same millisecond, unless a higher shard made
+            # session_id, in which case only a later millisecond is larger
+            self._last_millisecond = session_id >> TIMESTAMP_SHIFT
+            self._sequence = MAX_SEQUENCE if shard_of(session_id) > self.shard else session_id & MAX_SEQUENCE
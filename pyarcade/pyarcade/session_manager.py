@@ -1,52 +1,266 @@
-from pyarcade.checkers_board import CheckerBoard, is_red_piece, is_black_piece
+from pyarcade.game_ids import CODE_LENGTH, ALPHABET_SIZE
+from pyarcade.session_ids import SessionIdGenerator, shard_of, TIMESTAMP_SHIFT
+from pyarcade.singleton import Singleton
+from array import array
 from itertools import count
+from random import Random, SystemRandom
+from threading import RLock
+from typing import TYPE_CHECKING
 import json
 
+# Every module imports the sessions, so the game modules are only imported once a game uses them
+if TYPE_CHECKING:
+    from pyarcade.checkers_board import CheckerBoard
+    from pyarcade.minesweeper_solver import MinesweeperSolver
+
+# Locks shared out among the sessions by id. A game holds its session's lock from changing the session until the
+# change is journaled, and a snapshot holds it while pickling the session, so a snapshot never holds a change without
+# the journal sequence that goes with it. Striping keeps the locks out of the sessions, which are pickled.
+SESSION_LOCKS = tuple(RLock() for idx in range(64))
+
+
+def new_seed() -> int:
+    """
+        Returns:
+            A fresh 32 bit seed for a session that was created without one. The system RNG is used so that no state
+            is shared with the module level random functions.
+    """
+    return SystemRandom().getrandbits(32)
+
+
+def advance_session_ids(session_id: int):
+    """
+        Args:
+            session_id: the largest id of the sessions restored from disk. Sessions created from now on get larger
+            ids.
+    """
+    if isinstance(Session._session_id, SessionIdGenerator):
+        Session._session_id.advance_past(session_id)
+    else:
+        Session._session_id = count(max(session_id + 1, next(Session._session_id)))
+
 
 class Session:
-    _session_id = count(1)
+    _session_id = SessionIdGenerator()
+    # Caches left out when a session is pickled, with the value each starts from again after unpickling
+    _transient = {"_reply_cache": None}
 
-    def __init__(self):
+    def __init__(self, seed: int = None):
         self.id = next(Session._session_id)
         self.done = False
+        self.seeded = seed is not None
+        self.seed = new_seed() if seed is None else seed
+        # Sequence of the last journal record applied to this session, so replay can skip the ones it already has
+        self._journal_sequence = 0
+        # Bumped by every change to the session, which drops the cached reply
+        self._version = 0
+        self._reply_cache = None
 
     def get_id(self) -> int:
         return self.id
 
+    def get_seed(self) -> int:
+        return self.seed
+
+    def is_seeded(self) -> bool:
+        """
+            Returns:
+                True if the seed was chosen by whoever created the session rather than drawn at random.
+        """
+        return self.seeded
+
+    def get_rng(self) -> Random:
+        """
+            Returns:
+                A new RNG for this session. Every call starts from the session's seed, so anything generated from it
+                can be reproduced from the seed alone.
+        """
+        return Random(self.seed)
+
     def is_done(self) -> bool:
         return self.done
 
     def set_to_done(self):
         self.done = True
+        self.changed()
+
+    def changed(self):
+        """
+            Note:
+                Anything that changes what a read of the session returns must call this, so the cached reply is
+                built again.
+        """
+        self._version += 1
+        self._reply_cache = None
+
+    def get_version(self) -> int:
+        return self._version
+
+    def lock(self) -> RLock:
+        # The low bits of an id are its sequence within a millisecond, often 0, so the millisecond is mixed in
+        return SESSION_LOCKS[(self.id ^ (self.id >> TIMESTAMP_SHIFT)) % len(SESSION_LOCKS)]
+
+    def cached_reply(self, key, build):
+        """
+            Args:
+                key: what the reply depends on besides the session, such as the game name and request options
+                build: callable taking no arguments that serializes the reply
+
+            Returns:
+                The (version, reply) of the reply build gave for this key and the version of the session it was built
+                from. It is built again only if the session changed since or the last reply cached was for another
+                key. One reply is kept per session.
+
+            Note:
+                The reply is cached under the version read before building it, so a move made while it is built
+                leaves it stale and the next read builds it again.
+        """
+        version = self._version
+        cache = self._reply_cache
+        if cache is not None and cache[0] == version and cache[1] == key:
+            return version, cache[2]
+
+        reply = build()
+        self._reply_cache = (version, key, reply)
+        return version, reply
+
+    def state(self) -> dict:
+        # Underscored attributes are caches or packed storage and are not serialized as they are
+        return {key: value for key, value in self.__dict__.items() if not key.startswith("_")}
 
     @staticmethod
     def serialize(obj):
         if not isinstance(obj, Session):
             return obj.to_json()
 
-        return obj.__dict__
+        return obj.state()
 
     def to_json(self):
         return json.dumps(self, default=Session.serialize)
 
+    def __getstate__(self) -> dict:
+        return {key: value for key, value in self.__dict__.items() if key not in self._transient}
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(self._transient)
+        self.__dict__.update(state)
+
     def __repr__(self):
         return self.get_id()
 
 
+def pack_guess(guess: tuple, score: tuple, code_length: int, alphabet_size: int) -> int:
+    """
+        Args:
+            guess: the guessed symbols
+            score: the (cows, bulls) the guess received
+            code_length: number of symbols in a guess
+            alphabet_size: number of symbols, which are 0 to alphabet_size - 1
+
+        Returns:
+            The guess as a base alphabet_size number shifted up one byte, with cows * (code_length + 1) + bulls in
+            the low byte. The largest game, 10 symbols out of 36, still fits in 64 bits.
+    """
+    guess_code = 0
+    for symbol in guess:
+        guess_code = guess_code * alphabet_size + symbol
+
+    cows, bulls = score
+    return guess_code << 8 | cows * (code_length + 1) + bulls
+
+
+def unpack_guess(packed: int, code_length: int, alphabet_size: int) -> tuple:
+    """
+        Returns:
+            The ((symbols), (cows, bulls)) tuple that pack_guess was given.
+    """
+    cows, bulls = divmod(packed & 0xFF, code_length + 1)
+    guess_code = packed >> 8
+    guess = [0] * code_length
+    for position in range(code_length - 1, -1, -1):
+        guess_code, guess[position] = divmod(guess_code, alphabet_size)
+
+    return tuple(guess), (cows, bulls)
+
+
 class MastermindSession(Session):
-    def __init__(self, sequence: tuple):
-        Session.__init__(self)
-        self.guesses = []
-        self.sequence = sequence
+    _transient = dict(Session._transient, _candidates=None, _guesses_applied=0)
 
-    def get_guesses(self) -> list:
-        return self.guesses
+    def __init__(self, sequence: tuple, seed: int = None, code_length: int = CODE_LENGTH,
+                 alphabet_size: int = ALPHABET_SIZE, repeats: bool = False):
+        Session.__init__(self, seed)
+        self._guesses = array("Q")
+        self.sequence = sequence
+        self.code_length = code_length
+        self.alphabet_size = alphabet_size
+        self.repeats = repeats
+        self._candidates = None
+        self._guesses_applied = 0
+
+    def get_guesses(self, since_index: int = 0) -> list:
+        """
+            Args:
+                since_index: number of guesses the caller already has
+
+            Returns:
+                The guesses from since_index on as ((symbols), (cows, bulls)) tuples. Guesses are stored packed in an
+                array and only the ones asked for are unpacked, so a caller that passes the count it already has pays
+                only for new guesses.
+        """
+        return [unpack_guess(packed, self.code_length, self.alphabet_size) for packed in self._guesses[since_index:]]
+
+    def guess_count(self) -> int:
+        return len(self._guesses)
 
     def get_sequence(self) -> tuple:
         return self.sequence
 
+    def get_code_length(self) -> int:
+        return self.code_length
+
+    def get_alphabet_size(self) -> int:
+        return self.alphabet_size
+
+    def allows_repeats(self) -> bool:
+        return self.repeats
+
+    def is_standard(self) -> bool:
+        """
+            Returns:
+                True if this is the 4 unique digits from 0-9 game that the score table and hints cover.
+        """
+        return self.code_length == CODE_LENGTH and self.alphabet_size == ALPHABET_SIZE and not self.repeats
+
     def insert_guess(self, guess: tuple):
-        self.guesses.append(guess)
+        self._guesses.append(pack_guess(guess[0], guess[1], self.code_length, self.alphabet_size))
+        self.changed()
+
+        if self._candidates is not None:
+            self.get_candidates()
+
+    def get_candidates(self) -> list:
+        """
+            Returns:
+                The codes of every sequence consistent with the guesses so far. The list is built on first use and
+                then narrowed by each new guess rather than recomputed.
+        """
+        # The solver pulls in numpy, which only hint and candidate requests need
+        from pyarcade.mastermind_solver import narrow_candidates, all_candidates
+
+        if self._candidates is None:
+            self._candidates = all_candidates()
+            self._guesses_applied = 0
+
+        for guess, score in self.get_guesses(self._guesses_applied):
+            self._candidates = narrow_candidates(self._candidates, guess, score)
+        self._guesses_applied = self.guess_count()
+
+        return self._candidates
+
+    def state(self) -> dict:
+        state = Session.state(self)
+        state["guesses"] = self.get_guesses()
+        return state
 
 
 def html_board(board: str) -> list:
@@ -66,9 +280,14 @@ def html_board(board: str) -> list:
 
 
 class MinesweeperSession(Session):
-    def __init__(self, data: dict):
-        Session.__init__(self)
+    _transient = dict(Session._transient, _solver=None, _hint=None)
+
+    def __init__(self, data: dict, seed: int = None, no_guess: bool = False):
+        Session.__init__(self, seed)
         self.data = data
+        self.no_guess = no_guess
+        self._solver = None
+        self._hint = None
 
     def is_flagged(self, cell: tuple) -> bool:
         state = self.data["player_board"][cell[0]][cell[1]]
@@ -82,16 +301,41 @@ class MinesweeperSession(Session):
             return False
         return True
 
+    def is_no_guess(self) -> bool:
+        return self.no_guess
+
+    def is_board_generated(self) -> bool:
+        return self.data["board"] is not None
+
+    def get_solver(self) -> "MinesweeperSolver":
+        if self._solver is None:
+            from pyarcade.minesweeper_solver import MinesweeperSolver
+            self._solver = MinesweeperSolver()
+        return self._solver
+
+    def get_hint(self) -> tuple:
+        """
+            Returns:
+                The cached (safe_cells, mine_cells) for the current board, or None if it has to be solved again.
+        """
+        return self._hint
+
+    def set_hint(self, hint: tuple):
+        self._hint = hint
+
+    def invalidate_hint(self):
+        self._hint = None
+
     def get_data(self) -> dict:
         return self.data
 
 
 class CheckerSession(Session):
-    def __init__(self, game: CheckerBoard):
+    def __init__(self, game: "CheckerBoard"):
         Session.__init__(self)
         self.game = game
 
-    def get_game(self) -> CheckerBoard:
+    def get_game(self) -> "CheckerBoard":
         return self.game
 
     def is_movable_piece(self, piece: tuple) -> bool:
@@ -101,6 +345,7 @@ class CheckerSession(Session):
         return self.game.is_valid_move_for_piece(origin, dest)
 
     def is_correct_team_turn(self, loc: tuple) -> bool:
+        from pyarcade.checkers_board import is_red_piece, is_black_piece
         piece = self.game.get_piece_at(loc[0], loc[1])
 
         if self.game.is_red_turn():
@@ -119,25 +364,35 @@ class CheckerSession(Session):
         }
 
 
-class Singleton:
-    _instance = None
-
-    @classmethod
-    def singleton(cls) -> 'Singleton':
-        if cls._instance is None:
-            cls._instance = cls()
-        return cls._instance
-
-
 class SessionManager(Singleton):
     """
     Session Manager
     """
     active_sessions = {}
+    # Journal that creates, moves and deletes are appended to, if any
+    journal = None
+    # Shard whose sessions this process holds
+    shard = 0
 
     def __init__(self):
         super(SessionManager, self).__init__()
 
+    @classmethod
+    def set_shard(cls, shard: int):
+        """
+            Args:
+                shard: number of this worker. Every session it creates from now on has the shard in its id.
+        """
+        cls.shard = shard
+        Session._session_id = SessionIdGenerator(shard)
+
+    def owns_session(self, session_id: int) -> bool:
+        """
+            Returns:
+                True if the session id was handed out by this shard, whether or not the session still exists.
+        """
+        return shard_of(session_id) == self.shard
+
     def is_checkers_session(self, session_id: int) -> bool:
         return type(self.active_sessions[session_id]) == CheckerSession
 
@@ -149,6 +404,8 @@ class SessionManager(Singleton):
 
     def delete_session(self, session_id: int):
         del self.active_sessions[session_id]
+        if self.journal is not None:
+            self.journal.append_delete(session_id)
         return {"session_id": session_id}
 
     def session_exists(self, session_id: int) -> bool:
@@ -159,17 +416,47 @@ class SessionManager(Singleton):
 
     def insert_active_session(self, session: Session) -> dict:
         self.active_sessions[session.get_id()] = session
+        if self.journal is not None:
+            self.journal.append_create(session)
         return {"session_id": session.get_id()}
 
-    def init_mastermind_session(self, sequence: tuple) -> dict:
-        return self.insert_active_session(MastermindSession(sequence))
+    def journal_move(self, session: Session, move):
+        """
+            Args:
+                session: the session the move was just made in
+                move: the move as the game's update_game received it
 
-    def init_checkers_session(self, board: CheckerBoard) -> dict:
+            Note:
+                Call with the session's lock held since before the move was made.
+        """
+        if self.journal is not None:
+            self.journal.append_move(session, move)
+
+    def init_mastermind_session(self, sequence: tuple, seed: int = None, code_length: int = CODE_LENGTH,
+                                alphabet_size: int = ALPHABET_SIZE, repeats: bool = False) -> dict:
+        return self.insert_active_session(MastermindSession(sequence, seed, code_length, alphabet_size, repeats))
+
+    def init_checkers_session(self, board: "CheckerBoard") -> dict:
         return self.insert_active_session(CheckerSession(board))
 
-    def init_minesweeper_session(self, data: dict) -> dict:
-        return self.insert_active_session(MinesweeperSession(data))
+    def init_minesweeper_session(self, data: dict, seed: int = None, no_guess: bool = False) -> dict:
+        return self.insert_active_session(MinesweeperSession(data, seed, no_guess))
 
     def get_sessions_by_type(self, session_type):
         return {session.__repr__(): session.to_json() for session in self.active_sessions.values() if
                 type(session) == session_type}
+
+    def count_sessions_by_type(self) -> dict:
+        """
+            Returns:
+                Every session type mapped to how many of its sessions are active.
+        """
+        # Sessions restored from a snapshot can be counted without decoding them
+        count_by_type = getattr(self.active_sessions, "count_by_type", None)
+        if count_by_type is not None:
+            return count_by_type()
+
+        counts = {}
+        for session in list(self.active_sessions.values()):
+            counts[type(session)] = counts.get(type(session), 0) + 1
+        return counts
@@ -0,0 +1,8 @@
+class Singleton:
+    _instance = None
+
+    @classmethod
+    def singleton(cls) -> 'Singleton':
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
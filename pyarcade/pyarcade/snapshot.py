@@ -0,0 +1,384 @@
+from array import array
+from bisect import bisect_left
+from threading import Event, Lock, Thread
+import logging
+import mmap
+import os
+import pickle
+import struct
+import sys
+import tempfile
+import zlib
+
+from pyarcade.session_manager import Session, SessionManager, MastermindSession, CheckerSession, advance_session_ids, \
+    MinesweeperSession
+
+logger = logging.getLogger(__name__)
+
+# Snapshot file layout, all little-endian:
+#
+#     header    magic b"PYARCSNP", format version (H), reserved (H), session count n (I),
+#               last journal sequence the sessions include (Q)                                24 bytes
+#     ids       every session id, sorted ascending (Q * n)
+#     offsets   where each session's blob starts within the blobs, plus where the last one ends (Q * (n + 1))
+#     kinds     each session's type, with COMPRESSED set if its blob is zlib compressed (B * n)
+#     padding   up to a multiple of 8 bytes
+#     blobs     each session pickled, one after another
+#
+# The ids, offsets and kinds are read straight out of the memory map, so opening a snapshot takes the same time
+# however many sessions it holds. A session is only unpickled the first time it is looked up.
+MAGIC = b"PYARCSNP"
+VERSION = 2
+HEADER = struct.Struct("<8sHHIQ")
+# Enough of the header to tell the format version, which later versions must keep
+PREFIX = struct.Struct("<8sH")
+
+SESSION_KINDS = {MastermindSession: 1, CheckerSession: 2, MinesweeperSession: 3}
+KIND_TYPES = {kind: session_type for session_type, kind in SESSION_KINDS.items()}
+COMPRESSED = 0x80
+# Blobs at least this long are compressed. Checker boards shrink to about a quarter.
+COMPRESS_AT = 256
+
+SNAPSHOT_INTERVAL = 30.0
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def register_session_kind(session_type: type, kind: int):
+    """ Gives the sessions of a game from a plugin their own kind, so they are counted without being decoded. """
+    if not 0 < kind < COMPRESSED:
+        raise SnapshotError(f"session kind must be from 1 to {COMPRESSED - 1}, not {kind}")
+    if KIND_TYPES.get(kind, session_type) is not session_type \
+            or SESSION_KINDS.get(session_type, kind) != kind:
+        raise SnapshotError(f"session kind {kind} of {session_type.__name__} is already taken")
+
+    SESSION_KINDS[session_type] = kind
+    KIND_TYPES[kind] = session_type
+
+
+def encode_session(session: Session) -> tuple:
+    """
+    Returns: The (kind, blob) stored for the session.
+    """
+    with session.lock():
+        blob = pickle.dumps(session, protocol=pickle.HIGHEST_PROTOCOL)
+    kind = SESSION_KINDS.get(type(session), 0)
+
+    if len(blob) >= COMPRESS_AT:
+        return kind | COMPRESSED, zlib.compress(blob, 1)
+
+    return kind, blob
+
+
+def decode_session(kind: int, blob) -> Session:
+    if kind & COMPRESSED:
+        blob = zlib.decompress(blob)
+    return pickle.loads(blob)
+
+
+def native_array(typecode: str, buffer) -> memoryview:
+    """
+    Returns: A view of the little-endian buffer as typecode items, without copying on little-endian machines.
+    """
+    if sys.byteorder == "little":
+        return buffer.cast(typecode)
+
+    values = array(typecode, buffer)
+    values.byteswap()
+    return memoryview(values)
+
+
+class SnapshotReader:
+    """ A snapshot file opened for lazy reading.
+
+    Note:
+        Snapshots are unpickled, so only load files this server wrote itself.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as snapshot_file:
+            self._map = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        view = memoryview(self._map)
+        if len(view) < PREFIX.size:
+            raise SnapshotError(f"{path} is too short to be a snapshot")
+
+        magic, version = PREFIX.unpack_from(view)
+        if magic != MAGIC:
+            raise SnapshotError(f"{path} is not a snapshot")
+        if version != VERSION:
+            raise SnapshotError(f"{path} is snapshot version {version}, this server reads version {VERSION}")
+        if len(view) < HEADER.size:
+            raise SnapshotError(f"{path} is too short to be a snapshot")
+
+        magic, version, reserved, self.count, self.journal_sequence = HEADER.unpack_from(view)
+
+        ids_at = HEADER.size
+        offsets_at = ids_at + 8 * self.count
+        kinds_at = offsets_at + 8 * (self.count + 1)
+        self._blobs_at = kinds_at + self.count + (-(kinds_at + self.count) % 8)
+
+        self.ids = native_array("Q", view[ids_at:offsets_at])
+        self.offsets = native_array("Q", view[offsets_at:kinds_at])
+        self.kinds = view[kinds_at:kinds_at + self.count]
+        self._view = view
+
+    def index_of(self, session_id: int) -> int:
+        """
+        Returns: Where the session is in the snapshot, or -1 if it is not in it.
+        """
+        if type(session_id) != int or session_id < 0:
+            return -1
+
+        idx = bisect_left(self.ids, session_id)
+        if idx < self.count and self.ids[idx] == session_id:
+            return idx
+        return -1
+
+    def blob(self, idx: int) -> memoryview:
+        return self._view[self._blobs_at + self.offsets[idx]:self._blobs_at + self.offsets[idx + 1]]
+
+    def session(self, idx: int) -> Session:
+        return decode_session(self.kinds[idx], self.blob(idx))
+
+    def max_id(self) -> int:
+        return self.ids[self.count - 1] if self.count else 0
+
+    def close(self):
+        self.ids.release()
+        self.offsets.release()
+        self.kinds.release()
+        self._view.release()
+        self._map.close()
+
+
+class LazySessions(dict):
+    """ The active sessions of a restarted server, decoding each snapshotted session on first lookup.
+
+    Note:
+        Sessions created since the restart and sessions already decoded are ordinary dict entries. The rest are
+        looked up in the snapshot by binary search over its sorted ids. Iterating decodes everything left, since
+        callers that walk every session need the session objects anyway.
+    """
+
+    def __init__(self, reader: SnapshotReader):
+        dict.__init__(self)
+        self.reader = reader
+        # Snapshot positions already decoded or deleted
+        self._taken = set()
+        self._decode_lock = Lock()
+
+    @property
+    def journal_sequence(self) -> int:
+        return self.reader.journal_sequence
+
+    def _pending_index(self, session_id) -> int:
+        idx = self.reader.index_of(session_id)
+        return -1 if idx in self._taken else idx
+
+    def __missing__(self, session_id):
+        with self._decode_lock:
+            if dict.__contains__(self, session_id):
+                return dict.__getitem__(self, session_id)
+
+            idx = self._pending_index(session_id)
+            if idx < 0:
+                raise KeyError(session_id)
+
+            session = self.reader.session(idx)
+            dict.__setitem__(self, session_id, session)
+            self._taken.add(idx)
+            return session
+
+    def __contains__(self, session_id) -> bool:
+        return dict.__contains__(self, session_id) or self._pending_index(session_id) >= 0
+
+    def get(self, session_id, default=None):
+        try:
+            return self[session_id]
+        except KeyError:
+            return default
+
+    def __setitem__(self, session_id, session: Session):
+        idx = self._pending_index(session_id)
+        if idx >= 0:
+            self._taken.add(idx)
+        dict.__setitem__(self, session_id, session)
+
+    def __delitem__(self, session_id):
+        idx = self._pending_index(session_id)
+        if idx >= 0:
+            self._taken.add(idx)
+            dict.pop(self, session_id, None)
+        else:
+            dict.__delitem__(self, session_id)
+
+    def __len__(self) -> int:
+        return dict.__len__(self) + self.reader.count - len(self._taken)
+
+    def pending(self) -> list:
+        """
+        Returns: The (session_id, kind, blob) of every session still undecoded.
+        """
+        taken = set(self._taken)
+        return [(self.reader.ids[idx], self.reader.kinds[idx], self.reader.blob(idx))
+                for idx in range(self.reader.count) if idx not in taken]
+
+    def load_all(self):
+        for idx in range(self.reader.count):
+            if idx not in self._taken:
+                self[self.reader.ids[idx]]
+
+    def count_by_type(self) -> dict:
+        counts = {}
+        for session in list(dict.values(self)):
+            counts[type(session)] = counts.get(type(session), 0) + 1
+
+        taken = set(self._taken)
+        for idx in range(self.reader.count):
+            if idx not in taken:
+                session_type = KIND_TYPES.get(self.reader.kinds[idx] & ~COMPRESSED)
+                counts[session_type] = counts.get(session_type, 0) + 1
+        return counts
+
+    def __iter__(self):
+        self.load_all()
+        return dict.__iter__(self)
+
+    def keys(self):
+        self.load_all()
+        return dict.keys(self)
+
+    def values(self):
+        self.load_all()
+        return dict.values(self)
+
+    def items(self):
+        self.load_all()
+        return dict.items(self)
+
+
+def write_snapshot(path: str, sessions: dict, journal_sequence: int = 0) -> int:
+    """
+    Args:
+        path: file to write
+        sessions: the active sessions. Sessions of a LazySessions that were never decoded are copied over as they
+        are.
+        journal_sequence: the last journal record already applied to every session written. Recovery replays the
+        journal from the record after it.
+
+    Returns: The number of sessions written.
+
+    Note:
+        The snapshot is written to a temporary file in the same directory, flushed to disk and then renamed over
+        path, so path always holds a whole snapshot. Each session is pickled on its own while requests carry on.
+    """
+    if isinstance(sessions, LazySessions):
+        entries = [(session_id, kind, bytes(blob)) for session_id, kind, blob in sessions.pending()]
+        decoded = list(dict.items(sessions))
+    else:
+        entries = []
+        decoded = list(sessions.items())
+
+    entries += [(session_id, *encode_session(session)) for session_id, session in decoded]
+    entries.sort(key=lambda entry: entry[0])
+
+    offsets = array("Q", [0])
+    for session_id, kind, blob in entries:
+        offsets.append(offsets[-1] + len(blob))
+    ids = array("Q", [entry[0] for entry in entries])
+    kinds = bytes(entry[1] for entry in entries)
+    if sys.byteorder != "little":
+        ids.byteswap()
+        offsets.byteswap()
+
+    directory = os.path.dirname(os.path.abspath(path))
+    descriptor, temporary = tempfile.mkstemp(prefix=".snapshot-", dir=directory)
+    try:
+        with os.fdopen(descriptor, "wb") as snapshot_file:
+            snapshot_file.write(HEADER.pack(MAGIC, VERSION, 0, len(entries), journal_sequence))
+            snapshot_file.write(ids.tobytes())
+            snapshot_file.write(offsets.tobytes())
+            snapshot_file.write(kinds)
+            snapshot_file.write(bytes(-(HEADER.size + 8 * len(entries) * 2 + 8 + len(kinds)) % 8))
+            for entry in entries:
+                snapshot_file.write(entry[2])
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+    return len(entries)
+
+
+def restore_sessions(path: str, session_manager: SessionManager = None) -> int:
+    """
+    Args:
+        path: snapshot to restore from
+        session_manager: defaults to the singleton
+
+    Returns: The number of sessions in the snapshot. They become the active sessions, decoded as they are looked
+    up, and new session ids continue after the largest one restored.
+    """
+    session_manager = session_manager or SessionManager.singleton()
+    reader = SnapshotReader(path)
+
+    type(session_manager).active_sessions = LazySessions(reader)
+    advance_session_ids(reader.max_id())
+    return reader.count
+
+
+class SnapshotWriter:
+    """ Writes a snapshot of the active sessions every interval seconds on a background thread.
+
+    Note:
+        With a journal, each snapshot first starts a new journal segment and records the last sequence before it.
+        Once the snapshot is on disk the segments it covers are discarded, unless the journal retains them.
+    """
+
+    def __init__(self, path: str, interval: float = SNAPSHOT_INTERVAL, session_manager: SessionManager = None,
+                 journal=None):
+        self.path = path
+        self.interval = interval
+        self.session_manager = session_manager or SessionManager.singleton()
+        self.journal = journal
+        self._stopped = Event()
+        self._worker = None
+
+    def snapshot(self) -> int:
+        if self.journal is None:
+            return write_snapshot(self.path, self.session_manager.active_sessions)
+
+        journal_sequence = self.journal.rotate()
+        written = write_snapshot(self.path, self.session_manager.active_sessions, journal_sequence)
+        if not self.journal.retain_segments:
+            self.journal.discard_through(journal_sequence)
+        return written
+
+    def start(self):
+        if self._worker is None:
+            self._stopped.clear()
+            self._worker = Thread(target=self._snapshot_loop, name="session-snapshot", daemon=True)
+            self._worker.start()
+
+    def stop(self, final_snapshot: bool = True):
+        if self._worker is not None:
+            self._stopped.set()
+            self._worker.join()
+            self._worker = None
+
+        if final_snapshot:
+            self.snapshot()
+
+    def _snapshot_loop(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.snapshot()
+            except Exception:
+                # A full disk or a session pickled while a request changes it only fails this snapshot. The sessions
+                # stay in memory and the journal keeps the segments, so the next interval simply tries again.
+                logger.exception("snapshot to %s failed, retrying in %s seconds", self.path, self.interval)
@@ -1,8 +1,13 @@
+import gzip
 import json
+import zlib
 from itertools import count
-from unittest import TestCase
+from unittest import TestCase, mock
 from pyarcade.app import create_app
 from pyarcade.game_ids import *
+from pyarcade.mastermind import MastermindGame
+from pyarcade.metrics import Metrics
+from pyarcade.msgpack_codec import packb, unpackb
 from pyarcade.session_manager import SessionManager, Session, CheckerSession, MastermindSession, MinesweeperSession
 
 
@@ -89,6 +94,18 @@ class ApplicationMastermindActiveSessionTestCase(TestCase):
         self.assertEqual(200, response.status_code)
         self.assertEqual(response.json['session_id'], session_id)
 
+    def test_hint_mastermind_active_session(self):
+        flask_app = create_app()
+        client = flask_app.test_client()
+
+        session_id = client.post("/create/mastermind", json={"game_id": MASTERMIND_ID}).json["session_id"]
+        client.post("/update/mastermind", json={"session_id": session_id, "guess": (0, 1, 2, 3)})
+        response = client.get("/hint/mastermind", json={"session_id": session_id})
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(response.json['session_id'], session_id)
+        self.assertTrue(len(response.json["candidates"]) > 0)
+
     def test_delete_mastermind_active_session(self):
         flask_app = create_app()
         client = flask_app.test_client()
@@ -117,6 +134,17 @@ class ApplicationCheckersNullSessionTestCase(TestCase):
         self.assertEqual(200, response.status_code)
         self.assertEqual(0, len(response.json["active_sessions"]))
 
+    def test_get_checkers_lists_sessions(self):
+        flask_app = create_app()
+        client = flask_app.test_client()
+
+        session_id = client.post("/create/checkers", json={"game_id": CHECKERS_ID}).json["session_id"]
+        client.post("/create/mastermind", json={"game_id": MASTERMIND_ID})
+        response = client.get("/game/checkers")
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual([str(session_id)], list(response.json["active_sessions"]))
+
     def test_create_checkers_wrong_game_id(self):
         flask_app = create_app()
         client = flask_app.test_client()
@@ -233,6 +261,32 @@ class ApplicationMinesweeperActiveSessionTestCase(TestCase):
         self.assertEqual(200, response.status_code)
         self.assertEqual(response.json['session_id'], session_id)
 
+    def test_hint_minesweeper_active_session(self):
+        flask_app = create_app()
+        client = flask_app.test_client()
+
+        session_id = client.post("/create/minesweeper", json={"game_id": MINESWEEPER_ID}).json["session_id"]
+        response = client.get("/hint/minesweeper", json={"session_id": session_id})
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(response.json['session_id'], session_id)
+        self.assertTrue("safe_cells" in response.json)
+        self.assertTrue("mine_cells" in response.json)
+
+    def test_hint_minesweeper_bad_session(self):
+        flask_app = create_app()
+        client = flask_app.test_client()
+
+        response = client.get("/hint/minesweeper", json={"session_id": -99})
+        self.assertEqual(0, response.json["session_id"])
+
+    def test_hint_checkers_not_found(self):
+        flask_app = create_app()
+        client = flask_app.test_client()
+
+        response = client.get("/hint/checkers", json={"session_id": 1})
+        self.assertEqual(404, response.status_code)
+
     def test_delete_minesweeper_active_session(self):
         flask_app = create_app()
         client = flask_app.test_client()
@@ -410,3 +464,301 @@ class ApplicationUserMenuInteractionsTestCase(TestCase):
         reply = client.get(menu["home"])
         self.assertTrue(reply is not None)
         self.assertTrue("menu" in reply.json)
+
+
+class ApplicationMetricsTestCase(TestCase):
+    def setUp(self):
+        SessionManager.active_sessions = {}
+        Metrics.singleton().reset()
+
+    def test_metrics_export(self):
+        flask_app = create_app()
+        client = flask_app.test_client()
+
+        client.post("/create/mastermind", json={"game_id": MASTERMIND_ID})
+        client.post("/create/mastermind", json={"game_id": CHECKERS_ID})
+        client.get("/play/nosuchgame", json={"session_id": 1})
+        response = client.get("/metrics")
+        text = response.get_data(as_text=True)
+
+        self.assertEqual(200, response.status_code)
+        self.assertTrue(response.content_type.startswith("text/plain"))
+        self.assertTrue('pyarcade_request_duration_seconds_count{route="/create/<string:game_name>",'
+                        'game="mastermind"} 2' in text)
+        self.assertTrue('game="unknown"' in text)
+        self.assertTrue('pyarcade_proxy_rejections_total{game="mastermind",validator="valid_game_id"} 1' in text)
+        self.assertTrue('pyarcade_live_sessions{game="mastermind"} 1' in text)
+        self.assertTrue('pyarcade_live_sessions{game="checkers"} 0' in text)
+
+
+class ApplicationProfileTestCase(TestCase):
+    def test_profile_toggled_at_runtime(self):
+        flask_app = create_app(debug_routes=True)
+        client = flask_app.test_client()
+
+        client.post("/create/checkers", json={"game_id": CHECKERS_ID})
+        self.assertEqual({}, client.post("/debug/profile", json={"sample_every": 1}).json["samples"])
+
+        client.post("/create/checkers", json={"game_id": CHECKERS_ID})
+        reply = client.post("/debug/profile", json={"sample_every": 0}).json
+        self.assertEqual(1, reply["samples"]["/create/<string:game_name> checkers"])
+
+        report = client.get("/debug/profile?sort=tottime&limit=5").get_data(as_text=True)
+        self.assertTrue("/create/<string:game_name> checkers (1 sampled requests)" in report)
+
+    def test_profile_bad_settings(self):
+        flask_app = create_app(profile_sample_every=4, debug_routes=True)
+        client = flask_app.test_client()
+
+        self.assertEqual(400, client.post("/debug/profile", json={"sample_every": -1}).status_code)
+        self.assertEqual(400, client.post("/debug/profile", json={"sample_every": "2"}).status_code)
+        self.assertEqual(4, client.post("/debug/profile", json={"reset": True}).json["sample_every"])
+
+    def test_profile_routes_off_by_default(self):
+        client = create_app().test_client()
+
+        self.assertEqual(404, client.post("/debug/profile", json={"sample_every": 1}).status_code)
+        self.assertEqual(404, client.get("/debug/profile").status_code)
+
+
+class ApplicationCachedReplyTestCase(TestCase):
+    def setUp(self):
+        SessionManager.active_sessions = {}
+
+    def test_play_reply_reused_until_move(self):
+        flask_app = create_app()
+        client = flask_app.test_client()
+        session_id = client.post("/create/mastermind", json={"game_id": MASTERMIND_ID}).json["session_id"]
+        session = SessionManager.singleton().get_session_by_id(session_id)
+
+        first = client.get("/play/mastermind", json={"session_id": session_id})
+        cached = session._reply_cache
+        second = client.get("/play/mastermind", json={"session_id": session_id})
+        self.assertTrue(cached is session._reply_cache)
+        self.assertEqual(first.get_data(), second.get_data())
+        self.assertEqual("application/json", second.mimetype)
+
+        client.post("/update/mastermind", json={"session_id": session_id, "guess": [0, 1, 2, 3]})
+        reply = client.get("/play/mastermind", json={"session_id": session_id}).json
+        self.assertEqual(1, len(reply["guesses"]))
+        self.assertEqual("/hint/mastermind", reply["menu"]["hint"])
+
+    def test_since_index_replies_not_mixed_up(self):
+        flask_app = create_app()
+        client = flask_app.test_client()
+        session_id = client.post("/create/mastermind", json={"game_id": MASTERMIND_ID}).json["session_id"]
+        client.post("/update/mastermind", json={"session_id": session_id, "guess": [0, 1, 2, 3]})
+
+        self.assertEqual(1, len(client.get("/play/mastermind", json={"session_id": session_id}).json["guesses"]))
+        self.assertEqual(0, len(client.get("/play/mastermind",
+                                           json={"session_id": session_id, "since_index": 1}).json["guesses"]))
+        self.assertEqual(1, len(client.get("/play/mastermind", json={"session_id": session_id}).json["guesses"]))
+
+    def test_checkers_move_changes_reply(self):
+        flask_app = create_app()
+        client = flask_app.test_client()
+        session_id = client.post("/create/checkers", json={"game_id": CHECKERS_ID}).json["session_id"]
+
+        before = client.get("/play/checkers", json={"session_id": session_id}).json
+        board = SessionManager.singleton().get_session_by_id(session_id).get_game()
+        board.get_valid_moves(board.get_piece_at(3, 2))
+        client.post("/update/checkers", json={"session_id": session_id, "move": [[3, 2], [4, 1]]})
+        after = client.get("/play/checkers", json={"session_id": session_id}).json
+
+        self.assertEqual("RED", before["game"]["turn"])
+        self.assertNotEqual(before["game"]["turn"], after["game"]["turn"])
+
+    def test_invalid_play_request_not_cached(self):
+        flask_app = create_app()
+        client = flask_app.test_client()
+
+        self.assertEqual(0, client.get("/play/minesweeper", json={"session_id": 1}).json["session_id"])
+
+
+class ApplicationConditionalPlayTestCase(TestCase):
+    def setUp(self):
+        SessionManager.active_sessions = {}
+
+    def test_matching_etag_not_modified(self):
+        flask_app = create_app()
+        client = flask_app.test_client()
+        session_id = client.post("/create/minesweeper", json={"game_id": MINESWEEPER_ID}).json["session_id"]
+
+        response = client.get("/play/minesweeper", json={"session_id": session_id})
+        etag = response.headers["ETag"]
+        self.assertEqual("no-cache", response.headers["Cache-Control"])
+
+        SessionManager.singleton().get_session_by_id(session_id)._reply_cache = None
+        response = client.get("/play/minesweeper", json={"session_id": session_id}, headers={"If-None-Match": etag})
+        self.assertEqual(304, response.status_code)
+        self.assertEqual(b"", response.get_data())
+        self.assertEqual(etag, response.headers["ETag"])
+        # Nothing was serialized for the 304
+        self.assertEqual(None, SessionManager.singleton().get_session_by_id(session_id)._reply_cache)
+
+    def test_move_changes_etag(self):
+        flask_app = create_app()
+        client = flask_app.test_client()
+        session_id = client.post("/create/minesweeper", json={"game_id": MINESWEEPER_ID}).json["session_id"]
+        etag = client.get("/play/minesweeper", json={"session_id": session_id}).headers["ETag"]
+
+        client.post("/update/minesweeper", json={"session_id": session_id, "unhide_cell": [4, 4]})
+        response = client.get("/play/minesweeper", json={"session_id": session_id}, headers={"If-None-Match": etag})
+
+        self.assertEqual(200, response.status_code)
+        self.assertNotEqual(etag, response.headers["ETag"])
+        self.assertFalse(response.json["board"] is None)
+
+    def test_etag_differs_by_since_index(self):
+        flask_app = create_app()
+        client = flask_app.test_client()
+        session_id = client.post("/create/mastermind", json={"game_id": MASTERMIND_ID}).json["session_id"]
+        etag = client.get("/play/mastermind", json={"session_id": session_id}).headers["ETag"]
+
+        response = client.get("/play/mastermind", json={"session_id": session_id, "since_index": 0},
+                              headers={"If-None-Match": etag})
+        self.assertEqual(304, response.status_code)
+        response = client.get("/play/mastermind", json={"session_id": session_id, "since_index": 1},
+                              headers={"If-None-Match": etag})
+        self.assertEqual(200, response.status_code)
+
+    def test_etag_names_the_version_the_reply_was_read_at(self):
+        flask_app = create_app()
+        client = flask_app.test_client()
+        session_id = client.post("/create/mastermind", json={"game_id": MASTERMIND_ID}).json["session_id"]
+        session = SessionManager.singleton().get_session_by_id(session_id)
+        read_game = MastermindGame.read_game
+
+        def read_then_move(game, request):
+            reply = read_game(game, request)
+            session.insert_guess(((4, 5, 6, 7), (0, 0)))
+            return reply
+
+        with mock.patch.object(MastermindGame, "read_game", read_then_move):
+            response = client.get("/play/mastermind", json={"session_id": session_id})
+        self.assertEqual([], response.json["guesses"])
+
+        response = client.get("/play/mastermind", json={"session_id": session_id},
+                              headers={"If-None-Match": response.headers["ETag"]})
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(1, len(response.json["guesses"]))
+
+    def test_invalid_request_has_no_etag(self):
+        flask_app = create_app()
+        client = flask_app.test_client()
+        response = client.get("/play/checkers", json={"session_id": 1}, headers={"If-None-Match": "*"})
+
+        self.assertEqual(200, response.status_code)
+        self.assertFalse("ETag" in response.headers)
+
+
+class ApplicationCompressionTestCase(TestCase):
+    def setUp(self):
+        SessionManager.active_sessions = {}
+
+    def test_large_play_reply_compressed_once(self):
+        flask_app = create_app()
+        client = flask_app.test_client()
+        session_id = client.post("/create/checkers", json={"game_id": CHECKERS_ID}).json["session_id"]
+        plain = client.get("/play/checkers", json={"session_id": session_id})
+
+        response = client.get("/play/checkers", json={"session_id": session_id}, headers={"Accept-Encoding": "gzip"})
+        self.assertEqual("gzip", response.headers["Content-Encoding"])
+        self.assertTrue("Accept-Encoding" in response.headers["Vary"])
+        self.assertEqual(plain.get_data(), gzip.decompress(response.get_data()))
+        self.assertNotEqual(plain.headers["ETag"], response.headers["ETag"])
+
+        cached = SessionManager.singleton().get_session_by_id(session_id)._reply_cache[2]
+        self.assertTrue(cached.encoded("gzip") is cached.encoded("gzip"))
+
+        response = client.get("/play/checkers", json={"session_id": session_id},
+                              headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["ETag"]})
+        self.assertEqual(304, response.status_code)
+
+    def test_small_reply_sent_as_is(self):
+        flask_app = create_app()
+        client = flask_app.test_client()
+        session_id = client.post("/create/mastermind", json={"game_id": MASTERMIND_ID}).json["session_id"]
+
+        response = client.get("/play/mastermind", json={"session_id": session_id},
+                              headers={"Accept-Encoding": "gzip, deflate"})
+        self.assertFalse("Content-Encoding" in response.headers)
+        self.assertEqual(session_id, response.json["session_id"])
+
+    def test_update_reply_deflated(self):
+        flask_app = create_app()
+        client = flask_app.test_client()
+        session_id = client.post("/create/checkers", json={"game_id": CHECKERS_ID}).json["session_id"]
+        board = SessionManager.singleton().get_session_by_id(session_id).get_game()
+        board.get_valid_moves(board.get_piece_at(3, 2))
+
+        response = client.post("/update/checkers", json={"session_id": session_id, "move": [[3, 2], [4, 1]]},
+                               headers={"Accept-Encoding": "deflate"})
+        self.assertEqual("deflate", response.headers["Content-Encoding"])
+        self.assertEqual(session_id, json.loads(zlib.decompress(response.get_data()))["session_id"])
+
+    def test_compression_off(self):
+        flask_app = create_app(compress_level=0)
+        client = flask_app.test_client()
+        session_id = client.post("/create/checkers", json={"game_id": CHECKERS_ID}).json["session_id"]
+
+        response = client.get("/play/checkers", json={"session_id": session_id}, headers={"Accept-Encoding": "gzip"})
+        self.assertFalse("Content-Encoding" in response.headers)
+
+
+class ApplicationMessagePackTestCase(TestCase):
+    MSGPACK = {"Content-Type": "application/msgpack", "Accept": "application/msgpack"}
+
+    def setUp(self):
+        SessionManager.active_sessions = {}
+
+    def test_move_sent_and_answered_in_msgpack(self):
+        client = create_app().test_client()
+        session_id = unpackb(client.post("/create/checkers", data=packb({"game_id": CHECKERS_ID}),
+                                         headers=self.MSGPACK).data)["session_id"]
+        board = SessionManager.singleton().get_session_by_id(session_id).get_game()
+        board.get_valid_moves(board.get_piece_at(3, 2))
+
+        response = client.post("/update/checkers", data=packb({"session_id": session_id, "move": ((3, 2), (4, 1))}),
+                               headers=self.MSGPACK)
+
+        self.assertEqual("application/msgpack", response.mimetype)
+        self.assertTrue("Accept" in response.headers["Vary"])
+        self.assertEqual(session_id, unpackb(response.data)["session_id"])
+        self.assertEqual("/update/checkers", unpackb(response.data)["menu"]["update"])
+
+    def test_json_clients_are_unaffected(self):
+        client = create_app().test_client()
+        session_id = client.post("/create/mastermind", data=packb({"game_id": MASTERMIND_ID}),
+                                 headers={"Content-Type": "application/msgpack"}).json["session_id"]
+
+        response = client.post("/update/mastermind", json={"session_id": session_id, "guess": [0, 1, 2, 3]})
+
+        self.assertEqual("application/json", response.mimetype)
+        self.assertEqual(1, len(response.json["guesses"]))
+
+    def test_play_reply_is_cached_and_tagged_per_format(self):
+        client = create_app().test_client()
+        session_id = client.post("/create/mastermind", json={"game_id": MASTERMIND_ID}).json["session_id"]
+        as_json = client.get("/play/mastermind", json={"session_id": session_id})
+
+        response = client.get("/play/mastermind", data=packb({"session_id": session_id}), headers=self.MSGPACK)
+
+        self.assertEqual("application/msgpack", response.mimetype)
+        # Arrays come back as tuples, which JSON turns back into lists
+        self.assertEqual(json.loads(as_json.data), json.loads(json.dumps(unpackb(response.data))))
+        self.assertNotEqual(as_json.headers["ETag"], response.headers["ETag"])
+        response = client.get("/play/mastermind", data=packb({"session_id": session_id}),
+                              headers=dict(self.MSGPACK, **{"If-None-Match": response.headers["ETag"]}))
+        self.assertEqual(304, response.status_code)
+
+    def test_unknown_game_menu_in_msgpack(self):
+        response = create_app().test_client().post("/create/chess", data=packb({"game_id": 9}), headers=self.MSGPACK)
+
+        self.assertEqual(404, response.status_code)
+        self.assertTrue("mastermind" in unpackb(response.data))
+
+    def test_malformed_msgpack_is_a_bad_request(self):
+        response = create_app().test_client().post("/create/mastermind", data=b"\x92\x01", headers=self.MSGPACK)
+
+        self.assertEqual(400, response.status_code)
@@ -0,0 +1,96 @@
+from pyarcade.board_pool import BoardPool
+from pyarcade.checkers import Checkers
+from pyarcade.checkers_board import CheckerBoard
+from pyarcade.session_manager import SessionManager
+import time
+import unittest
+
+
+class BoardPoolTestCase(unittest.TestCase):
+    def test_fill_reaches_high_water(self):
+        pool = BoardPool(CheckerBoard, low_water=2, high_water=5)
+        pool.fill()
+        self.assertEqual(5, pool.size())
+
+    def test_pop_from_filled_pool(self):
+        pool = BoardPool(CheckerBoard, low_water=2, high_water=5)
+        pool.fill()
+        board = pool.pop()
+        pool.stop()
+
+        self.assertEqual(CheckerBoard, type(board))
+        self.assertTrue(pool.size() >= 4)
+
+    def test_pop_from_empty_pool_builds_inline(self):
+        built = []
+
+        def factory():
+            built.append(object())
+            return built[-1]
+
+        pool = BoardPool(factory, low_water=0, high_water=0)
+        board = pool.pop()
+        pool.stop()
+
+        self.assertTrue(board is built[0])
+
+    def test_pop_triggers_background_refill(self):
+        pool = BoardPool(CheckerBoard, low_water=3, high_water=6)
+        pool.pop()
+
+        deadline = time.time() + 5
+        while pool.size() < 6 and time.time() < deadline:
+            time.sleep(0.01)
+        pool.stop()
+
+        self.assertEqual(6, pool.size())
+
+    def test_refill_continues_after_factory_fails(self):
+        failures = [RuntimeError("out of boards")]
+
+        def factory():
+            if failures:
+                raise failures.pop()
+            return CheckerBoard()
+
+        pool = BoardPool(CheckerBoard, low_water=2, high_water=3)
+        pool.fill()
+        pool.factory = factory
+
+        with self.assertLogs("pyarcade.board_pool", "ERROR") as logs:
+            pool.pop()
+            pool.pop()
+            deadline = time.time() + 5
+            while not logs.records and time.time() < deadline:
+                time.sleep(0.01)
+
+        pool.pop()
+        deadline = time.time() + 5
+        while pool.size() < 3 and time.time() < deadline:
+            time.sleep(0.01)
+        pool.stop()
+
+        self.assertEqual(3, pool.size())
+
+    def test_pop_never_returns_same_board_twice(self):
+        pool = BoardPool(CheckerBoard, low_water=2, high_water=4)
+        boards = [pool.pop() for idx in range(20)]
+        pool.stop()
+
+        self.assertEqual(20, len(set(id(board) for board in boards)))
+
+
+class CheckersBoardPoolTestCase(unittest.TestCase):
+    def setUp(self):
+        SessionManager.active_sessions = {}
+
+    def test_create_game_uses_pool(self):
+        pool = BoardPool(CheckerBoard, low_water=0, high_water=1)
+        pool.fill()
+        pooled_board = pool.boards[0]
+        game = Checkers(board_pool=pool)
+
+        session_id = game.create_game({"game_id": 1})["session_id"]
+        pool.stop()
+
+        self.assertTrue(SessionManager.active_sessions[session_id].get_game() is pooled_board)
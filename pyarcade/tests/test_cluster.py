@@ -0,0 +1,160 @@
+from http.client import RemoteDisconnected
+from unittest import mock
+import os
+import signal
+import socket
+import tempfile
+import time
+import unittest
+
+from werkzeug.test import Client
+
+from pyarcade.cluster import Cluster, Dispatcher, WorkerConnections
+from pyarcade.game_ids import MASTERMIND_ID, CHECKERS_ID, MINESWEEPER_ID
+from pyarcade.msgpack_codec import packb
+from pyarcade.session_ids import shard_of, SessionIdGenerator, MAX_SHARD
+
+
+class DispatcherRouteTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dispatcher = Dispatcher(["/nonexistent/shard-0.sock", "/nonexistent/shard-1.sock",
+                                      "/nonexistent/shard-2.sock"])
+
+    def test_session_id_routes_to_its_shard(self):
+        session_id = next(SessionIdGenerator(shard=2))
+        self.assertEqual(2, self.dispatcher.route({}, f'{{"session_id": {session_id}}}'.encode()))
+
+    def test_shard_query_overrides_session_id(self):
+        session_id = next(SessionIdGenerator(shard=2))
+        self.assertEqual(1, self.dispatcher.route({"shard": "1"}, f'{{"session_id": {session_id}}}'.encode()))
+
+    def test_msgpack_session_id_routes_to_its_shard(self):
+        session_id = next(SessionIdGenerator(shard=1))
+        self.assertEqual(1, self.dispatcher.route({}, packb({"session_id": session_id}), "application/msgpack"))
+
+    def test_requests_without_session_take_turns(self):
+        self.assertEqual([0, 1, 2, 0], [self.dispatcher.route({}, b'{"game_id": 0}') for idx in range(4)])
+        self.assertEqual(1, self.dispatcher.route({}, b"not json"))
+
+    def test_unreachable_worker_gives_bad_gateway(self):
+        response = Client(self.dispatcher).post("/create/mastermind", json={"game_id": MASTERMIND_ID})
+        self.assertEqual(502, response.status_code)
+
+    def test_worker_state_needs_a_shard(self):
+        client = Client(self.dispatcher)
+        self.assertEqual(400, client.get("/metrics").status_code)
+        self.assertEqual(400, client.get("/debug/profile").status_code)
+        # With a shard the request is forwarded, here to a worker that is not running
+        self.assertEqual(502, client.get("/metrics?shard=1").status_code)
+
+
+class WorkerConnectionsTestCase(unittest.TestCase):
+    def dropping_connections(self) -> tuple:
+        """
+        Returns: WorkerConnections whose single connection is dropped by the worker on every request, and that
+        connection.
+        """
+        connection = mock.Mock()
+        connection.getresponse.side_effect = RemoteDisconnected("worker went away")
+        worker = WorkerConnections("/nonexistent/shard-0.sock", size=0)
+        worker._idle.put(connection)
+        return worker, connection
+
+    def test_dropped_post_is_not_sent_again(self):
+        worker, connection = self.dropping_connections()
+        with self.assertRaises(RemoteDisconnected):
+            worker.forward("POST", "/update/checkers", {}, b'{"session_id": 1}')
+        self.assertEqual(1, connection.request.call_count)
+
+    def test_dropped_get_is_sent_again(self):
+        worker, connection = self.dropping_connections()
+        with self.assertRaises(RemoteDisconnected):
+            worker.forward("GET", "/play/checkers", {}, b'{"session_id": 1}')
+        self.assertEqual(2, connection.request.call_count)
+
+    def test_silent_worker_times_out(self):
+        with tempfile.TemporaryDirectory() as directory:
+            socket_path = os.path.join(directory, "shard-0.sock")
+            # Connections are accepted by the listen backlog but nothing ever replies to them
+            listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            listener.bind(socket_path)
+            listener.listen()
+            try:
+                response = Client(Dispatcher([socket_path], timeout=0.2)).get("/play/checkers",
+                                                                            json={"session_id": 1})
+            finally:
+                listener.close()
+
+        self.assertEqual(504, response.status_code)
+
+
+class ClusterWorkerCountTestCase(unittest.TestCase):
+    def test_workers_limited_to_shards_in_an_id(self):
+        self.assertRaises(ValueError, Cluster, MAX_SHARD + 2)
+        with mock.patch("os.cpu_count", return_value=4 * (MAX_SHARD + 1)):
+            self.assertEqual(MAX_SHARD + 1, Cluster(socket_directory="/nonexistent").worker_count)
+
+
+class ClusterTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.cluster = Cluster(workers=2)
+        cls.client = Client(cls.cluster.start())
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.cluster.stop()
+
+    def test_sessions_spread_over_workers(self):
+        session_ids = [self.client.post("/create/mastermind", json={"game_id": MASTERMIND_ID}).json["session_id"]
+                       for idx in range(4)]
+        self.assertEqual({0, 1}, {shard_of(session_id) for session_id in session_ids})
+
+    def test_requests_reach_the_owning_worker(self):
+        for idx in range(2):
+            session_id = self.client.post("/create/checkers", json={"game_id": CHECKERS_ID}).json["session_id"]
+            response = self.client.get("/play/checkers", json={"session_id": session_id})
+
+            self.assertEqual(200, response.status_code)
+            self.assertEqual(session_id, response.json["session_id"])
+
+            self.client.post("/delete/checkers", json={"session_id": session_id})
+            self.assertFalse(self.client.get("/play/checkers", json={"session_id": session_id}).json["session_id"])
+
+    def test_game_listing_merges_every_worker(self):
+        session_ids = [self.client.post("/create/mastermind", json={"game_id": MASTERMIND_ID}).json["session_id"]
+                       for idx in range(2)]
+        self.assertEqual({0, 1}, {shard_of(session_id) for session_id in session_ids})
+
+        active_sessions = self.client.get("/game/mastermind").json["active_sessions"]
+        self.assertTrue({str(session_id) for session_id in session_ids} <= set(active_sessions))
+
+        shard_sessions = self.client.get(f"/game/mastermind?shard={shard_of(session_ids[0])}").json["active_sessions"]
+        self.assertIn(str(session_ids[0]), shard_sessions)
+        self.assertNotIn(str(session_ids[1]), shard_sessions)
+
+    def test_exited_worker_is_started_again(self):
+        process = self.cluster.processes[1]
+        os.kill(process.pid, signal.SIGKILL)
+
+        deadline = time.monotonic() + 10
+        while self.client.get("/metrics?shard=1").status_code != 200:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.05)
+
+        self.assertIsNot(process, self.cluster.processes[1])
+        session_ids = [self.client.post("/create/checkers", json={"game_id": CHECKERS_ID}).json["session_id"]
+                       for idx in range(2)]
+        self.assertEqual({0, 1}, {shard_of(session_id) for session_id in session_ids})
+
+    def live_minesweeper_sessions(self, shard: int) -> int:
+        metrics = self.client.get(f"/metrics?shard={shard}").get_data(as_text=True)
+        return int(metrics.split('pyarcade_live_sessions{game="minesweeper"} ')[1].split()[0])
+
+    def test_shard_query_reaches_each_worker(self):
+        before = [self.live_minesweeper_sessions(shard) for shard in (0, 1)]
+        session_id = self.client.post("/create/minesweeper", json={"game_id": MINESWEEPER_ID}).json["session_id"]
+        after = [self.live_minesweeper_sessions(shard) for shard in (0, 1)]
+
+        self.assertEqual(before[shard_of(session_id)] + 1, after[shard_of(session_id)])
+        self.assertEqual(before[1 - shard_of(session_id)], after[1 - shard_of(session_id)])
@@ -0,0 +1,34 @@
+import gzip
+import unittest
+import zlib
+
+from werkzeug.datastructures import Accept
+from werkzeug.http import parse_accept_header
+
+from pyarcade.compression import EncodedBody, compress, negotiate_encoding
+
+
+class CompressionTestCase(unittest.TestCase):
+    def test_gzip_and_deflate_round_trip(self):
+        body = b'{"piece": " "}' * 200
+
+        self.assertEqual(body, gzip.decompress(compress(body, "gzip")))
+        self.assertEqual(body, zlib.decompress(compress(body, "deflate")))
+        self.assertTrue(len(compress(body, "gzip", 1)) < len(body) // 10)
+
+    def test_negotiate_encoding(self):
+        def negotiate(header: str) -> str:
+            return negotiate_encoding(parse_accept_header(header, Accept))
+
+        self.assertEqual("gzip", negotiate("gzip, deflate, br"))
+        self.assertEqual("deflate", negotiate("deflate"))
+        self.assertEqual("deflate", negotiate("gzip;q=0, deflate"))
+        self.assertEqual(None, negotiate("br"))
+        self.assertEqual(None, negotiate(""))
+
+    def test_encoded_body_compressed_once(self):
+        reply = EncodedBody(b"x" * 2000)
+        first = reply.encoded("gzip")
+
+        self.assertTrue(first is reply.encoded("gzip"))
+        self.assertEqual(reply.body, zlib.decompress(reply.encoded("deflate")))
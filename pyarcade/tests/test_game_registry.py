@@ -0,0 +1,227 @@
+from importlib.metadata import EntryPoint
+from unittest import mock
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from pyarcade.app import create_app
+from pyarcade.game_ids import *
+from pyarcade.game_interface import GameInterface
+from pyarcade.game_registry import GameRegistry, GameRegistration, default_registry, load_mastermind, \
+    ENTRY_POINT_GROUP
+from pyarcade.journal import Journal, MoveCodec, MOVE_CODECS, replay_journal
+from pyarcade.mastermind import MastermindGame
+from pyarcade.proxy import GameProxy, MastermindGameProxy
+from pyarcade.session_manager import SessionManager, Session, CheckerSession, MastermindSession, MinesweeperSession
+from pyarcade.snapshot import KIND_TYPES, SESSION_KINDS
+
+
+# A game as a plugin package would declare it: take one to three from the pile, taking the last one wins
+class NimSession(Session):
+    def __init__(self, pile: int):
+        Session.__init__(self)
+        self.pile = pile
+
+
+class NimGame(GameInterface):
+    def __init__(self):
+        self.session_manager = SessionManager.singleton()
+
+    def create_game(self, request: dict) -> dict:
+        return self.session_manager.insert_active_session(NimSession(pile=10))
+
+    def read_game(self, request: dict) -> dict:
+        session = self.session_manager.get_session_by_id(request["session_id"])
+        return {"session_id": session.get_id(), "pile": session.pile, "done": session.is_done()}
+
+    def update_game(self, request: dict) -> dict:
+        session = self.session_manager.get_session_by_id(request["session_id"])
+        with session.lock():
+            session.pile -= request["take"]
+            session.changed()
+            if session.pile == 0:
+                session.set_to_done()
+            self.session_manager.journal_move(session, request["take"])
+        return self.read_game(request)
+
+    def delete_game(self, request: dict) -> dict:
+        return self.session_manager.delete_session(request["session_id"])
+
+
+class NimProxy(GameProxy):
+    game_id = 90
+    game_name = "nim"
+
+    def update_game(self, request: dict) -> dict:
+        if not self.valid_session_request(request, request_size=2) \
+                or self.rejected("valid_update_request", self.key_present(request, "take")
+                                 and self.correct_type(request, "take", int())
+                                 and self.input_in_valid_range((request["take"],), _max=3)):
+            return {"session_id": 0}
+
+        return self.game_instance.update_game(request)
+
+
+class NimMoveCodec(MoveCodec):
+    def new_game(self):
+        return NimGame()
+
+    def encode(self, session: NimSession, move) -> bytes:
+        return bytes((move,))
+
+    def replay(self, session: NimSession, payload: bytes):
+        self.game().update_game({"session_id": session.get_id(), "take": payload[0]})
+
+
+NIM = GameRegistration("nim", 90, NimSession, lambda: NimProxy(NimGame()), session_kind=90,
+                       move_codec=NimMoveCodec())
+
+
+def plugins(*values) -> list:
+    return [EntryPoint(name=value.rsplit(":", 1)[-1].lower(), value=value, group=ENTRY_POINT_GROUP)
+            for value in values]
+
+
+class GameRegistryTestCase(unittest.TestCase):
+    def test_games_load_on_first_lookup(self):
+        registry = default_registry()
+        self.assertEqual(["mastermind", "checkers", "minesweeper"], registry.names())
+        self.assertFalse(registry.is_loaded("mastermind"))
+
+        game = registry["mastermind"]
+
+        self.assertTrue(registry.is_loaded("mastermind"))
+        self.assertFalse(registry.is_loaded("checkers"))
+        self.assertIsInstance(game["proxy"], MastermindGameProxy)
+        self.assertEqual(MastermindGame, game["game_type"])
+        self.assertTrue(game["_hints"])
+        self.assertIs(game, registry["mastermind"])
+
+    def test_membership_and_session_types_do_not_load(self):
+        registry = default_registry()
+
+        self.assertTrue("checkers" in registry)
+        self.assertFalse("chess" in registry)
+        self.assertEqual({"mastermind": MastermindSession, "checkers": CheckerSession,
+                          "minesweeper": MinesweeperSession}, registry.session_types())
+        self.assertFalse(any(registry.is_loaded(name) for name in registry.names()))
+
+    def test_unknown_game_raises(self):
+        with self.assertRaises(KeyError):
+            default_registry()["chess"]
+
+    def test_clashing_registration_raises(self):
+        registry = default_registry()
+
+        with self.assertRaises(ValueError):
+            registry.register(GameRegistration("mastermind", 99, MastermindSession, load_mastermind))
+        with self.assertRaises(ValueError):
+            registry.register(GameRegistration("mastermind2", MASTERMIND_ID, MastermindSession, load_mastermind))
+
+    def test_app_only_loads_games_it_is_asked_for(self):
+        registry = default_registry()
+        client = create_app(games=registry).test_client()
+
+        self.assertEqual({"mastermind": "/game/mastermind", "checkers": "/game/checkers",
+                          "minesweeper": "/game/minesweeper"}, client.get("/").json["menu"])
+        client.get("/metrics")
+        self.assertFalse(any(registry.is_loaded(name) for name in registry.names()))
+
+        reply = client.post("/create/checkers", json={"game_id": CHECKERS_ID}).json
+
+        self.assertNotEqual(0, reply["session_id"])
+        self.assertEqual(["checkers"], [name for name in registry.names() if registry.is_loaded(name)])
+
+    def test_importing_app_leaves_games_unimported(self):
+        modules = ("pyarcade.mastermind", "pyarcade.checkers", "pyarcade.minesweeper", "pyarcade.mastermind_solver",
+                   "numpy", "concurrent.futures.process")
+        script = f"import sys, pyarcade.app; print([name for name in {modules!r} if name in sys.modules])"
+
+        output = subprocess.run([sys.executable, "-c", script], check=True, capture_output=True, text=True).stdout
+
+        self.assertEqual("[]", output.strip())
+
+    def test_app_without_persistence_leaves_it_unimported(self):
+        modules = ("pyarcade.journal", "pyarcade.snapshot", "pyarcade.checkers_board", "pyarcade.minesweeper_solver",
+                   "pyarcade.mastermind_scores", "mmap")
+        script = f"import sys, pyarcade.app; pyarcade.app.create_app(); " \
+                 f"print([name for name in {modules!r} if name in sys.modules])"
+
+        output = subprocess.run([sys.executable, "-c", script], check=True, capture_output=True, text=True).stdout
+
+        self.assertEqual("[]", output.strip())
+
+
+class GamePluginTestCase(unittest.TestCase):
+    def setUp(self):
+        SessionManager.active_sessions = {}
+
+    def tearDown(self):
+        SessionManager.active_sessions = {}
+        SESSION_KINDS.pop(NimSession, None)
+        KIND_TYPES.pop(90, None)
+        MOVE_CODECS.pop(NimSession, None)
+
+    def test_plugin_game_is_served(self):
+        with mock.patch("importlib.metadata.entry_points", return_value=plugins(f"{__name__}:NIM")):
+            client = create_app(games=default_registry()).test_client()
+
+            self.assertEqual("/game/nim", client.get("/").json["menu"]["nim"])
+            session_id = client.post("/create/nim", json={"game_id": 90}).json["session_id"]
+            self.assertEqual(0, client.post("/create/nim", json={"game_id": MASTERMIND_ID}).json["session_id"])
+            rejected = client.post("/update/nim", json={"session_id": session_id, "take": 4}).json
+            self.assertEqual(0, rejected["session_id"])
+            reply = client.post("/update/nim", json={"session_id": session_id, "take": 3}).json
+
+        self.assertEqual(7, reply["pile"])
+        self.assertEqual("/update/nim", reply["menu"]["update"])
+        self.assertEqual(NimSession, KIND_TYPES[90])
+
+    def test_plugins_are_not_discovered_for_registered_games(self):
+        with mock.patch("importlib.metadata.entry_points", return_value=[]) as entry_points:
+            client = create_app(games=default_registry()).test_client()
+            client.post("/create/mastermind", json={"game_id": MASTERMIND_ID})
+            entry_points.assert_not_called()
+
+            client.post("/create/nim", json={"game_id": 90})
+            client.post("/create/chess", json={"game_id": 91})
+            entry_points.assert_called_once()
+
+    def test_broken_plugin_is_skipped(self):
+        values = (f"{__name__}:MISSING", "pyarcade.game_registry:DEFAULT_GAMES", f"{__name__}:NIM")
+        with mock.patch("importlib.metadata.entry_points", return_value=plugins(*values)):
+            registry = default_registry()
+            with self.assertWarns(UserWarning):
+                registry.discover()
+
+        self.assertEqual(["mastermind", "checkers", "minesweeper", "nim"], registry.names())
+
+    def test_plugin_moves_are_journaled_and_replayed(self):
+        registry = GameRegistry((NIM,))
+        directory = tempfile.TemporaryDirectory()
+        journal = Journal(os.path.join(directory.name, "journal"))
+        SessionManager.journal = journal
+        try:
+            proxy = registry["nim"]["proxy"]
+            session_id = proxy.create_game({"game_id": 90})["session_id"]
+            proxy.update_game({"session_id": session_id, "take": 2})
+            proxy.update_game({"session_id": session_id, "take": 3})
+        finally:
+            SessionManager.journal = None
+            journal.close()
+
+        SessionManager.active_sessions = {}
+        journal = Journal(os.path.join(directory.name, "journal"))
+        try:
+            self.assertEqual(3, replay_journal(journal))
+        finally:
+            journal.close()
+            directory.cleanup()
+
+        self.assertEqual(5, SessionManager.active_sessions[session_id].pile)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,189 @@
+from threading import Thread
+from unittest import mock
+import os
+import tempfile
+import unittest
+
+from pyarcade.checkers import Checkers
+from pyarcade.journal import Journal, JournalError, replay_journal, read_segment, CREATE, MOVE, DELETE
+from pyarcade.mastermind import MastermindGame
+from pyarcade.minesweeper import MinesweeperGame
+from pyarcade.session_manager import SessionManager
+from pyarcade.snapshot import SnapshotWriter, decode_session, encode_session, restore_sessions
+
+
+class JournalTestCase(unittest.TestCase):
+    def setUp(self):
+        SessionManager.active_sessions = {}
+        self.directory = tempfile.TemporaryDirectory()
+        self.journal_directory = os.path.join(self.directory.name, "journal")
+        self.journal = Journal(self.journal_directory)
+        SessionManager.journal = self.journal
+
+    def tearDown(self):
+        SessionManager.journal = None
+        SessionManager.active_sessions = {}
+        self.journal.close()
+        self.directory.cleanup()
+
+    def play(self) -> dict:
+        mastermind = MastermindGame()
+        mastermind_id = mastermind.create_game({"game_id": 0, "seed": 1})["session_id"]
+        mastermind.update_game({"session_id": mastermind_id, "guess": (0, 1, 2, 3)})
+        mastermind.update_game({"session_id": mastermind_id, "guess": (4, 5, 6, 7)})
+
+        checkers = Checkers()
+        checkers_id = checkers.create_game({"game_id": 1})["session_id"]
+        board = SessionManager.active_sessions[checkers_id].get_game()
+        board.get_valid_moves(board.get_piece_at(3, 2))
+        checkers.update_game({"session_id": checkers_id, "move": ((3, 2), (4, 1))})
+
+        minesweeper = MinesweeperGame()
+        minesweeper_id = minesweeper.create_game({"game_id": 2, "seed": 3})["session_id"]
+        minesweeper.update_game({"session_id": minesweeper_id, "unhide_cell": (4, 4)})
+        minesweeper.update_game({"session_id": minesweeper_id, "flag_cell": (0, 0)})
+
+        deleted_id = mastermind.create_game({"game_id": 0})["session_id"]
+        mastermind.delete_game({"session_id": deleted_id})
+
+        return {session_id: SessionManager.active_sessions[session_id].to_json()
+                for session_id in (mastermind_id, checkers_id, minesweeper_id)}
+
+    def replay(self, after_sequence: int = 0) -> int:
+        SessionManager.journal = None
+        self.journal.close()
+        self.journal = Journal(self.journal_directory)
+        return replay_journal(self.journal, after_sequence=after_sequence)
+
+    def test_records_appended_in_order(self):
+        self.play()
+        self.journal.commit()
+
+        records = list(self.journal.records())
+        self.assertEqual(list(range(1, 11)), [record[0] for record in records])
+        self.assertEqual([CREATE, MOVE, MOVE, CREATE, MOVE, CREATE, MOVE, MOVE, CREATE, DELETE],
+                         [record[2] for record in records])
+        self.assertEqual(b"\x00\x01\x02\x03", records[1][3])
+
+    def test_replay_without_snapshot(self):
+        before = self.play()
+        self.journal.commit()
+        SessionManager.active_sessions = {}
+
+        self.assertEqual(10, self.replay())
+        self.assertEqual(3, len(SessionManager.active_sessions))
+        for session_id, state in before.items():
+            self.assertEqual(state, SessionManager.active_sessions[session_id].to_json())
+
+    def test_replay_tail_after_snapshot(self):
+        snapshot_path = os.path.join(self.directory.name, "sessions.snapshot")
+        mastermind = MastermindGame()
+        session_id = mastermind.create_game({"game_id": 0, "seed": 1})["session_id"]
+        mastermind.update_game({"session_id": session_id, "guess": (0, 1, 2, 3)})
+        SnapshotWriter(snapshot_path, journal=self.journal).snapshot()
+
+        mastermind.update_game({"session_id": session_id, "guess": (4, 5, 6, 7)})
+        self.journal.commit()
+        before = SessionManager.active_sessions[session_id].to_json()
+
+        self.assertEqual(1, len(self.journal.segments()))
+        SessionManager.active_sessions = {}
+        restore_sessions(snapshot_path)
+        self.assertEqual(1, self.replay(SessionManager.active_sessions.journal_sequence))
+        self.assertEqual(before, SessionManager.active_sessions[session_id].to_json())
+
+    def test_records_already_in_session_skipped(self):
+        before = self.play()
+        self.journal.commit()
+
+        # Nothing cleared, so only the deleted session is created and deleted again
+        self.assertEqual(2, self.replay())
+        self.assertEqual(3, len(SessionManager.active_sessions))
+        for session_id, state in before.items():
+            self.assertEqual(state, SessionManager.active_sessions[session_id].to_json())
+
+    def test_torn_record_cut_off(self):
+        self.play()
+        self.journal.commit()
+        first_sequence, path = self.journal.segments()[-1]
+        with open(path, "ab") as segment_file:
+            segment_file.write(b"\x01\x02\x03")
+
+        self.journal.close()
+        self.journal = Journal(self.journal_directory)
+        self.assertEqual(10, len(list(read_segment(path))))
+        self.assertEqual(10, list(self.journal.records())[-1][0])
+
+        SessionManager.journal = self.journal
+        MastermindGame().create_game({"game_id": 0})
+        self.journal.commit()
+        self.assertEqual(11, list(self.journal.records())[-1][0])
+
+    def test_sync_append_waits_for_commit(self):
+        self.journal.close()
+        self.journal = Journal(self.journal_directory, sync=True)
+        SessionManager.journal = self.journal
+        self.journal.start()
+
+        MastermindGame().create_game({"game_id": 0})
+        self.assertEqual(1, len(list(self.journal.records())))
+
+    def test_failed_commit_written_again(self):
+        MastermindGame().create_game({"game_id": 0})
+        self.journal.commit()
+        before = self.play()
+        with mock.patch("os.fsync", side_effect=OSError(28, "No space left on device")):
+            with self.assertRaises(OSError):
+                self.journal.commit()
+        # As if part of a record had reached the disk before the failure
+        with open(self.journal.segments()[-1][1], "ab") as segment_file:
+            segment_file.write(b"\x01\x02\x03")
+
+        self.assertEqual(11, self.journal.commit())
+        self.assertIsNone(self.journal.error)
+        self.assertEqual(2, len(self.journal.segments()))
+        SessionManager.active_sessions = {}
+        self.assertEqual(11, self.replay())
+        for session_id, state in before.items():
+            self.assertEqual(state, SessionManager.active_sessions[session_id].to_json())
+
+    def test_commit_thread_retries_after_failure(self):
+        self.journal.close()
+        self.journal = Journal(self.journal_directory, commit_interval=0.001)
+        SessionManager.journal = self.journal
+        self.journal.start()
+
+        with mock.patch("os.fsync", side_effect=OSError(5, "Input/output error")):
+            with self.assertLogs("pyarcade.journal", "ERROR"):
+                MastermindGame().create_game({"game_id": 0})
+                with self.assertRaises(JournalError):
+                    self.journal.wait_for(1)
+
+        self.journal.wait_for(1)
+        self.assertEqual([1], [record[0] for record in self.journal.records()])
+
+    def test_append_raises_once_commit_thread_is_gone(self):
+        self.journal._worker = Thread(target=lambda: None)
+        self.journal._worker.start()
+        self.journal._worker.join()
+
+        with self.assertRaises(JournalError):
+            MastermindGame().create_game({"game_id": 0})
+        self.journal._worker = None
+
+    def test_snapshot_waits_for_move_to_be_journaled(self):
+        session_id = MastermindGame().create_game({"game_id": 0, "seed": 1})["session_id"]
+        session = SessionManager.active_sessions[session_id]
+        encoded = []
+
+        with session.lock():
+            session.insert_guess(((0, 1, 2, 3), (0, 0)))
+            encoder = Thread(target=lambda: encoded.append(decode_session(*encode_session(session))))
+            encoder.start()
+            encoder.join(0.05)
+            self.assertTrue(encoder.is_alive())
+            self.journal.append_move(session, (0, 1, 2, 3))
+        encoder.join()
+
+        self.assertEqual(2, encoded[0]._journal_sequence)
+        self.assertEqual(1, encoded[0].guess_count())
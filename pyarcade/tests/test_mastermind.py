@@ -1,6 +1,7 @@
 from pyarcade.mastermind import MastermindGame
+import json
 import unittest
-from pyarcade.session_manager import SessionManager
+from pyarcade.session_manager import SessionManager, MastermindSession, pack_guess, unpack_guess
 
 
 class MastermindTestCase(unittest.TestCase):
@@ -38,18 +39,18 @@ class MastermindTestCase(unittest.TestCase):
     def test_read_game_session_has_guesses(self):
         game = MastermindGame()
         session_id = game.create_game(({"game_id": 0}))["session_id"]
-        SessionManager.active_sessions[session_id].guesses = [(1, 2, 3, 4), (1, 2)]
-        correct_response = {"guesses": [(1, 2, 3, 4), (1, 2)], "session_id": session_id, "done": False}
+        SessionManager.active_sessions[session_id].insert_guess(((1, 2, 3, 4), (1, 2)))
+        correct_response = {"guesses": [((1, 2, 3, 4), (1, 2))], "session_id": session_id, "done": False}
         self.assertEqual(correct_response, game.read_game({"session_id": session_id}))
 
     def test_read_game_session_is_done(self):
         game = MastermindGame()
         session_id = game.create_game(({"game_id": 0}))["session_id"]
 
-        SessionManager.active_sessions[session_id].guesses = [(1, 2, 3, 4), (1, 2)]
+        SessionManager.active_sessions[session_id].insert_guess(((1, 2, 3, 4), (1, 2)))
         SessionManager.active_sessions[session_id].done = True
 
-        correct_response = {"guesses": [(1, 2, 3, 4), (1, 2)], "session_id": session_id, "done": True}
+        correct_response = {"guesses": [((1, 2, 3, 4), (1, 2))], "session_id": session_id, "done": True}
         self.assertEqual(correct_response, game.read_game({"session_id": session_id}))
 
     """UPDATE GAME"""
@@ -76,7 +77,7 @@ class MastermindTestCase(unittest.TestCase):
         game = MastermindGame()
         session_id = game.create_game(({"game_id": 0}))["session_id"]
         SessionManager.active_sessions[session_id].sequence = [1, 2, 3, 5]
-        SessionManager.active_sessions[session_id].guesses = [((2, 3, 6, 1), (3, 0))]
+        SessionManager.active_sessions[session_id].insert_guess(((2, 3, 6, 1), (3, 0)))
         guess = (1, 3, 4, 5)
 
         correct_response = {
@@ -325,3 +326,91 @@ class MastermindTestCase(unittest.TestCase):
         self.assertEqual(delete_reply, {"session_id": session_one})
 
         self.assertEqual(0, len(SessionManager.active_sessions))
+
+
+class MastermindSeedTestCase(unittest.TestCase):
+    def setUp(self):
+        SessionManager.active_sessions = {}
+
+    def test_same_seed_gives_same_sequence(self):
+        game = MastermindGame()
+        session_one = game.create_game({"game_id": 0, "seed": 435})["session_id"]
+        session_two = game.create_game({"game_id": 0, "seed": 435})["session_id"]
+
+        self.assertEqual(SessionManager.active_sessions[session_one].get_sequence(),
+                         SessionManager.active_sessions[session_two].get_sequence())
+
+    def test_session_stores_seed(self):
+        game = MastermindGame()
+        session_id = game.create_game({"game_id": 0, "seed": 7})["session_id"]
+        self.assertEqual(7, SessionManager.active_sessions[session_id].get_seed())
+
+    def test_session_without_seed_gets_one(self):
+        game = MastermindGame()
+        session_id = game.create_game({"game_id": 0})["session_id"]
+        self.assertEqual(int, type(SessionManager.active_sessions[session_id].get_seed()))
+
+
+class MastermindVariantTestCase(unittest.TestCase):
+    def setUp(self):
+        SessionManager.active_sessions = {}
+
+    def test_create_variant(self):
+        game = MastermindGame()
+        session_id = game.create_game({"game_id": 0, "code_length": 6, "alphabet_size": 8, "repeats": True,
+                                       "seed": 3})["session_id"]
+        session = SessionManager.active_sessions[session_id]
+
+        self.assertEqual(6, len(session.get_sequence()))
+        self.assertTrue(all(0 <= symbol < 8 for symbol in session.get_sequence()))
+        self.assertFalse(session.is_standard())
+
+    def test_create_default_is_standard(self):
+        game = MastermindGame()
+        session_id = game.create_game({"game_id": 0})["session_id"]
+        self.assertTrue(SessionManager.active_sessions[session_id].is_standard())
+
+    def test_update_variant_with_repeats(self):
+        game = MastermindGame()
+        session_id = game.create_game({"game_id": 0, "code_length": 6, "repeats": True})["session_id"]
+        SessionManager.active_sessions[session_id].sequence = (1, 1, 2, 2, 3, 3)
+
+        reply = game.update_game({"session_id": session_id, "guess": (1, 2, 1, 5, 3, 2)})
+        self.assertEqual([((1, 2, 1, 5, 3, 2), (3, 2))], reply["guesses"])
+        self.assertFalse(reply["done"])
+
+        reply = game.update_game({"session_id": session_id, "guess": (1, 1, 2, 2, 3, 3)})
+        self.assertTrue(reply["done"])
+
+
+class MastermindGuessHistoryTestCase(unittest.TestCase):
+    def setUp(self):
+        SessionManager.active_sessions = {}
+
+    def test_guesses_round_trip_through_packed_storage(self):
+        session = MastermindSession((1, 1, 2, 2, 3, 35, 0, 4, 9, 9), code_length=10, alphabet_size=36, repeats=True)
+        guess = ((35, 0, 1, 1, 2, 2, 3, 35, 0, 4), (5, 0))
+        session.insert_guess(guess)
+
+        self.assertEqual([guess], session.get_guesses())
+        self.assertEqual(guess, unpack_guess(pack_guess(guess[0], guess[1], 10, 36), 10, 36))
+
+    def test_since_index_returns_only_new_guesses(self):
+        game = MastermindGame()
+        session_id = game.create_game({"game_id": 0})["session_id"]
+        SessionManager.active_sessions[session_id].sequence = (1, 2, 3, 5)
+        game.update_game({"session_id": session_id, "guess": (2, 3, 6, 1)})
+
+        reply = game.update_game({"session_id": session_id, "guess": (1, 3, 4, 5), "since_index": 1})
+        self.assertEqual([((1, 3, 4, 5), (1, 2))], reply["guesses"])
+
+        reply = game.read_game({"session_id": session_id, "since_index": 2})
+        self.assertEqual([], reply["guesses"])
+
+    def test_serialized_session_has_guesses(self):
+        game = MastermindGame()
+        session_id = game.create_game({"game_id": 0})["session_id"]
+        SessionManager.active_sessions[session_id].insert_guess(((1, 2, 3, 4), (1, 2)))
+
+        state = json.loads(SessionManager.active_sessions[session_id].to_json())
+        self.assertEqual([[[1, 2, 3, 4], [1, 2]]], state["guesses"])
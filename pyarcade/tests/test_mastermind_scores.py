@@ -0,0 +1,55 @@
+from pyarcade.mastermind_scores import ScoreTable, SEQUENCES, SEQUENCE_CODES, SEQUENCE_COUNT, decode_score, \
+    encode_score, score_guess, score_histogram
+from random import Random
+import unittest
+
+
+class MastermindScoresTestCase(unittest.TestCase):
+    def test_sequence_codes(self):
+        self.assertEqual(5040, SEQUENCE_COUNT)
+        for code in [0, 1, 2500, 5039]:
+            self.assertEqual(code, SEQUENCE_CODES[SEQUENCES[code]])
+
+    def test_encode_decode_score(self):
+        for cows in range(5):
+            for bulls in range(5 - cows):
+                self.assertEqual((cows, bulls), decode_score(encode_score(cows, bulls)))
+
+    def test_score_guess(self):
+        self.assertEqual((1, 2), score_guess((1, 3, 4, 5), (1, 2, 3, 5)))
+        self.assertEqual((0, 4), score_guess((1, 2, 3, 5), (1, 2, 3, 5)))
+        self.assertEqual((4, 0), score_guess((1, 2, 3, 4), (4, 3, 2, 1)))
+
+    def test_table_matches_loop(self):
+        table = ScoreTable.singleton()
+        rng = Random(435)
+        for idx in range(2000):
+            guess, sequence = rng.choice(SEQUENCES), rng.choice(SEQUENCES)
+            self.assertEqual(score_guess(guess, sequence), table.score(guess, sequence))
+
+    def test_row_matches_loop(self):
+        table = ScoreTable.singleton()
+        guess_code = SEQUENCE_CODES[(1, 2, 3, 5)]
+        row = table.row(guess_code)
+
+        self.assertEqual(SEQUENCE_COUNT, len(row))
+        for sequence_code in range(0, SEQUENCE_COUNT, 37):
+            self.assertEqual(score_guess(SEQUENCES[guess_code], SEQUENCES[sequence_code]),
+                             decode_score(row[sequence_code]))
+
+    def test_score_outside_table(self):
+        self.assertEqual(score_guess((1, 1, 1, 5), [1, 2, 3, 5]),
+                         ScoreTable.singleton().score((1, 1, 1, 5), [1, 2, 3, 5]))
+
+
+class MastermindHistogramScoreTestCase(unittest.TestCase):
+    def test_histogram_matches_loop_for_unique_digits(self):
+        rng = Random(33)
+        for idx in range(500):
+            guess, sequence = rng.choice(SEQUENCES), rng.choice(SEQUENCES)
+            self.assertEqual(score_guess(guess, sequence), score_histogram(guess, sequence, 10))
+
+    def test_histogram_with_repeats(self):
+        self.assertEqual((0, 6), score_histogram((1, 1, 2, 2, 3, 3), (1, 1, 2, 2, 3, 3), 10))
+        self.assertEqual((0, 2), score_histogram((1, 1, 1, 1), (0, 0, 1, 1), 2))
+        self.assertEqual((2, 1), score_histogram((0, 1, 1), (1, 1, 0), 2))
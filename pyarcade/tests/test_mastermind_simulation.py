@@ -0,0 +1,34 @@
+from pyarcade.mastermind import MastermindGame
+from pyarcade.mastermind_simulation import STRATEGIES, play_game, simulate
+from pyarcade.session_manager import SessionManager
+import unittest
+
+
+class MastermindSimulationTestCase(unittest.TestCase):
+    def setUp(self):
+        SessionManager.active_sessions = {}
+
+    def test_play_game_wins_and_deletes_session(self):
+        game = MastermindGame()
+        guesses = play_game(game, STRATEGIES["random"], 5)
+
+        self.assertTrue(1 <= guesses <= 10)
+        self.assertEqual({}, SessionManager.active_sessions)
+
+    def test_same_seed_plays_same_game(self):
+        game = MastermindGame()
+        self.assertEqual(play_game(game, STRATEGIES["random"], 11), play_game(game, STRATEGIES["random"], 11))
+
+    def test_simulate_in_process(self):
+        result = simulate("minimax", 3, processes=0)
+
+        self.assertEqual(3, result["games"])
+        self.assertEqual(3, sum(result["distribution"].values()))
+        self.assertTrue(result["max_guesses"] <= 7)
+
+    def test_simulate_over_process_pool(self):
+        result = simulate("random", 20, processes=2, chunk_size=5)
+
+        self.assertEqual(20, sum(result["distribution"].values()))
+        self.assertEqual(result, dict(result, strategy="random"))
+        self.assertEqual(simulate("random", 20, processes=0)["distribution"], result["distribution"])
@@ -0,0 +1,115 @@
+from pyarcade.mastermind import MastermindGame
+from pyarcade.mastermind_scores import ScoreTable, SEQUENCES, SEQUENCE_CODES, score_guess
+from pyarcade.mastermind_solver import all_candidates, entropy_guess, first_guess, minimax_guess, narrow_candidates, \
+    next_guess, candidate_scores, GATHER_LIMIT, best_guess, \
+    expected_information_cost, next_entropy_guess, vectorized_entropy_guess, vectorized_minimax_guess
+from pyarcade import mastermind_solver
+from pyarcade.session_manager import SessionManager, MastermindSession
+import tracemalloc
+import unittest
+
+
+class MastermindSolverTestCase(unittest.TestCase):
+    def test_narrow_candidates(self):
+        candidates = narrow_candidates(all_candidates(), (0, 1, 2, 3), (0, 0))
+        self.assertEqual(360, len(candidates))
+        for code in candidates:
+            self.assertEqual((0, 0), score_guess((0, 1, 2, 3), SEQUENCES[code]))
+
+    def test_narrow_candidates_outside_table(self):
+        candidates = narrow_candidates(all_candidates(), (1, 1, 2, 3), (0, 0))
+        self.assertEqual(840, len(candidates))
+
+    def test_first_guess_matches_full_search(self):
+        self.assertEqual(best_guess(tuple(all_candidates()), max), first_guess())
+        self.assertEqual(first_guess(), minimax_guess(tuple(all_candidates())))
+
+    def test_next_guess_with_no_candidates(self):
+        self.assertEqual(None, next_guess([]))
+
+    def test_next_guess_with_one_candidate(self):
+        self.assertEqual((4, 3, 2, 1), next_guess([SEQUENCE_CODES[(4, 3, 2, 1)]]))
+
+    def test_minimax_wins_within_seven_guesses(self):
+        for secret in [(1, 2, 3, 5), (9, 8, 7, 6), (0, 5, 1, 4), (3, 0, 9, 2)]:
+            candidates = all_candidates()
+            for turn in range(7):
+                guess = next_guess(candidates)
+                score = score_guess(guess, secret)
+                if score == (0, 4):
+                    break
+                candidates = narrow_candidates(candidates, guess, score)
+            self.assertEqual(secret, guess)
+
+    def test_entropy_wins_within_seven_guesses(self):
+        for secret in [(1, 2, 3, 5), (9, 8, 7, 6)]:
+            candidates = all_candidates()
+            for turn in range(7):
+                guess = SEQUENCES[entropy_guess(tuple(candidates))]
+                score = score_guess(guess, secret)
+                if score == (0, 4):
+                    break
+                candidates = narrow_candidates(candidates, guess, score)
+            self.assertEqual(secret, guess)
+
+    def test_gathered_and_masked_scores_agree(self):
+        row = ScoreTable.singleton().row(SEQUENCE_CODES[(4, 5, 6, 7)])
+
+        for score in [(0, 3), (1, 0)]:
+            candidates = tuple(narrow_candidates(all_candidates(), (0, 1, 2, 3), score))
+            self.assertEqual(bytes(row[code] for code in candidates), candidate_scores(candidates)(row))
+
+
+class MastermindEntropyTestCase(unittest.TestCase):
+    def test_opening_is_lowest_code(self):
+        self.assertEqual(0, entropy_guess(tuple(all_candidates())))
+
+    def test_next_entropy_guess_with_no_candidates(self):
+        self.assertEqual(None, next_entropy_guess([]))
+
+    @unittest.skipIf(mastermind_solver.np is None, "NumPy is not installed")
+    def test_vectorized_matches_loop(self):
+        for score in [(1, 0), (0, 2), (2, 2)]:
+            candidates = tuple(narrow_candidates(all_candidates(), (0, 1, 2, 3), score))
+            self.assertEqual(best_guess(candidates, expected_information_cost), vectorized_entropy_guess(candidates))
+            self.assertEqual(best_guess(candidates, max), vectorized_minimax_guess(candidates))
+
+    @unittest.skipIf(mastermind_solver.np is None, "NumPy is not installed")
+    def test_vectorized_memory_is_bounded(self):
+        candidates = tuple(narrow_candidates(all_candidates(), (0, 1, 2, 3), (1, 0)))
+        self.assertEqual(1440, len(candidates))
+        ScoreTable.singleton().build()
+
+        tracemalloc.start()
+        try:
+            vectorized_entropy_guess(candidates)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        self.assertLess(peak, 16 * 2 ** 20)
+
+
+class MastermindHintTestCase(unittest.TestCase):
+    def setUp(self):
+        SessionManager.active_sessions = {}
+
+    def test_candidates_narrow_after_insert_guess(self):
+        session = MastermindSession((1, 2, 3, 5))
+        self.assertEqual(5040, len(session.get_candidates()))
+
+        session.insert_guess(((0, 1, 2, 3), (2, 0)))
+        self.assertEqual(len(narrow_candidates(all_candidates(), (0, 1, 2, 3), (2, 0))), len(session.get_candidates()))
+
+    def test_hint_game(self):
+        game = MastermindGame()
+        session_id = game.create_game({"game_id": 0})["session_id"]
+        SessionManager.active_sessions[session_id].sequence = (1, 2, 3, 5)
+        game.update_game({"session_id": session_id, "guess": (1, 3, 4, 5)})
+
+        reply = game.hint_game({"session_id": session_id})
+        self.assertTrue((1, 2, 3, 5) in reply["candidates"])
+        self.assertEqual(session_id, reply["session_id"])
+        self.assertFalse(reply["done"])
+        self.assertEqual(4, len(reply["next_guess"]))
+        self.assertEqual(4, len(reply["entropy_guess"]))
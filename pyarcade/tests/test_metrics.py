@@ -0,0 +1,69 @@
+from threading import Barrier, Thread
+import unittest
+
+from pyarcade.metrics import Metrics, DURATION_BUCKETS
+
+
+class MetricsTestCase(unittest.TestCase):
+    def test_observe_request_fills_bucket_and_sum(self):
+        metrics = Metrics()
+        metrics.observe_request("/play/<string:game_name>", "mastermind", 0.003)
+        metrics.observe_request("/play/<string:game_name>", "mastermind", 10.0)
+
+        histogram = metrics.durations()[("/play/<string:game_name>", "mastermind")]
+        self.assertEqual(1, histogram[DURATION_BUCKETS.index(0.005)])
+        self.assertEqual(1, histogram[len(DURATION_BUCKETS)])
+        self.assertAlmostEqual(10.003, histogram[-1])
+
+    def test_threads_record_into_separate_shards(self):
+        metrics = Metrics()
+        recorded = Barrier(5)
+
+        def reject():
+            for idx in range(1000):
+                metrics.count_rejection("checkers", "valid_update_request")
+            recorded.wait()
+            recorded.wait()
+
+        threads = [Thread(target=reject) for idx in range(4)]
+        for thread in threads:
+            thread.start()
+        recorded.wait()
+
+        self.assertEqual(5, len(metrics.shards()))
+        self.assertEqual({("checkers", "valid_update_request"): 4000}, metrics.rejections())
+
+        recorded.wait()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual({("checkers", "valid_update_request"): 4000}, metrics.rejections())
+
+    def test_finished_threads_leave_bounded_shards(self):
+        metrics = Metrics()
+
+        for idx in range(2000):
+            thread = Thread(target=metrics.observe_request, args=("/", "", 0.001))
+            thread.start()
+            thread.join()
+
+        self.assertLessEqual(len(metrics.shards()), 2)
+        self.assertEqual(2000, sum(metrics.durations()[("/", "")][:-1]))
+
+    def test_export_prometheus_text(self):
+        metrics = Metrics()
+        metrics.observe_request("/", "", 0.0001)
+        metrics.count_rejection("mastermind", "session_exists")
+
+        text = metrics.export({"mastermind": 2})
+        self.assertTrue('pyarcade_request_duration_seconds_bucket{route="/",game="",le="+Inf"} 1' in text)
+        self.assertTrue('pyarcade_request_duration_seconds_count{route="/",game=""} 1' in text)
+        self.assertTrue('pyarcade_proxy_rejections_total{game="mastermind",validator="session_exists"} 1' in text)
+        self.assertTrue('pyarcade_live_sessions{game="mastermind"} 2' in text)
+        self.assertTrue(text.endswith("\n"))
+
+    def test_reset(self):
+        metrics = Metrics()
+        metrics.count_rejection("minesweeper", "valid_update_request")
+        metrics.reset()
+        self.assertEqual({}, metrics.rejections())
@@ -237,3 +237,56 @@ class MinesweeperTestUpdateDeleteGame(unittest.TestCase):
     def test_delete_return(self):
         session_id = MinesweeperTestUpdateDeleteGame.instance.delete_game({"session_id": 3})
         self.assertEqual(3, session_id["session_id"])
+
+
+class MinesweeperTestLazyBoard(unittest.TestCase):
+    instance = MinesweeperGame()
+
+    def setUp(self):
+        SessionManager.active_sessions = {}
+        self.session_manager = SessionManager()
+
+    def test_create_game_does_not_place_mines(self):
+        session_id = self.instance.create_game({})["session_id"]
+        session = self.session_manager.get_session_by_id(session_id)
+        self.assertFalse(session.is_board_generated())
+
+    def test_read_game_before_first_unhide(self):
+        session_id = self.instance.create_game({})["session_id"]
+        reply = self.instance.read_game({"session_id": session_id})
+        line = '🬅 🬅 🬅 🬅 🬅 🬅 🬅 🬅 🬅 \n'
+        self.assertEqual(line * 9, reply["board"])
+        self.assertEqual(MinesweeperBoardBuilder.EASY_MINES, reply["mines"])
+
+    def test_first_unhide_places_mines(self):
+        session_id = self.instance.create_game({})["session_id"]
+        self.instance.update_game({"session_id": session_id, "unhide_cell": (4, 4)})
+        session = self.session_manager.get_session_by_id(session_id)
+        self.assertTrue(session.is_board_generated())
+        self.assertEqual(MinesweeperBoardBuilder.EASY_MINES, len(session.data["mines"]))
+
+    def test_first_unhide_is_always_safe(self):
+        for first_click in [(0, 0), (4, 4), (8, 8), (0, 5), (8, 3)]:
+            for idx in range(20):
+                session_id = self.instance.create_game({})["session_id"]
+                self.instance.update_game({"session_id": session_id, "unhide_cell": first_click})
+                session = self.session_manager.get_session_by_id(session_id)
+                self.assertFalse(session.is_done())
+                for row, column in session.data["mines"]:
+                    self.assertFalse(MinesweeperBoardBuilder.in_safe_zone(row, column, first_click))
+
+    def test_flag_before_first_unhide(self):
+        session_id = self.instance.create_game({})["session_id"]
+        reply = self.instance.update_game({"session_id": session_id, "flag_cell": (0, 0)})
+        session = self.session_manager.get_session_by_id(session_id)
+        self.assertFalse(session.is_board_generated())
+        self.assertEqual(MinesweeperBoardBuilder.EASY_MINES - 1, reply["flags"])
+
+    def test_same_seed_and_first_click_give_same_board(self):
+        session_one = self.instance.create_game({"seed": 435})["session_id"]
+        session_two = self.instance.create_game({"seed": 435})["session_id"]
+        self.instance.update_game({"session_id": session_one, "unhide_cell": (2, 3)})
+        self.instance.update_game({"session_id": session_two, "unhide_cell": (2, 3)})
+
+        self.assertEqual(self.session_manager.get_session_by_id(session_one).data["board"],
+                         self.session_manager.get_session_by_id(session_two).data["board"])
@@ -0,0 +1,114 @@
+from pyarcade.minesweeper import MinesweeperGame
+from pyarcade.minesweeper_builder import MinesweeperBoardBuilder
+from pyarcade.minesweeper_no_guess import NoGuessBoardPool, generate_no_guess_board, has_enclosed_cell, \
+    is_solvable_without_guessing
+from pyarcade.proxy import MinesweeperProxy
+from pyarcade.session_manager import SessionManager
+from pyarcade.game_ids import *
+import threading
+import time
+import unittest
+
+FOUR_CORNERS_BOARD_SOLN = {0: ['mine'] + [1] + [0] * 5 + [1] + ['mine'], 1: [1, 1] + [0] * 5 + [1, 1], 2: [0] * 9,
+                           3: [0] * 9, 4: [0] * 9, 5: [0] * 9, 6: [0] * 9, 7: [1, 1] + [0] * 5 + [1, 1],
+                           8: ['mine'] + [1] + [0] * 5 + [1] + ['mine']}
+FOUR_CORNERS_MINES = [(0, 0), (0, 8), (8, 0), (8, 8)]
+
+
+class NoGuessSolvableTestCase(unittest.TestCase):
+    def test_four_corners_is_solvable(self):
+        self.assertTrue(is_solvable_without_guessing(FOUR_CORNERS_BOARD_SOLN, FOUR_CORNERS_MINES, (4, 4)))
+
+    def test_corner_needs_a_guess(self):
+        board = {0: ['mine', 1], 1: [1, 1]}
+        self.assertFalse(is_solvable_without_guessing(board, [(0, 0)], (1, 1)))
+
+    def test_enclosed_cell(self):
+        board = {0: [0, 'mine', 2], 1: ['mine', 'mine', 'mine']}
+        self.assertTrue(has_enclosed_cell(board, 2, 3))
+        self.assertFalse(has_enclosed_cell(FOUR_CORNERS_BOARD_SOLN, 9, 9))
+
+
+class NoGuessGenerateTestCase(unittest.TestCase):
+    def test_generated_board_is_solvable(self):
+        for seed in range(10):
+            board, mines = generate_no_guess_board(9, 9, 10, (0, 0), seed)
+            self.assertEqual(10, len(mines))
+            self.assertTrue(is_solvable_without_guessing(board, mines, (0, 0)))
+
+    def test_generated_board_keeps_first_click_safe(self):
+        board, mines = generate_no_guess_board(16, 16, 40, (8, 8), 1)
+        for row, column in mines:
+            self.assertFalse(MinesweeperBoardBuilder.in_safe_zone(row, column, (8, 8)))
+
+    def test_same_seed_gives_same_board(self):
+        self.assertEqual(generate_no_guess_board(9, 9, 10, (4, 4), 99), generate_no_guess_board(9, 9, 10, (4, 4), 99))
+
+    def test_gives_up_after_max_attempts(self):
+        self.assertEqual(None, generate_no_guess_board(9, 9, 10, (4, 4), 99, max_attempts=0))
+
+
+class NoGuessBoardPoolTestCase(unittest.TestCase):
+    def test_pop_gives_replayable_board(self):
+        pool = NoGuessBoardPool(low_water=0, high_water=0)
+        seed, result = pool.pop((2, 2))
+        pool.stop()
+
+        self.assertEqual(generate_no_guess_board(9, 9, 10, (2, 2), seed), result)
+
+    def test_one_refill_thread_for_every_first_click(self):
+        pool = NoGuessBoardPool(low_water=1, high_water=2, processes=2)
+        first_clicks = [(0, 0), (4, 4), (8, 8)]
+        for first_click in first_clicks:
+            pool.pop(first_click)
+
+        deadline = time.time() + 30
+        while any(pool.size(first_click) < 2 for first_click in first_clicks) and time.time() < deadline:
+            time.sleep(0.01)
+        refill_threads = [thread for thread in threading.enumerate() if thread.name == "no-guess-pool-refill"]
+        pool.stop()
+
+        self.assertEqual([2, 2, 2], [pool.size(first_click) for first_click in first_clicks])
+        self.assertEqual(1, len(refill_threads))
+
+    def test_generate_in_processes(self):
+        pool = NoGuessBoardPool(processes=2)
+        entries = pool.generate((0, 0), 4)
+        pool.stop()
+
+        self.assertEqual(4, len(entries))
+        for seed, (board, mines) in entries:
+            self.assertTrue(is_solvable_without_guessing(board, mines, (0, 0)))
+
+
+class NoGuessGameTestCase(unittest.TestCase):
+    def setUp(self):
+        SessionManager.active_sessions = {}
+        self.session_manager = SessionManager()
+
+    def test_seeded_no_guess_session(self):
+        game = MinesweeperGame()
+        session_id = game.create_game({"game_id": MINESWEEPER_ID, "seed": 5, "no_guess": True})["session_id"]
+        game.update_game({"session_id": session_id, "unhide_cell": (3, 3)})
+
+        data = self.session_manager.get_session_by_id(session_id).get_data()
+        self.assertEqual(generate_no_guess_board(9, 9, 10, (3, 3), 5), (data["board"], data["mines"]))
+
+    def test_pooled_no_guess_session_records_seed(self):
+        pool = NoGuessBoardPool(low_water=0, high_water=0)
+        game = MinesweeperGame(no_guess_pool=pool)
+        session_id = game.create_game({"game_id": MINESWEEPER_ID, "no_guess": True})["session_id"]
+        game.update_game({"session_id": session_id, "unhide_cell": (3, 3)})
+        pool.stop()
+
+        session = self.session_manager.get_session_by_id(session_id)
+        data = session.get_data()
+        self.assertEqual(generate_no_guess_board(9, 9, 10, (3, 3), session.get_seed()),
+                         (data["board"], data["mines"]))
+
+    def test_proxy_no_guess_option(self):
+        proxy = MinesweeperProxy(MinesweeperGame())
+        self.assertNotEqual(0, proxy.create_game({"game_id": MINESWEEPER_ID, "no_guess": True})["session_id"])
+        self.assertEqual(0, proxy.create_game({"game_id": MINESWEEPER_ID, "no_guess": 1})["session_id"])
+        self.assertNotEqual(0, proxy.create_game({"game_id": MINESWEEPER_ID, "no_guess": False,
+                                                  "seed": 3})["session_id"])
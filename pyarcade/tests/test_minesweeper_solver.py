@@ -0,0 +1,129 @@
+from pyarcade.minesweeper import MinesweeperGame
+from pyarcade.minesweeper_solver import MinesweeperSolver, bits_of
+from pyarcade.session_manager import SessionManager
+import unittest
+
+FOUR_CORNERS_BOARD_SOLN = {0: ['mine'] + [1] + [0] * 5 + [1] + ['mine'], 1: [1, 1] + [0] * 5 + [1, 1], 2: [0] * 9,
+                           3: [0] * 9, 4: [0] * 9, 5: [0] * 9, 6: [0] * 9, 7: [1, 1] + [0] * 5 + [1, 1],
+                           8: ['mine'] + [1] + [0] * 5 + [1] + ['mine']}
+
+
+def hidden_player_board() -> dict:
+    return {row: [True] * 9 for row in range(9)}
+
+
+class MinesweeperSolverPropagationTestCase(unittest.TestCase):
+    def test_bits_of(self):
+        self.assertEqual([0, 3, 7], bits_of(0b10001001))
+
+    def test_nothing_unhidden_gives_nothing(self):
+        safe, mines = MinesweeperSolver().solve(hidden_player_board(), FOUR_CORNERS_BOARD_SOLN)
+        self.assertEqual(([], []), (safe, mines))
+
+    def test_single_hidden_neighbor_is_mine(self):
+        player_board = hidden_player_board()
+        for cell in [(0, 1), (1, 0), (1, 1), (1, 2), (2, 2)]:
+            player_board[cell[0]][cell[1]] = False
+
+        safe, mines = MinesweeperSolver().solve(player_board, FOUR_CORNERS_BOARD_SOLN)
+        self.assertEqual([(0, 0)], mines)
+
+    def test_zero_makes_neighbors_safe(self):
+        player_board = hidden_player_board()
+        player_board[4][4] = False
+
+        safe, mines = MinesweeperSolver().solve(player_board, FOUR_CORNERS_BOARD_SOLN)
+        self.assertEqual([(3, 3), (3, 4), (3, 5), (4, 3), (4, 5), (5, 3), (5, 4), (5, 5)], safe)
+        self.assertEqual([], mines)
+
+    def test_all_safe_cells_unhidden_finds_every_mine(self):
+        player_board = hidden_player_board()
+        for row in range(9):
+            for column in range(9):
+                if FOUR_CORNERS_BOARD_SOLN[row][column] != 'mine':
+                    player_board[row][column] = False
+
+        safe, mines = MinesweeperSolver().solve(player_board, FOUR_CORNERS_BOARD_SOLN)
+        self.assertEqual([], safe)
+        self.assertEqual([(0, 0), (0, 8), (8, 0), (8, 8)], mines)
+
+    def test_flag_counts_as_mine(self):
+        player_board = hidden_player_board()
+        player_board[8][7] = False
+        player_board[8][8] = 'flag'
+
+        safe, mines = MinesweeperSolver().solve(player_board, FOUR_CORNERS_BOARD_SOLN)
+        self.assertEqual([(7, 6), (7, 7), (7, 8), (8, 6)], safe)
+
+    def test_subset_rule(self):
+        # (a, b) hold one mine and (a, b, c) hold one mine, so c is safe
+        safe, mines, pending = MinesweeperSolver.propagate([(0b011, 1), (0b111, 1)])
+        self.assertEqual(0b100, safe)
+        self.assertEqual(0, mines)
+
+
+class MinesweeperSolverEnumerationTestCase(unittest.TestCase):
+    def test_enumeration_finds_forced_cells(self):
+        # one mine in (a, b), one in (b, c) and one in (a, b, c): b is the mine
+        safe, mines = MinesweeperSolver.enumerate_component(0b111, ((0b011, 1), (0b110, 1), (0b111, 1)))
+        self.assertEqual(0b101, safe)
+        self.assertEqual(0b010, mines)
+
+    def test_enumeration_without_deductions(self):
+        safe, mines = MinesweeperSolver.enumerate_component(0b11, ((0b11, 1),))
+        self.assertEqual((0, 0), (safe, mines))
+
+    def test_enumeration_with_no_solution(self):
+        safe, mines = MinesweeperSolver.enumerate_component(0b11, ((0b11, 1), (0b01, 1), (0b10, 1)))
+        self.assertEqual((0, 0), (safe, mines))
+
+    def test_components_are_split(self):
+        components = MinesweeperSolver.split_components([(0b0011, 1), (0b1100, 1), (0b0110, 1)])
+        self.assertEqual(1, len(components))
+
+        components = MinesweeperSolver.split_components([(0b0011, 1), (0b1100, 1)])
+        self.assertEqual(2, len(components))
+
+    def test_component_results_are_cached(self):
+        solver = MinesweeperSolver()
+        first = solver.solve_component(0b111, [(0b011, 1), (0b110, 1), (0b111, 1)])
+        second = solver.solve_component(0b111, [(0b111, 1), (0b110, 1), (0b011, 1)])
+        self.assertTrue(first is second)
+
+
+class MinesweeperHintTestCase(unittest.TestCase):
+    instance = MinesweeperGame()
+
+    def setUp(self):
+        SessionManager.active_sessions = {}
+        self.session_manager = SessionManager()
+
+    def test_hint_before_first_unhide(self):
+        session_id = self.instance.create_game({})["session_id"]
+        reply = self.instance.hint_game({"session_id": session_id})
+        self.assertEqual({"safe_cells": [], "mine_cells": [], "session_id": session_id, "done": False}, reply)
+
+    def test_hint_after_unhide(self):
+        session_id = self.instance.create_game({})["session_id"]
+        self.session_manager.get_session_by_id(session_id).data["board"] = FOUR_CORNERS_BOARD_SOLN
+        self.instance.update_game({"session_id": session_id, "unhide_cell": (4, 4)})
+
+        reply = self.instance.hint_game({"session_id": session_id})
+        self.assertEqual(8, len(reply["safe_cells"]))
+        self.assertEqual([], reply["mine_cells"])
+
+    def test_hint_is_cached_until_move(self):
+        session_id = self.instance.create_game({})["session_id"]
+        session = self.session_manager.get_session_by_id(session_id)
+        session.data["board"] = FOUR_CORNERS_BOARD_SOLN
+        self.instance.update_game({"session_id": session_id, "unhide_cell": (4, 4)})
+
+        self.instance.hint_game({"session_id": session_id})
+        self.assertTrue(session.get_hint() is not None)
+
+        self.instance.update_game({"session_id": session_id, "flag_cell": (0, 0)})
+        self.assertTrue(session.get_hint() is None)
+
+        self.instance.hint_game({"session_id": session_id})
+        self.instance.update_game({"session_id": session_id, "unhide_cell": (4, 5)})
+        self.assertTrue(session.get_hint() is None)
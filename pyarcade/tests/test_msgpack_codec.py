@@ -0,0 +1,48 @@
+import unittest
+
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+
+from pyarcade.msgpack_codec import MessagePackError, negotiate_mimetype, packb, unpackb, MAX_DEPTH
+
+
+class MessagePackCodecTestCase(unittest.TestCase):
+    def test_matches_the_specification_example(self):
+        self.assertEqual(bytes.fromhex("82a7636f6d70616374c3a6736368656d6100"), packb({"compact": True, "schema": 0}))
+
+    def test_round_trips_every_size_boundary(self):
+        values = [0, 127, 128, 255, 256, 65535, 65536, 2 ** 32 - 1, 2 ** 32, 2 ** 64 - 1, -1, -32, -33, -128, -129,
+                  -32768, -32769, -2 ** 31, -2 ** 31 - 1, -2 ** 63, 1.5, None, True, False, "", "a" * 31, "a" * 32,
+                  "a" * 256, "é" * 40000, b"", b"x" * 300, b"y" * 70000, tuple(range(15)), tuple(range(16)),
+                  tuple(range(70000)), {idx: str(idx) for idx in range(20)}]
+
+        for value in values:
+            self.assertEqual(value, unpackb(packb(value)))
+            self.assertEqual(type(value), type(unpackb(packb(value))))
+
+    def test_arrays_come_back_as_tuples(self):
+        move = unpackb(packb({"session_id": 2 ** 60, "move": [[3, 2], [4, 1]]}))
+
+        self.assertEqual({"session_id": 2 ** 60, "move": ((3, 2), (4, 1))}, move)
+        self.assertEqual(((1, 300), (-1, 2), ()), unpackb(packb([[1, 300], [-1, 2], []])))
+
+    def test_move_is_smaller_than_json(self):
+        self.assertEqual(33, len(packb({"session_id": 2 ** 60, "move": ((3, 2), (4, 1))})))
+
+    def test_malformed_data_raises(self):
+        for data in (b"", b"\x92\x01", b"\xc1", b"\x01\x02", b"\xcd\x01", b"\xd9\x05ab", b"\xa2\xff\xfe",
+                     b"\xc7\x01\x01\x00", b"\x81", b"\x81\xa3ab", b"\x92\x92\x01", b"\x81\x80\x01",
+                     b"\x91" * (MAX_DEPTH + 1) + b"\x00"):
+            with self.assertRaises(MessagePackError):
+                unpackb(data)
+
+    def test_negotiates_json_unless_msgpack_is_preferred(self):
+        for header, mimetype in (("", "application/json"), ("*/*", "application/json"),
+                                 ("text/html", "application/json"), ("application/msgpack", "application/msgpack"),
+                                 ("application/json;q=0.5, application/x-msgpack", "application/x-msgpack"),
+                                 ("application/json, application/msgpack", "application/json")):
+            self.assertEqual(mimetype, negotiate_mimetype(parse_accept_header(header, MIMEAccept)))
+
+
+if __name__ == '__main__':
+    unittest.main()
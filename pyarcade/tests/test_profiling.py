@@ -0,0 +1,46 @@
+from pstats import Stats
+import os
+import tempfile
+import unittest
+
+from pyarcade.profiling import RequestProfiler
+
+
+class RequestProfilerTestCase(unittest.TestCase):
+    def test_disabled_by_default(self):
+        profiler = RequestProfiler()
+        self.assertFalse(profiler.is_enabled())
+        self.assertEqual(None, profiler.start())
+
+    def test_samples_one_in_n(self):
+        profiler = RequestProfiler(3)
+        for idx in range(9):
+            profiler.stop(profiler.start(), "/route")
+
+        self.assertEqual({"/route": 3}, profiler.samples())
+        self.assertTrue("/route (3 sampled requests)" in profiler.report())
+
+    def test_only_one_request_profiled_at_a_time(self):
+        profiler = RequestProfiler(1)
+        first = profiler.start()
+        self.assertEqual(None, profiler.start())
+
+        profiler.stop(first, "/route")
+        second = profiler.start()
+        self.assertTrue(second is not None)
+        profiler.stop(second, "/route")
+
+    def test_dump_writes_loadable_stats(self):
+        profiler = RequestProfiler(1)
+        profiler.stop(profiler.start(), "/play/<string:game_name> mastermind")
+
+        with tempfile.TemporaryDirectory() as directory:
+            paths = profiler.dump(directory)
+            self.assertEqual([os.path.join(directory, "play_string_game_name_mastermind.prof")], paths)
+            self.assertTrue(Stats(paths[0]).total_calls >= 0)
+
+    def test_reset(self):
+        profiler = RequestProfiler(1)
+        profiler.stop(profiler.start(), "/route")
+        profiler.reset()
+        self.assertEqual({}, profiler.samples())
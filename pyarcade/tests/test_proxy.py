@@ -4,6 +4,7 @@ from pyarcade.checkers import Checkers
 from pyarcade.minesweeper import MinesweeperGame
 from pyarcade.proxy import MastermindGameProxy, GameProxy, CheckersProxy, MinesweeperProxy
 from pyarcade.mastermind import MastermindGame
+from pyarcade.metrics import Metrics
 from pyarcade.session_manager import SessionManager, Session
 import unittest
 
@@ -79,6 +80,29 @@ class ProxyCreateGameTestCase(unittest.TestCase):
         reply = proxy.create_game({})
         self.assertEqual(reply["session_id"], 0)
 
+    def test_create_game_with_seed(self):
+        game = MastermindGame()
+        proxy = MastermindGameProxy(game_instance=game)
+
+        session_id = proxy.create_game({"game_id": MASTERMIND_ID, "seed": 12})["session_id"]
+        self.assertNotEqual(session_id, 0)
+        self.assertEqual(12, self.session_manager.get_session_by_id(session_id).get_seed())
+
+    def test_create_game_bad_seed(self):
+        game = MastermindGame()
+        proxy = MastermindGameProxy(game_instance=game)
+
+        reply = proxy.create_game({"game_id": MASTERMIND_ID, "seed": -1})
+        self.assertEqual(reply["session_id"], 0)
+
+        reply = proxy.create_game({"game_id": MASTERMIND_ID, "seed": "12"})
+        self.assertEqual(reply["session_id"], 0)
+
+        reply = proxy.create_game({"game_id": MASTERMIND_ID, "seed": 1.5})
+        self.assertEqual(reply["session_id"], 0)
+
+        self.assertTrue(len(self.session_manager.active_sessions) == 0)
+
     def test_create_game_incorrect_inputs(self):
         game = MastermindGame()
         proxy = MastermindGameProxy(game_instance=game)
@@ -90,6 +114,114 @@ class ProxyCreateGameTestCase(unittest.TestCase):
         self.assertEqual(reply["session_id"], 0)
 
 
+class ProxyUpdateGameMastermindZeroTestCase(unittest.TestCase):
+    def setUp(self):
+        SessionManager.active_sessions = {}
+
+    def test_update_game_accepts_zero(self):
+        game = MastermindGame()
+        proxy = MastermindGameProxy(game_instance=game)
+
+        session_id = proxy.create_game({"game_id": MASTERMIND_ID})["session_id"]
+        reply = proxy.update_game({"session_id": session_id, "guess": (0, 1, 2, 3)})
+        self.assertEqual(session_id, reply["session_id"])
+
+
+class ProxyMastermindVariantTestCase(unittest.TestCase):
+    def setUp(self):
+        SessionManager.active_sessions = {}
+
+    def test_create_variant_options(self):
+        proxy = MastermindGameProxy(game_instance=MastermindGame())
+
+        self.assertNotEqual(0, proxy.create_game({"game_id": MASTERMIND_ID, "code_length": 6, "alphabet_size": 10,
+                                                  "repeats": True})["session_id"])
+        self.assertNotEqual(0, proxy.create_game({"game_id": MASTERMIND_ID, "code_length": 5})["session_id"])
+
+    def test_create_bad_variant_options(self):
+        proxy = MastermindGameProxy(game_instance=MastermindGame())
+
+        self.assertEqual(0, proxy.create_game({"game_id": MASTERMIND_ID, "code_length": 0})["session_id"])
+        self.assertEqual(0, proxy.create_game({"game_id": MASTERMIND_ID, "code_length": "4"})["session_id"])
+        self.assertEqual(0, proxy.create_game({"game_id": MASTERMIND_ID, "alphabet_size": 99})["session_id"])
+        self.assertEqual(0, proxy.create_game({"game_id": MASTERMIND_ID, "repeats": 1})["session_id"])
+        self.assertEqual(0, proxy.create_game({"game_id": MASTERMIND_ID, "code_length": 8,
+                                               "alphabet_size": 6})["session_id"])
+        self.assertEqual(0, proxy.create_game({"game_id": MASTERMIND_ID, "colors": 6})["session_id"])
+
+    def test_update_checks_session_variant(self):
+        proxy = MastermindGameProxy(game_instance=MastermindGame())
+        session_id = proxy.create_game({"game_id": MASTERMIND_ID, "code_length": 5, "alphabet_size": 6,
+                                        "repeats": True})["session_id"]
+
+        reply = proxy.update_game({"session_id": session_id, "guess": (1, 1, 5, 0, 2)})
+        self.assertEqual(session_id, reply["session_id"])
+        self.assertEqual(0, proxy.update_game({"session_id": session_id, "guess": (1, 2, 3, 4)})["session_id"])
+        self.assertEqual(0, proxy.update_game({"session_id": session_id, "guess": (1, 2, 3, 4, 6)})["session_id"])
+
+    def test_update_standard_rejects_long_guess_with_repeat(self):
+        proxy = MastermindGameProxy(game_instance=MastermindGame())
+        session_id = proxy.create_game({"game_id": MASTERMIND_ID})["session_id"]
+
+        self.assertEqual(0, proxy.update_game({"session_id": session_id, "guess": (1, 2, 3, 4, 4)})["session_id"])
+
+    def test_hint_only_for_standard_game(self):
+        proxy = MastermindGameProxy(game_instance=MastermindGame())
+        session_id = proxy.create_game({"game_id": MASTERMIND_ID, "code_length": 5})["session_id"]
+
+        self.assertEqual(0, proxy.hint_game({"session_id": session_id})["session_id"])
+
+
+class ProxyMastermindSinceIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        SessionManager.active_sessions = {}
+
+    def test_since_index_accepted(self):
+        proxy = MastermindGameProxy(game_instance=MastermindGame())
+        session_id = proxy.create_game({"game_id": MASTERMIND_ID})["session_id"]
+        proxy.update_game({"session_id": session_id, "guess": (0, 1, 2, 3)})
+
+        reply = proxy.update_game({"session_id": session_id, "guess": (4, 5, 6, 7), "since_index": 1})
+        self.assertEqual(1, len(reply["guesses"]))
+        self.assertEqual(2, len(proxy.read_game({"session_id": session_id, "since_index": 0})["guesses"]))
+
+    def test_bad_since_index_rejected(self):
+        proxy = MastermindGameProxy(game_instance=MastermindGame())
+        session_id = proxy.create_game({"game_id": MASTERMIND_ID})["session_id"]
+
+        self.assertEqual(0, proxy.read_game({"session_id": session_id, "since_index": -1})["session_id"])
+        self.assertEqual(0, proxy.read_game({"session_id": session_id, "since_index": "1"})["session_id"])
+        self.assertEqual(0, proxy.read_game({"session_id": session_id, "since": 1})["session_id"])
+        self.assertEqual(0, proxy.update_game({"session_id": session_id, "guess": (0, 1, 2, 3),
+                                               "since_index": 1.0})["session_id"])
+
+
+class ProxyRejectionMetricsTestCase(unittest.TestCase):
+    def setUp(self):
+        SessionManager.active_sessions = {}
+        Metrics.singleton().reset()
+
+    def test_rejections_counted_by_first_failed_check(self):
+        proxy = MastermindGameProxy(game_instance=MastermindGame())
+        session_id = proxy.create_game({"game_id": MASTERMIND_ID})["session_id"]
+
+        proxy.create_game({"game_id": CHECKERS_ID})
+        proxy.read_game({"session_id": -1})
+        proxy.read_game({"session_id": -2})
+        proxy.update_game({"session_id": session_id, "guess": (1, 1, 2, 3)})
+
+        self.assertEqual({("mastermind", "valid_game_id"): 1,
+                          ("mastermind", "session_exists"): 2,
+                          ("mastermind", "valid_update_request"): 1}, Metrics.singleton().rejections())
+
+    def test_accepted_requests_not_counted(self):
+        proxy = CheckersProxy(game_instance=Checkers())
+        session_id = proxy.create_game({"game_id": CHECKERS_ID})["session_id"]
+        proxy.read_game({"session_id": session_id})
+
+        self.assertEqual({}, Metrics.singleton().rejections())
+
+
 class ProxyReadGameTestCase(unittest.TestCase):
     def setUp(self):
         """Set MastermindGame instances to be INDEPENDENT between tests"""
@@ -0,0 +1,83 @@
+import unittest
+
+from pyarcade.session_ids import SessionIdGenerator, shard_of, created_at, ID_BITS, MAX_SEQUENCE, MAX_SHARD
+from pyarcade.session_manager import SessionManager, Session, advance_session_ids
+
+
+class FixedClock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class SessionIdGeneratorTestCase(unittest.TestCase):
+    def test_ids_carry_shard_and_time(self):
+        generator = SessionIdGenerator(shard=7, clock=FixedClock(1700000000.5))
+        session_id = next(generator)
+
+        self.assertEqual(7, shard_of(session_id))
+        self.assertEqual(1700000000.5, created_at(session_id))
+        self.assertTrue(0 < session_id < 2 ** 53)
+
+    def test_ids_survive_json_clients_that_parse_doubles(self):
+        self.assertEqual(53, ID_BITS)
+        generator = SessionIdGenerator(shard=MAX_SHARD, clock=FixedClock(2 ** 41 / 1000 + 1577836800 - 0.001))
+        ids = [next(generator) for idx in range(MAX_SEQUENCE + 1)]
+
+        self.assertTrue(max(ids) < 2 ** 53)
+        self.assertEqual(ids, [int(float(session_id)) for session_id in ids])
+
+    def test_ids_increase_within_a_millisecond(self):
+        generator = SessionIdGenerator(shard=3, clock=FixedClock(1700000000.0))
+        ids = [next(generator) for idx in range(MAX_SEQUENCE + 10)]
+
+        self.assertEqual(sorted(set(ids)), ids)
+        self.assertTrue(all(shard_of(session_id) == 3 for session_id in ids))
+
+    def test_clock_going_backwards_does_not_repeat_ids(self):
+        clock = FixedClock(1700000000.0)
+        generator = SessionIdGenerator(clock=clock)
+        first = next(generator)
+        clock.now -= 60
+
+        self.assertTrue(next(generator) > first)
+
+    def test_shards_never_collide(self):
+        clock = FixedClock(1700000000.0)
+        generators = [SessionIdGenerator(shard, clock) for shard in (0, 1, MAX_SHARD)]
+        ids = [next(generator) for generator in generators for idx in range(100)]
+
+        self.assertEqual(len(ids), len(set(ids)))
+
+    def test_invalid_shard_rejected(self):
+        self.assertRaises(ValueError, SessionIdGenerator, MAX_SHARD + 1)
+        self.assertRaises(ValueError, SessionIdGenerator, -1)
+
+    def test_advance_past_restored_ids(self):
+        clock = FixedClock(1700000000.0)
+        restored = next(SessionIdGenerator(shard=9, clock=FixedClock(1800000000.0)))
+
+        for shard in (0, 9, 10):
+            generator = SessionIdGenerator(shard, clock)
+            generator.advance_past(restored)
+            self.assertTrue(next(generator) > restored)
+
+
+class SessionManagerShardTestCase(unittest.TestCase):
+    def tearDown(self):
+        SessionManager.set_shard(0)
+
+    def test_sessions_created_with_shard(self):
+        SessionManager.set_shard(5)
+        session = Session()
+
+        self.assertEqual(5, shard_of(session.get_id()))
+        self.assertTrue(SessionManager.singleton().owns_session(session.get_id()))
+        SessionManager.set_shard(6)
+        self.assertFalse(SessionManager.singleton().owns_session(session.get_id()))
+
+    def test_advance_session_ids(self):
+        advance_session_ids(next(SessionIdGenerator(clock=FixedClock(4000000000.0))))
+        self.assertEqual(4000000000.0, created_at(Session().get_id()))
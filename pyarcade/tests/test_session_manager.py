@@ -213,3 +213,42 @@ class SessionManagerSessionIsDoneTestCase(unittest.TestCase):
         sesh_id = session_manager.init_checkers_session(CheckerBoard())["session_id"]
         session_manager.active_sessions[sesh_id].done = False
         self.assertFalse(session_manager.session_is_done(sesh_id))
+
+
+class SessionCachedReplyTestCase(unittest.TestCase):
+    def test_reply_built_once_per_version(self):
+        session = MastermindSession((0, 1, 2, 3))
+        built = []
+
+        def build() -> bytes:
+            built.append(session.get_version())
+            return b"reply"
+
+        session.cached_reply("read", build)
+        session.cached_reply("read", build)
+        self.assertEqual([0], built)
+
+        session.insert_guess(((4, 5, 6, 7), (0, 0)))
+        session.cached_reply("read", build)
+        self.assertEqual([0, 1], built)
+
+        session.cached_reply("other", build)
+        session.set_to_done()
+        session.cached_reply("other", build)
+        self.assertEqual([0, 1, 1, 2], built)
+
+    def test_move_while_building_is_not_cached_as_current(self):
+        session = MastermindSession((0, 1, 2, 3))
+        built = []
+
+        def build() -> list:
+            guesses = list(session.get_guesses())
+            built.append(guesses)
+            if len(built) == 1:
+                session.insert_guess(((4, 5, 6, 7), (0, 0)))
+            return guesses
+
+        self.assertEqual((0, []), session.cached_reply("read", build))
+        version, reply = session.cached_reply("read", build)
+        self.assertEqual((1, 1), (version, len(reply)))
+        self.assertEqual(2, len(built))
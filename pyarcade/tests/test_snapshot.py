@@ -0,0 +1,121 @@
+import os
+import tempfile
+import time
+import unittest
+
+from pyarcade.checkers import Checkers
+from pyarcade.mastermind import MastermindGame
+from pyarcade.minesweeper import MinesweeperGame
+from pyarcade.session_manager import SessionManager, Session, MastermindSession, CheckerSession, \
+    MinesweeperSession
+from pyarcade.snapshot import LazySessions, SnapshotError, SnapshotReader, SnapshotWriter, restore_sessions, \
+    write_snapshot, MAGIC
+
+
+class SnapshotTestCase(unittest.TestCase):
+    def setUp(self):
+        SessionManager.active_sessions = {}
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "sessions.snapshot")
+
+    def tearDown(self):
+        SessionManager.active_sessions = {}
+        self.directory.cleanup()
+
+    def create_sessions(self) -> tuple:
+        mastermind = MastermindGame()
+        mastermind_id = mastermind.create_game({"game_id": 0, "seed": 1})["session_id"]
+        mastermind.update_game({"session_id": mastermind_id, "guess": (0, 1, 2, 3)})
+        checkers_id = Checkers().create_game({"game_id": 1})["session_id"]
+        minesweeper = MinesweeperGame()
+        minesweeper_id = minesweeper.create_game({"game_id": 2, "seed": 3})["session_id"]
+        minesweeper.update_game({"session_id": minesweeper_id, "unhide_cell": (4, 4)})
+        return mastermind_id, checkers_id, minesweeper_id
+
+    def test_restore_round_trip(self):
+        mastermind_id, checkers_id, minesweeper_id = self.create_sessions()
+        before = {session_id: SessionManager.active_sessions[session_id].to_json()
+                  for session_id in (mastermind_id, checkers_id, minesweeper_id)}
+
+        self.assertEqual(3, write_snapshot(self.path, SessionManager.active_sessions))
+        SessionManager.active_sessions = {}
+        self.assertEqual(3, restore_sessions(self.path))
+
+        for session_id, state in before.items():
+            self.assertEqual(state, SessionManager.active_sessions[session_id].to_json())
+        self.assertEqual(MastermindGame().read_game({"session_id": mastermind_id})["guesses"],
+                         [((0, 1, 2, 3), SessionManager.active_sessions[mastermind_id].get_guesses()[0][1])])
+
+    def test_sessions_decoded_lazily(self):
+        mastermind_id, checkers_id, minesweeper_id = self.create_sessions()
+        write_snapshot(self.path, SessionManager.active_sessions)
+        restore_sessions(self.path)
+        sessions = SessionManager.active_sessions
+
+        self.assertTrue(isinstance(sessions, LazySessions))
+        self.assertEqual(3, len(sessions))
+        self.assertEqual(0, dict.__len__(sessions))
+        self.assertEqual({MastermindSession: 1, CheckerSession: 1, MinesweeperSession: 1},
+                         SessionManager.singleton().count_sessions_by_type())
+
+        self.assertTrue(SessionManager.singleton().session_exists(checkers_id))
+        self.assertEqual(0, dict.__len__(sessions))
+        sessions[checkers_id]
+        self.assertEqual(1, dict.__len__(sessions))
+        self.assertFalse(SessionManager.singleton().session_exists(-1))
+
+    def test_new_ids_continue_after_restore(self):
+        ids = self.create_sessions()
+        write_snapshot(self.path, SessionManager.active_sessions)
+        Session._session_id = iter(range(1, 10))
+        restore_sessions(self.path)
+
+        self.assertTrue(Checkers().create_game({"game_id": 1})["session_id"] > max(ids))
+        self.assertEqual(4, len(SessionManager.active_sessions))
+
+    def test_delete_and_resnapshot_copies_undecoded_sessions(self):
+        mastermind_id, checkers_id, minesweeper_id = self.create_sessions()
+        write_snapshot(self.path, SessionManager.active_sessions)
+        restore_sessions(self.path)
+
+        SessionManager.singleton().delete_session(mastermind_id)
+        self.assertFalse(SessionManager.singleton().session_exists(mastermind_id))
+        self.assertEqual(2, write_snapshot(self.path, SessionManager.active_sessions))
+
+        restore_sessions(self.path)
+        self.assertEqual(sorted([checkers_id, minesweeper_id]), sorted(SessionManager.active_sessions))
+
+    def test_bad_files_rejected(self):
+        with open(self.path, "wb") as snapshot_file:
+            snapshot_file.write(b"not a snapshot at all")
+        self.assertRaises(SnapshotError, SnapshotReader, self.path)
+
+        with open(self.path, "wb") as snapshot_file:
+            snapshot_file.write(MAGIC + b"\x63\x00\x00\x00\x00\x00\x00\x00")
+        self.assertRaises(SnapshotError, SnapshotReader, self.path)
+
+    def test_writer_leaves_no_temporary_files(self):
+        self.create_sessions()
+        writer = SnapshotWriter(self.path, interval=0.01)
+        writer.start()
+        writer.stop()
+
+        self.assertEqual(["sessions.snapshot"], os.listdir(self.directory.name))
+        self.assertEqual(3, SnapshotReader(self.path).count)
+
+    def test_writer_keeps_snapshotting_after_a_failure(self):
+        self.create_sessions()
+        path = os.path.join(self.directory.name, "missing", "sessions.snapshot")
+        writer = SnapshotWriter(path, interval=0.01)
+
+        deadline = time.monotonic() + 5
+        with self.assertLogs("pyarcade.snapshot", "ERROR") as logs:
+            writer.start()
+            while not logs.records and time.monotonic() < deadline:
+                time.sleep(0.01)
+        os.mkdir(os.path.dirname(path))
+        while not os.path.exists(path) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        writer.stop(final_snapshot=False)
+
+        self.assertEqual(3, SnapshotReader(path).count)